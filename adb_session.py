@@ -0,0 +1,322 @@
+import itertools
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+SENTINEL = "__ATLAS_END_"
+
+# Comandos de solo lectura: se pueden repetir si la conexión cae a mitad
+# (primera palabra exacta; para las herramientas con subcomandos, también la segunda)
+IDEMPOTENT_COMMANDS = {'getprop', 'dumpsys', 'cat', 'ls', 'echo', 'ps', 'pidof',
+                       'screencap', 'test', 'stat'}
+IDEMPOTENT_SUBCOMMANDS = {'pm': {'list', 'path'}, 'settings': {'get'}, 'wm': {'size', 'density'},
+                          'content': {'query'}, 'uiautomator': {'dump'}}
+# Redirecciones, tuberías, secuencias y sustituciones: ya no es una lectura simple
+_SHELL_OPERATORS = re.compile(r'[<>|;&`\n]|\$\(')
+
+
+@dataclass
+class CommandResult:
+    """Resultado de un comando en el dispositivo"""
+    command: str
+    output: str
+    exit_code: int
+    elapsed_ms: float
+
+    @property
+    def ok(self) -> bool:
+        return self.exit_code == 0
+
+
+class AdbShellSession:
+    """
+    Sesión persistente de 'adb shell' por dispositivo
+    Un solo proceso adb de larga vida; cada comando se delimita con un
+    centinela en la salida, así que se pueden encolar varios (pipeline)
+    sin lanzar un proceso por acción. Se reconecta sola si se cae.
+    """
+
+    def __init__(self, serial: Optional[str] = None, argv: Optional[List[str]] = None,
+                 timeout: float = 10.0, prelude: Optional[str] = None):
+        self.serial = serial
+        self.argv = argv or (['adb'] + (['-s', serial] if serial else []) + ['shell'])
+        self.timeout = timeout
+        self.prelude = prelude  # script que se ejecuta al (re)conectar
+
+        self._process: Optional[subprocess.Popen] = None
+        self._reader: Optional[threading.Thread] = None
+        self._pending = deque()  # (id, comando, future, inicio)
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+
+        # Estadísticas
+        self.commands_sent = 0
+        self.reconnects = 0
+
+    # ===== API PÚBLICA =====
+
+    def run(self, command: str, timeout: Optional[float] = None) -> CommandResult:
+        """Ejecuta un comando y espera su salida"""
+        return self.pipeline([command], timeout)[0]
+
+    def pipeline(self, commands: List[str], timeout: Optional[float] = None) -> List[CommandResult]:
+        """
+        Envía varios comandos de una vez y recoge sus salidas en orden
+        Un comando que falla no detiene a los siguientes. Si la conexión
+        se pierde a mitad solo se repiten los comandos pendientes sin
+        efectos (lecturas); los demás se dan por fallidos
+        """
+        if not commands:
+            return []
+
+        deadline = time.time() + (timeout or self.timeout)
+        results: List[Optional[CommandResult]] = [None] * len(commands)
+        pending = list(range(len(commands)))
+
+        for attempt in range(2):
+            lost = []
+            try:
+                futures = self.submit_many([commands[i] for i in pending])
+            except ConnectionError:
+                futures, lost = [], list(pending)
+
+            for index, future in zip(pending, futures):
+                try:
+                    results[index] = future.result(timeout=max(0.0, deadline - time.time()))
+                except FutureTimeout:
+                    # Comando colgado: sin reiniciar, todo lo posterior quedaría detrás
+                    self._reset(FutureTimeout(f"timeout en '{commands[index][:40]}'"))
+                    raise
+                except ConnectionError:
+                    lost.append(index)
+
+            if not lost:
+                break
+            if attempt:
+                raise ConnectionError("sesión adb cerrada")
+
+            # Conexión perdida a mitad: reintentar una vez con sesión nueva
+            pending = [i for i in lost if self._idempotent(commands[i])]
+            for index in lost:
+                if index not in pending:
+                    results[index] = CommandResult(command=commands[index], output='sesión adb perdida',
+                                                   exit_code=-1, elapsed_ms=0.0)
+            if not pending:
+                break
+
+        return results
+
+    def submit(self, command: str) -> Future:
+        """Encola un comando sin esperar (Future con CommandResult)"""
+        return self.submit_many([command])[0]
+
+    def submit_many(self, commands: List[str]) -> List[Future]:
+        """Encola varios comandos en una sola escritura"""
+        with self._lock:
+            self._ensure_connected()
+
+            futures, script = [], []
+            for command in commands:
+                command_id = next(self._ids)
+                future = Future()
+                self._pending.append((command_id, command, future, time.time()))
+                futures.append(future)
+                script.append(self._wrap(command, command_id))
+
+            try:
+                self._process.stdin.write(''.join(script).encode('utf-8'))
+                self._process.stdin.flush()
+            except (BrokenPipeError, OSError, ValueError):
+                self._fail_pending(ConnectionError("sesión adb cerrada"))
+                self._kill()
+                raise ConnectionError("sesión adb cerrada")
+
+            self.commands_sent += len(commands)
+            return futures
+
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def close(self):
+        """Cierra la sesión"""
+        with self._lock:
+            self._kill()
+            self._fail_pending(ConnectionError("sesión cerrada"))
+
+    def get_statistics(self) -> Dict:
+        return {'commands_sent': self.commands_sent, 'reconnects': self.reconnects,
+                'connected': self.is_alive()}
+
+    # ===== CONEXIÓN =====
+
+    def _ensure_connected(self):
+        if self.is_alive():
+            return
+
+        if self._process is not None:
+            self.reconnects += 1
+            print("[🔌] Reconectando sesión adb...")
+
+        self._process = subprocess.Popen(
+            self.argv,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            bufsize=0
+        )
+        self._reader = threading.Thread(target=self._read_loop, args=(self._process,),
+                                        daemon=True, name='adb-session-reader')
+        self._reader.start()
+
+        if self.prelude:
+            self._process.stdin.write((self.prelude + '\n').encode('utf-8'))
+            self._process.stdin.flush()
+
+    def _reset(self, error: Exception):
+        """Mata el proceso y falla lo pendiente; el siguiente comando reconecta"""
+        with self._lock:
+            self._kill()
+            self._fail_pending(error)
+
+    @staticmethod
+    def _idempotent(command: str) -> bool:
+        """¿Lectura simple que se puede repetir sin efectos?"""
+        if '$(' in command or '`' in command:
+            return False
+        # Operadores dentro de comillas son texto (p.ej. --where "ts>0")
+        unquoted = re.sub(r"'[^']*'|\"[^\"]*\"", '', command.strip())
+        if _SHELL_OPERATORS.search(unquoted):
+            return False
+
+        words = unquoted.split()
+        if not words:
+            return False
+        if words[0] in IDEMPOTENT_SUBCOMMANDS:
+            return len(words) > 1 and words[1] in IDEMPOTENT_SUBCOMMANDS[words[0]]
+        return words[0] in IDEMPOTENT_COMMANDS
+
+    def _kill(self):
+        if self._process is not None:
+            try:
+                self._process.kill()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _wrap(command: str, command_id: int) -> str:
+        """Comando + centinela con su código de salida"""
+        return (f"{{ {command}\n}} 2>&1 </dev/null\n"
+                f"__rc=$?; echo; echo {SENTINEL}{command_id}__ $__rc\n")
+
+    def _read_loop(self, process: subprocess.Popen):
+        """Hilo lector: reparte la salida entre los comandos pendientes"""
+        buffer: List[str] = []
+
+        for raw in iter(process.stdout.readline, b''):
+            line = raw.decode('utf-8', errors='replace').rstrip('\r\n')
+
+            if line.startswith(SENTINEL):
+                marker, _, code = line.partition(' ')
+                with self._lock:
+                    # Restos de una sesión ya reiniciada: no son de los pendientes actuales
+                    if process is not self._process or not self._pending:
+                        buffer = []
+                        continue
+                    command_id, command, future, started = self._pending.popleft()
+
+                # La línea vacía extra que añade el 'echo' del centinela
+                if buffer and buffer[-1] == '':
+                    buffer.pop()
+
+                expected = f"{SENTINEL}{command_id}__"
+                if marker == expected and not future.done():
+                    future.set_result(CommandResult(
+                        command=command,
+                        output='\n'.join(buffer),
+                        exit_code=int(code) if code.strip().lstrip('-').isdigit() else -1,
+                        elapsed_ms=(time.time() - started) * 1000
+                    ))
+                buffer = []
+            else:
+                buffer.append(line)
+
+        # EOF: el proceso murió
+        with self._lock:
+            if process is self._process:
+                self._fail_pending(ConnectionError("sesión adb terminada"))
+
+    def _fail_pending(self, error: Exception):
+        while self._pending:
+            _, _, future, _ = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+
+
+# ===== SESIONES COMPARTIDAS =====
+
+_sessions: Dict[Optional[str], AdbShellSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(serial: Optional[str] = None) -> AdbShellSession:
+    """Sesión compartida para un dispositivo (una por serial)"""
+    with _sessions_lock:
+        session = _sessions.get(serial)
+        if session is None:
+            session = AdbShellSession(serial)
+            _sessions[serial] = session
+        return session
+
+
+# ===== DISPOSITIVO FALSO =====
+
+FAKE_DEVICE_PRELUDE = r"""
+__dev="{state_dir}"
+mkdir -p "$__dev/settings"
+touch "$__dev/commands.log" "$__dev/packages.txt"
+__log() {{ echo "$*" >> "$__dev/commands.log"; }}
+input() {{ __log "input $*"; }}
+am() {{ __log "am $*"; echo "Starting: Intent"; }}
+svc() {{ __log "svc $*"; }}
+cmd() {{ __log "cmd $*"; }}
+dumpsys() {{ __log "dumpsys $*"; }}
+content() {{ __log "content $*"; }}
+uiautomator() {{ __log "uiautomator $*"; }}
+pm() {{
+  __log "pm $*"
+  if [ "$1 $2" = "list packages" ]; then sed 's/^/package:/' "$__dev/packages.txt"; fi
+}}
+settings() {{
+  __log "settings $*"
+  case "$1" in
+    get) cat "$__dev/settings/$2.$3" 2>/dev/null || echo null ;;
+    put) echo "$4" > "$__dev/settings/$2.$3" ;;
+  esac
+}}
+"""
+
+
+def fake_device_session(state_dir: Optional[str] = None) -> AdbShellSession:
+    """
+    Sesión contra un 'dispositivo' falso: un sh local con funciones que
+    imitan input/am/pm/settings/... y registran cada comando en
+    <state_dir>/commands.log. Permite probar sin teléfono.
+    """
+    state_dir = state_dir or tempfile.mkdtemp(prefix='atlas_fake_device_')
+    session = AdbShellSession(argv=['sh'], prelude=FAKE_DEVICE_PRELUDE.format(state_dir=state_dir))
+    session.state_dir = state_dir
+    return session
+
+
+def read_fake_log(session: AdbShellSession) -> List[str]:
+    """Comandos recibidos por un dispositivo falso"""
+    path = os.path.join(session.state_dir, 'commands.log')
+    with open(path) as f:
+        return [line.rstrip('\n') for line in f]
@@ -0,0 +1,282 @@
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Set
+
+from ui_hierarchy import normalize
+
+CATALOG_PATH = 'app_catalog.json'
+
+# Etiquetas de apps habituales (más nombres con los que se piden en español)
+KNOWN_APPS = {
+    'com.whatsapp': ['WhatsApp', 'wasap', 'guasap'],
+    'com.google.android.apps.maps': ['Maps', 'Google Maps', 'mapas'],
+    'com.google.android.youtube': ['YouTube'],
+    'com.spotify.music': ['Spotify'],
+    'com.android.chrome': ['Chrome', 'navegador'],
+    'com.google.android.gm': ['Gmail', 'correo'],
+    'com.instagram.android': ['Instagram'],
+    'com.facebook.katana': ['Facebook'],
+    'com.twitter.android': ['Twitter', 'X'],
+    'org.telegram.messenger': ['Telegram'],
+    'com.android.vending': ['Play Store', 'tienda'],
+    'com.google.android.apps.photos': ['Google Fotos', 'fotos', 'galería'],
+    'com.google.android.calendar': ['Calendario', 'calendar'],
+    'com.google.android.keep': ['Keep', 'notas'],
+    'com.android.settings': ['Ajustes', 'configuración', 'settings'],
+    'com.google.android.dialer': ['Teléfono', 'phone'],
+    'com.android.dialer': ['Teléfono', 'phone'],
+    'com.google.android.apps.messaging': ['Mensajes', 'sms'],
+    'com.android.camera': ['Cámara', 'camera'],
+    'com.google.android.GoogleCamera': ['Cámara', 'camera'],
+    'com.google.android.deskclock': ['Reloj', 'alarma', 'clock'],
+    'com.google.android.calculator': ['Calculadora'],
+    'com.netflix.mediaclient': ['Netflix'],
+    'com.google.android.apps.youtube.music': ['YouTube Music'],
+    'com.amazon.mShop.android.shopping': ['Amazon'],
+    'com.ubercab': ['Uber'],
+    'com.tiktok': ['TikTok'],
+    'com.zhiliaoapp.musically': ['TikTok'],
+}
+
+# Segmentos de paquete que no sirven como nombre
+_GENERIC_SEGMENTS = {'com', 'org', 'net', 'android', 'app', 'apps', 'mobile', 'client',
+                     'google', 'main', 'free', 'lite', 'pro', 'activity'}
+
+LAUNCHER_QUERY = ('cmd package query-activities --brief '
+                  '-a android.intent.action.MAIN -c android.intent.category.LAUNCHER')
+
+
+@dataclass
+class AppInfo:
+    """App instalada con su etiqueta y actividad lanzadora"""
+    package: str
+    label: str
+    activity: Optional[str] = None  # componente 'paquete/.Actividad'
+    aliases: Optional[List[str]] = None
+
+    @property
+    def names(self) -> List[str]:
+        return [self.label] + (self.aliases or [])
+
+
+class _Trie:
+    """Trie de nombres normalizados -> paquetes (búsqueda por prefijo)"""
+
+    def __init__(self):
+        self.root: Dict = {}
+
+    def insert(self, word: str, package: str):
+        node = self.root
+        for char in word:
+            node = node.setdefault(char, {})
+            node.setdefault('$', set()).add(package)
+
+    def prefix(self, word: str) -> Set[str]:
+        node = self.root
+        for char in word:
+            if char not in node:
+                return set()
+            node = node[char]
+        return node.get('$', set())
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein con corte: devuelve limit + 1 si se supera"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class AppCatalog:
+    """
+    Catálogo de apps instaladas
+    Guarda paquete, etiqueta y actividad lanzadora; se persiste en disco
+    para arrancar al instante y se actualiza en segundo plano comparando
+    la lista de paquetes (solo se consultan las apps nuevas).
+    Resuelve nombres ("abre Spotify") por tabla exacta, prefijo (trie) y
+    distancia de edición.
+    """
+
+    def __init__(self, session, path: str = CATALOG_PATH, autoload: bool = True):
+        self.session = session
+        self.path = path
+
+        self.apps: Dict[str, AppInfo] = {}
+        self._exact: Dict[str, Set[str]] = {}
+        self._trie = _Trie()
+        self._lock = threading.RLock()
+
+        # Estadísticas
+        self.resolutions = 0
+        self.fuzzy_resolutions = 0
+        self.last_refresh = 0.0
+
+        if autoload:
+            self.load()
+
+    # ===== RESOLUCIÓN =====
+
+    def resolve(self, name: str) -> Optional[AppInfo]:
+        """Nombre hablado o paquete -> app instalada"""
+        if not name:
+            return None
+
+        with self._lock:
+            if name in self.apps:
+                return self.apps[name]
+
+            key = normalize(name.replace('_', ' '))
+            if not key:
+                return None
+            self.resolutions += 1
+
+            # 1. Nombre exacto
+            packages = self._exact.get(key) or self._exact.get(key.replace(' ', ''))
+            if packages:
+                return self._best(packages)
+
+            # 2. Prefijo ("spoti" -> Spotify)
+            if len(key) >= 3:
+                packages = self._trie.prefix(key)
+                if packages:
+                    return self._best(packages)
+
+            # 3. Distancia de edición contra nombres de longitud parecida
+            limit = 1 if len(key) <= 5 else 2
+            best, best_distance = None, limit + 1
+            for known, candidates in self._exact.items():
+                distance = edit_distance(key, known, limit)
+                if distance < best_distance:
+                    best, best_distance = candidates, distance
+
+            if best:
+                self.fuzzy_resolutions += 1
+                return self._best(best)
+            return None
+
+    def launch_command(self, app: AppInfo) -> str:
+        """Comando que abre la app directamente por su componente"""
+        if app.activity:
+            return f"am start -n {app.activity}"
+        return f"monkey -p {app.package} -c android.intent.category.LAUNCHER 1"
+
+    def as_list(self) -> List[dict]:
+        with self._lock:
+            return [asdict(app) for app in self.apps.values()]
+
+    def get_statistics(self) -> Dict:
+        return {'apps': len(self.apps), 'resolutions': self.resolutions,
+                'fuzzy_resolutions': self.fuzzy_resolutions}
+
+    # ===== CARGA / ACTUALIZACIÓN =====
+
+    def load(self):
+        """Carga el catálogo guardado y lo actualiza en segundo plano"""
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    data = json.load(f)
+                with self._lock:
+                    self.apps = {a['package']: AppInfo(**a) for a in data.get('apps', [])}
+                    self._rebuild_index()
+            except Exception as e:
+                print(f"[!] Catálogo de apps ilegible, se regenera: {e}")
+                self.apps = {}
+
+        if self.apps:
+            threading.Thread(target=self.refresh, daemon=True, name='app-catalog-refresh').start()
+        else:
+            self.refresh()
+
+    def refresh(self) -> Dict[str, int]:
+        """Compara paquetes instalados con el catálogo y consulta solo los nuevos"""
+        try:
+            listing, launchers = self.session.pipeline(['pm list packages', LAUNCHER_QUERY])
+        except Exception as e:
+            print(f"[!] Error actualizando catálogo de apps: {e}")
+            return {'added': 0, 'removed': 0}
+
+        installed = {line[len('package:'):].strip() for line in listing.output.splitlines()
+                     if line.startswith('package:')}
+        if not listing.ok or not installed:
+            # Un 'pm list' fallido no significa que no haya apps: no tocar el catálogo
+            print(f"[!] 'pm list packages' sin resultado, catálogo sin cambios: {listing.output[:80]}")
+            return {'added': 0, 'removed': 0}
+
+        activities = {}
+        for match in re.finditer(r'([\w.]+)/([\w.$]+)', launchers.output):
+            activities.setdefault(match.group(1), f"{match.group(1)}/{match.group(2)}")
+
+        with self._lock:
+            added = installed - set(self.apps)
+            removed = set(self.apps) - installed
+
+            for package in removed:
+                del self.apps[package]
+            for package in added:
+                self.apps[package] = self._describe(package, activities.get(package))
+
+            # Actividades que cambiaron tras una actualización de la app
+            for package, app in self.apps.items():
+                if package in activities and app.activity != activities[package]:
+                    app.activity = activities[package]
+
+            self._rebuild_index()
+            self.last_refresh = time.time()
+
+        if added or removed:
+            print(f"[📱] Catálogo de apps: +{len(added)} -{len(removed)}")
+            self.save()
+
+        return {'added': len(added), 'removed': len(removed)}
+
+    def save(self):
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump({'apps': self.as_list(), 'saved': time.time()}, f,
+                          ensure_ascii=False, indent=1)
+        except Exception as e:
+            print(f"[!] Error guardando catálogo de apps: {e}")
+
+    # ===== UTILIDADES PRIVADAS =====
+
+    @staticmethod
+    def _describe(package: str, activity: Optional[str]) -> AppInfo:
+        known = KNOWN_APPS.get(package)
+        if known:
+            return AppInfo(package=package, label=known[0], activity=activity, aliases=known[1:])
+
+        # Heurística: el segmento más significativo del paquete
+        segments = [s for s in package.split('.') if s.lower() not in _GENERIC_SEGMENTS]
+        label = (segments[-1] if segments else package.split('.')[-1])
+        return AppInfo(package=package, label=label.capitalize(), activity=activity)
+
+    def _rebuild_index(self):
+        self._exact, self._trie = {}, _Trie()
+        for package, app in self.apps.items():
+            for name in app.names:
+                key = normalize(name)
+                if not key:
+                    continue
+                for variant in {key, key.replace(' ', '')}:
+                    self._exact.setdefault(variant, set()).add(package)
+                    self._trie.insert(variant, package)
+
+    def _best(self, packages: Set[str]) -> AppInfo:
+        """Entre varias, la que tiene lanzador (y si no, cualquiera estable)"""
+        apps = sorted((self.apps[p] for p in packages if p in self.apps),
+                      key=lambda a: (a.activity is None, a.package))
+        return apps[0]
@@ -1,7 +1,22 @@
-import subprocess
-import time
-from datetime import datetime, timedelta
-import json
+from datetime import datetime
+import re
+from typing import Any, Dict, List, Optional
+from element_locator import ElementLocator
+from adb_session import get_session
+from input_batch import InputBatch
+from text_injection import TextInjector
+from raw_screencap import RawScreencap
+from contact_index import ContactIndex
+from notification_reader import NotificationReader
+from app_catalog import AppCatalog
+from device_settings import DeviceSettings, PROFILES
+from routine_compiler import RoutineCompiler
+from intent_fast_paths import IntentFastPaths
+from screen_settle import ScreenSettleDetector
+from frame_source import VersionedFrameSource
+from local_ocr import LocalOCR
+from speech_stream import SpeechStream
+from slot_filling import parse_datetime
 
 class AssistantCapabilities:
     """
@@ -14,52 +29,101 @@ class AssistantCapabilities:
         self.vision = vision
         self.voice = voice
         
-        # Registro de apps instaladas
-        self.installed_apps = self._scan_installed_apps()
+        # Búsqueda de elementos (varias descripciones por llamada)
+        self.locator = ElementLocator(vision)
         
-        print(f"[🎯] {len(self.installed_apps)} apps detectadas")
+        # Lectura de texto: OCR local y el modelo solo si no basta
+        self.ocr = LocalOCR(vision)
+        
+        # Lecturas largas por fragmentos (se pueden saltar o cortar)
+        self.speech = SpeechStream(voice)
+        
+        # Sesión adb persistente (sin un proceso por comando)
+        self.adb = get_session()
+        
+        # Atajos por intent (antes que la automatización de UI)
+        self.fast_paths = IntentFastPaths(self.adb)
+        
+        # Contactos del teléfono (nombre -> número sin tocar la UI)
+        self.contacts = ContactIndex(self.adb)
+        
+        # Notificaciones desde dumpsys (sin abrir el panel ni visión)
+        self.notifications = NotificationReader(self.adb)
+        
+        # Ajustes del sistema con estado cacheado y escrituras idempotentes
+        self.device = DeviceSettings(self.adb)
+        
+        # Escritura de texto en bloque (IME / portapapeles / input text)
+        self.text_input = TextInjector(self.adb)
+        
+        # Captura en crudo para capturas/compartir (sin pasar por la galería)
+        self.screencap = RawScreencap()
+        self.last_screenshot = None
+        
+        # Esperas adaptativas en lugar de sleeps fijos
+        self.settle = ScreenSettleDetector(session=self.adb, locator=self.locator)
+        
+        # Frames versionados (se fija al inyectar la captura de pantalla)
+        self.frames = None
+        self._settle_reference = None  # frame previo a la última acción
+        
+        # Catálogo de apps instaladas (persistido; se actualiza en segundo plano)
+        self.apps = AppCatalog(self.adb)
+        
+        # Rutinas deterministas como script en el dispositivo
+        self.routine_compiler = RoutineCompiler(self.adb, catalog=self.apps, device=self.device)
+        
+        print(f"[🎯] {len(self.apps.apps)} apps detectadas")
     
     # ===== COMUNICACIÓN =====
     
-    def send_whatsapp_message(self, contact: str, message: str) -> dict:
+    def send_whatsapp_message(self, contact: str, message: str, number: Optional[str] = None) -> dict:
         """Envía mensaje por WhatsApp"""
         print(f"[💬] Enviando WhatsApp a {contact}: {message}")
         
         try:
+            # Atajo: wa.me abre el chat con el mensaje escrito
+            number = number or self.contacts.number_for(contact)
+            if self._run_fast_path('send_whatsapp_message', contact=contact, message=message,
+                                   number=number):
+                self.settle.wait_for_package('com.whatsapp', settle=False)
+                send_btn = self._wait_for_again("botón enviar")
+                if send_btn.get('found'):
+                    self._click(send_btn['x'], send_btn['y'])
+                    self.voice.speak(f"Mensaje enviado a {contact}")
+                    return {'success': True, 'via': 'intent'}
+                
+                # El chat ya está abierto con el texto: repetir el flujo lo duplicaría
+                return {'success': False, 'reason': 'boton_enviar_no_encontrado', 'via': 'intent'}
+            
             # Abrir WhatsApp
-            self.control._open_app('com.whatsapp')
-            time.sleep(2)
+            self._open_app('com.whatsapp')
             
             # Buscar contacto
-            frame = self._capture_screen()
-            search_bar = self.vision.find_element(frame, "barra de búsqueda")
+            search_bar = self._find("barra de búsqueda")
             
             if search_bar.get('found'):
-                self.control.click(search_bar['x'], search_bar['y'], 1080, 1920)
-                time.sleep(0.5)
-                
-                # Escribir nombre del contacto
-                self.control._type_text(contact)
-                time.sleep(1)
+                # Tap + nombre del contacto en un solo lote
+                self._tap_and_type(search_bar['x'], search_bar['y'], contact)
+                self._settle(2.0)
                 
                 # Click en primer resultado
-                self.control.click(540, 300, 1080, 1920)
-                time.sleep(1)
+                self._click(540, 300)
+                self._settle(2.0)
                 
-                # Escribir mensaje
-                frame = self._capture_screen()
-                input_box = self.vision.find_element(frame, "cuadro de texto para mensaje")
+                # Caja de texto y botón enviar están en la misma pantalla del chat
+                chat = self._locate("cuadro de texto para mensaje", "botón enviar o micrófono")
+                input_box = chat["cuadro de texto para mensaje"]
                 
                 if input_box.get('found'):
-                    self.control.click(input_box['x'], input_box['y'], 1080, 1920)
-                    time.sleep(0.3)
-                    self.control._type_text(message)
-                    time.sleep(0.5)
+                    self._tap_and_type(input_box['x'], input_box['y'], message)
+                    self._settle(1.0)
                     
-                    # Enviar
-                    send_btn = self.vision.find_element(frame, "botón enviar")
+                    # Enviar (el botón ocupa el lugar del micrófono; tras escribir
+                    # la pantalla cambió, así que se vuelve a mirar)
+                    send_btn = self._recheck(chat, "botón enviar o micrófono")
                     if send_btn.get('found'):
-                        self.control.click(send_btn['x'], send_btn['y'], 1080, 1920)
+                        self._click(send_btn['x'], send_btn['y'])
                         
                         self.voice.speak(f"Mensaje enviado a {contact}")
                         return {'success': True}
@@ -69,33 +133,35 @@ class AssistantCapabilities:
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
-    def make_phone_call(self, contact: str) -> dict:
+    def make_phone_call(self, contact: str, number: Optional[str] = None) -> dict:
         """Realiza llamada telefónica"""
         print(f"[📞] Llamando a {contact}")
         
         try:
+            # Atajo: tel: con el número del índice de contactos
+            number = number or self.contacts.number_for(contact)
+            if self._run_fast_path('make_phone_call', contact=contact, number=number):
+                self.voice.speak(f"Llamando a {contact}")
+                return {'success': True, 'via': 'intent'}
+            
             # Abrir teléfono
-            self.control._open_app('com.android.dialer')
-            time.sleep(1)
+            self._open_app('com.android.dialer')
             
             # Buscar contacto
-            frame = self._capture_screen()
-            search = self.vision.find_element(frame, "buscar contacto")
+            search = self._find("buscar contacto")
             
             if search.get('found'):
-                self.control.click(search['x'], search['y'], 1080, 1920)
-                time.sleep(0.5)
-                self.control._type_text(contact)
-                time.sleep(1)
+                self._tap_and_type(search['x'], search['y'], contact)
+                self._settle(2.0)
                 
                 # Click en contacto
-                self.control.click(540, 300, 1080, 1920)
-                time.sleep(0.5)
+                self._click(540, 300)
+                self._settle(1.0)
                 
                 # Botón llamar
-                call_btn = self.vision.find_element(frame, "botón llamar")
+                call_btn = self._find("botón llamar")
                 if call_btn.get('found'):
-                    self.control.click(call_btn['x'], call_btn['y'], 1080, 1920)
+                    self._click(call_btn['x'], call_btn['y'])
                     self.voice.speak(f"Llamando a {contact}")
                     return {'success': True}
             
@@ -109,21 +175,14 @@ class AssistantCapabilities:
         print("[🔔] Leyendo notificaciones")
         
         try:
-            # Abrir panel de notificaciones
-            self.control.swipe(540, 10, 540, 500, duration=0.3)
-            time.sleep(1)
-            
-            # Capturar y analizar
-            frame = self._capture_screen()
-            analysis = self.vision.read_screen_text(frame)
-            
-            notifications = analysis.get('structured', {}).get('messages', [])
+            notifications = self.notifications.active()
             
             if notifications:
                 self.voice.speak(f"Tienes {len(notifications)} notificaciones")
                 for notif in notifications[:3]:  # Solo primeras 3
-                    self.voice.speak(notif)
+                    self.voice.speak(f"{self._app_label(notif.package)}. {notif.summary}")
                 
+                self.notifications.unread(mark=True)
                 return {'success': True, 'count': len(notifications)}
             else:
                 self.voice.speak("No tienes notificaciones")
@@ -145,33 +204,43 @@ class AssistantCapabilities:
             if not event_datetime:
                 return {'success': False, 'reason': 'fecha_invalida'}
             
+            # Atajo: ACTION_INSERT abre el editor ya rellenado
+            if self._run_fast_path('create_calendar_event', title=title,
+                                   event_datetime=event_datetime, duration=duration):
+                save_btn = self._wait_for_again("guardar o confirmar")
+                if save_btn.get('found'):
+                    self._click(save_btn['x'], save_btn['y'])
+                    self.voice.speak(f"Evento '{title}' creado")
+                    return {'success': True, 'via': 'intent'}
+                
+                # El editor ya está abierto y relleno: repetir el flujo crearía otro
+                return {'success': False, 'reason': 'boton_guardar_no_encontrado', 'via': 'intent'}
+            
             # Abrir calendario
-            self.control._open_app('com.google.android.calendar')
-            time.sleep(2)
+            self._open_app('com.google.android.calendar')
             
             # Buscar botón +
-            frame = self._capture_screen()
-            add_btn = self.vision.find_element(frame, "botón crear evento o más")
+            add_btn = self._find("botón crear evento o más")
             
             if add_btn.get('found'):
-                self.control.click(add_btn['x'], add_btn['y'], 1080, 1920)
-                time.sleep(1)
+                self._click(add_btn['x'], add_btn['y'])
+                self._settle(2.0)
+                
+                # Llenar formulario (todos los campos en una sola búsqueda)
+                form = self._locate("campo título", "guardar o confirmar")
                 
-                # Llenar formulario
                 # Título
-                title_field = self.vision.find_element(frame, "campo título")
+                title_field = form["campo título"]
                 if title_field.get('found'):
-                    self.control.click(title_field['x'], title_field['y'], 1080, 1920)
-                    time.sleep(0.3)
-                    self.control._type_text(title)
+                    self._tap_and_type(title_field['x'], title_field['y'], title)
                 
                 # Fecha y hora (esto varía por app de calendario)
                 # ... implementación específica ...
                 
                 # Guardar
-                save_btn = self.vision.find_element(frame, "guardar o confirmar")
+                save_btn = self._recheck(form, "guardar o confirmar")
                 if save_btn.get('found'):
-                    self.control.click(save_btn['x'], save_btn['y'], 1080, 1920)
+                    self._click(save_btn['x'], save_btn['y'])
                     
                     self.voice.speak(f"Evento '{title}' creado")
                     return {'success': True}
@@ -195,23 +264,22 @@ class AssistantCapabilities:
         
         try:
             # Abrir app de notas (Google Keep)
-            self.control._open_app('com.google.android.keep')
-            time.sleep(2)
+            self._open_app('com.google.android.keep')
             
             # Crear nota nueva
-            frame = self._capture_screen()
-            new_note = self.vision.find_element(frame, "nueva nota o botón más")
+            new_note = self._find("nueva nota o botón más")
             
             if new_note.get('found'):
-                self.control.click(new_note['x'], new_note['y'], 1080, 1920)
-                time.sleep(1)
+                self._click(new_note['x'], new_note['y'])
+                self._settle(2.0)
                 
                 # Escribir contenido
-                self.control._type_text(content)
-                time.sleep(0.5)
+                self._type_text(content)
+                self._settle(1.0)
                 
                 # Guardar (generalmente automático)
                 self.control._press_back()
+                self._input_sent()
                 
                 self.voice.speak("Nota guardada")
                 return {'success': True}
@@ -236,28 +304,23 @@ class AssistantCapabilities:
         
         try:
             # Abrir app de música
-            self.control._open_app(package)
-            time.sleep(2)
+            self._open_app(package)
             
             # Buscar
-            frame = self._capture_screen()
-            search_btn = self.vision.find_element(frame, "búsqueda o lupa")
+            search_btn = self._find("búsqueda o lupa")
             
             if search_btn.get('found'):
-                self.control.click(search_btn['x'], search_btn['y'], 1080, 1920)
-                time.sleep(0.5)
-                
-                self.control._type_text(query)
-                time.sleep(1)
+                self._tap_and_type(search_btn['x'], search_btn['y'], query)
+                self._settle(2.0)
                 
                 # Click en primer resultado
-                self.control.click(540, 400, 1080, 1920)
-                time.sleep(0.5)
+                self._click(540, 400)
+                self._settle(1.0)
                 
                 # Play
-                play_btn = self.vision.find_element(frame, "reproducir o play")
+                play_btn = self._find("reproducir o play")
                 if play_btn.get('found'):
-                    self.control.click(play_btn['x'], play_btn['y'], 1080, 1920)
+                    self._click(play_btn['x'], play_btn['y'])
                     
                     self.voice.speak(f"Reproduciendo {query}")
                     return {'success': True}
@@ -272,26 +335,24 @@ class AssistantCapabilities:
         print(f"[📺] YouTube: {query}")
         
         try:
-            self.control._open_app('com.google.android.youtube')
-            time.sleep(2)
-            
-            frame = self._capture_screen()
-            search = self.vision.find_element(frame, "buscar")
+            # Atajo: ACTION_SEARCH directo a resultados
+            searched = self._run_fast_path('search_youtube', query=query)
             
-            if search.get('found'):
-                self.control.click(search['x'], search['y'], 1080, 1920)
-                time.sleep(0.5)
-                
-                self.control._type_text(query)
-                time.sleep(0.5)
+            if not searched:
+                self._open_app('com.google.android.youtube')
                 
-                # Enter para buscar
-                subprocess.run("adb shell input keyevent 66", shell=True)  # ENTER
-                time.sleep(2)
+                search = self._find("buscar")
                 
+                if search.get('found'):
+                    # Tap, texto y ENTER en un solo lote
+                    self._tap_and_type(search['x'], search['y'], query, submit=True)
+                    searched = True
+            
+            if searched:
                 if autoplay:
                     # Click en primer video
-                    self.control.click(540, 400, 1080, 1920)
+                    self._settle(4.0)
+                    self._click(540, 400)
                     self.voice.speak(f"Reproduciendo {query}")
                 else:
                     self.voice.speak(f"Resultados de {query}")
@@ -318,19 +379,15 @@ class AssistantCapabilities:
         package = browser_packages.get(browser, 'com.android.chrome')
         
         try:
-            self.control._open_app(package)
-            time.sleep(2)
+            # Atajo: ACTION_WEB_SEARCH
+            if self._run_fast_path('web_search', query=query, package=package):
+                self.voice.speak(f"Buscando {query}")
+                return {'success': True, 'via': 'intent'}
             
-            # Click en barra de búsqueda
-            self.control.click(540, 150, 1080, 1920)
-            time.sleep(0.5)
+            self._open_app(package)
             
-            # Escribir búsqueda
-            self.control._type_text(query)
-            time.sleep(0.5)
-            
-            # Enter
-            subprocess.run("adb shell input keyevent 66", shell=True)
+            # Barra de búsqueda, texto y ENTER en un solo lote
+            self._tap_and_type(540, 150, query, submit=True)
             
             self.voice.speak(f"Buscando {query}")
             return {'success': True}
@@ -352,7 +409,6 @@ class AssistantCapabilities:
         
         return self.web_search(query)
     
-```python
     # ===== SISTEMA =====
     
     def change_settings(self, setting: str, value: Any) -> dict:
@@ -373,56 +429,75 @@ class AssistantCapabilities:
         if handler:
             return handler(value)
         
+        if setting.lower() in PROFILES:
+            return self.apply_settings_profile(setting)
+        
         return {'success': False, 'reason': 'setting_not_supported'}
     
     def take_screenshot(self, save_where: str = 'gallery') -> dict:
-        """Toma captura de pantalla"""
+        """Toma captura de pantalla (en memoria; opcionalmente a la galería)"""
         print("[📸] Capturando pantalla")
         
         try:
-            subprocess.run("adb shell input keyevent 120", shell=True)  # SCREENSHOT
-            time.sleep(1)
+            frame = self.screencap.get_frame()
+            if frame is None:
+                return {'success': False, 'reason': 'captura_fallida'}
+            
+            self.last_screenshot = frame
+            result = {'success': True, 'frame': frame}
+            
+            if save_where == 'gallery':
+                uri = self._publish_image(frame)
+                if uri is None:
+                    return {'success': False, 'reason': 'no_se_pudo_guardar'}
+                result['uri'] = uri
             
             self.voice.speak("Captura tomada")
-            return {'success': True}
+            return result
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
     def share_current_screen(self, app: str = 'whatsapp') -> dict:
-        """Comparte pantalla actual"""
+        """Comparte pantalla actual directamente con ACTION_SEND"""
         print(f"[📤] Compartiendo a {app}")
         
+        share_packages = {
+            'whatsapp': 'com.whatsapp',
+            'telegram': 'org.telegram.messenger',
+            'gmail': 'com.google.android.gm',
+            'instagram': 'com.instagram.android',
+            'twitter': 'com.twitter.android',
+            'facebook': 'com.facebook.katana'
+        }
+        
         try:
-            # Tomar screenshot
-            self.take_screenshot()
-            time.sleep(1)
+            frame = self.screencap.get_frame()
+            if frame is None:
+                return {'success': False, 'reason': 'captura_fallida'}
+            self.last_screenshot = frame
             
-            # Abrir galería
-            self.control._open_app('com.google.android.apps.photos')
-            time.sleep(2)
+            uri = self._publish_image(frame)
+            if uri is None:
+                return {'success': False, 'reason': 'no_se_pudo_guardar'}
             
-            # Seleccionar última foto
-            self.control.click(200, 300, 1080, 1920)
-            time.sleep(1)
+            # Sin galería: el intent lleva la imagen a la app (o al selector)
+            package = share_packages.get(app)
+            command = (f"am start -a android.intent.action.SEND -t image/png "
+                       f"--eu android.intent.extra.STREAM {uri} --grant-read-uri-permission")
+            if package:
+                command += f" -p {package}"
             
-            # Botón compartir
-            frame = self._capture_screen()
-            share_btn = self.vision.find_element(frame, "compartir")
+            result = self.adb.run(command)
+            self._input_sent()
+            if not result.ok or 'Error' in result.output:
+                return {'success': False, 'error': result.output.strip()}
             
-            if share_btn.get('found'):
-                self.control.click(share_btn['x'], share_btn['y'], 1080, 1920)
-                time.sleep(1)
-                
-                # Buscar app destino
-                app_element = self.vision.find_element(frame, f"icono {app}")
-                if app_element.get('found'):
-                    self.control.click(app_element['x'], app_element['y'], 1080, 1920)
-                    
-                    self.voice.speak(f"Compartiendo por {app}")
-                    return {'success': True}
+            if package:
+                self.settle.wait_for_package(package)
             
-            return {'success': False}
+            self.voice.speak(f"Compartiendo por {app}")
+            return {'success': True, 'uri': uri}
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -433,32 +508,23 @@ class AssistantCapabilities:
         
         try:
             # Abrir Play Store
-            self.control._open_app('com.android.vending')
-            time.sleep(2)
+            self._open_app('com.android.vending')
             
             # Buscar
-            frame = self._capture_screen()
-            search = self.vision.find_element(frame, "buscar")
+            search = self._find("buscar")
             
             if search.get('found'):
-                self.control.click(search['x'], search['y'], 1080, 1920)
-                time.sleep(0.5)
-                
-                self.control._type_text(app_name)
-                time.sleep(0.5)
-                
-                # Enter
-                subprocess.run("adb shell input keyevent 66", shell=True)
-                time.sleep(2)
+                self._tap_and_type(search['x'], search['y'], app_name, submit=True)
+                self._settle(4.0)
                 
                 # Click en primera app
-                self.control.click(540, 400, 1080, 1920)
-                time.sleep(2)
+                self._click(540, 400)
+                self._settle(4.0)
                 
                 # Botón instalar
-                install_btn = self.vision.find_element(frame, "instalar")
+                install_btn = self._find("instalar")
                 if install_btn.get('found'):
-                    self.control.click(install_btn['x'], install_btn['y'], 1080, 1920)
+                    self._click(install_btn['x'], install_btn['y'])
                     
                     self.voice.speak(f"Instalando {app_name}. Te avisaré cuando termine")
                     return {'success': True}
@@ -474,21 +540,19 @@ class AssistantCapabilities:
         
         try:
             # Abrir configuración de almacenamiento
-            self.control._open_app('com.android.settings')
-            time.sleep(2)
+            self._open_app('com.android.settings')
             
             # Buscar "Almacenamiento"
-            frame = self._capture_screen()
-            storage = self.vision.find_element(frame, "almacenamiento o storage")
+            storage = self._find("almacenamiento o storage")
             
             if storage.get('found'):
-                self.control.click(storage['x'], storage['y'], 1080, 1920)
-                time.sleep(2)
+                self._click(storage['x'], storage['y'])
+                self._settle(4.0)
                 
                 # Liberar espacio
-                free_space = self.vision.find_element(frame, "liberar espacio")
+                free_space = self._find("liberar espacio")
                 if free_space.get('found'):
-                    self.control.click(free_space['x'], free_space['y'], 1080, 1920)
+                    self._click(free_space['x'], free_space['y'])
                     
                     self.voice.speak("Limpiando almacenamiento")
                     return {'success': True}
@@ -505,38 +569,42 @@ class AssistantCapabilities:
         print(f"[🗺️] Navegando a: {destination}")
         
         try:
+            # Atajo: google.navigation: inicia la navegación directamente
+            if self._run_fast_path('navigate_to', destination=destination, app=app):
+                self.voice.speak(f"Navegando a {destination}")
+                return {'success': True, 'via': 'intent'}
+            
             # Abrir Maps
-            self.control._open_app('com.google.android.apps.maps')
-            time.sleep(2)
+            self._open_app('com.google.android.apps.maps')
             
             # Buscar destino
-            frame = self._capture_screen()
-            search = self.vision.find_element(frame, "buscar o destino")
+            search = self._find("buscar o destino")
             
             if search.get('found'):
-                self.control.click(search['x'], search['y'], 1080, 1920)
-                time.sleep(0.5)
-                
-                self.control._type_text(destination)
-                time.sleep(1)
+                self._tap_and_type(search['x'], search['y'], destination)
+                self._settle(2.0)
                 
                 # Seleccionar primer resultado
-                self.control.click(540, 300, 1080, 1920)
-                time.sleep(2)
+                self._click(540, 300)
+                self._settle(4.0)
                 
-                # Botón "Cómo llegar"
-                directions_btn = self.vision.find_element(frame, "cómo llegar o direcciones")
-                if directions_btn.get('found'):
-                    self.control.click(directions_btn['x'], directions_btn['y'], 1080, 1920)
-                    time.sleep(1)
+                # La ficha del lugar suele mostrar "Cómo llegar" e "Iniciar" a la vez
+                place = self._locate("cómo llegar o direcciones", "iniciar")
+                start_btn = place["iniciar"]
+                directions_btn = place["cómo llegar o direcciones"]
+                
+                if not start_btn.get('found') and directions_btn.get('found'):
+                    self._click(directions_btn['x'], directions_btn['y'])
+                    self._settle(2.0)
                     
-                    # Iniciar navegación
-                    start_btn = self.vision.find_element(frame, "iniciar")
-                    if start_btn.get('found'):
-                        self.control.click(start_btn['x'], start_btn['y'], 1080, 1920)
-                        
-                        self.voice.speak(f"Navegando a {destination}")
-                        return {'success': True}
+                    start_btn = self._find("iniciar")
+                
+                # Iniciar navegación
+                if start_btn.get('found'):
+                    self._click(start_btn['x'], start_btn['y'])
+                    
+                    self.voice.speak(f"Navegando a {destination}")
+                    return {'success': True}
             
             return {'success': False}
             
@@ -568,6 +636,21 @@ class AssistantCapabilities:
         
         self.voice.speak(f"Ejecutando rutina {routine_name}")
         
+        # Rutina determinista: un solo script a velocidad del dispositivo
+        compiled = self.routine_compiler.compile(actions, name=routine_name)
+        if compiled is not None:
+            result = self.routine_compiler.run(
+                compiled,
+                on_progress=lambda done, total, step: print(f"[🔄] {done}/{total} {step}")
+            )
+            if result['success']:
+                self.voice.speak("Rutina completada")
+                return {'success': True, 'via': 'device', 'elapsed_ms': result['elapsed_ms']}
+            
+            # Continuar desde el host a partir del paso que no terminó
+            print(f"[!] Rutina en dispositivo interrumpida tras {result['completed']} pasos")
+            actions = actions[result['completed']:]
+        
         for action in actions:
             # Ejecutar cada acción
             result = self._execute_routine_action(action)
@@ -575,7 +658,7 @@ class AssistantCapabilities:
                 self.voice.speak(f"Error en paso: {action}")
                 return result
             
-            time.sleep(1)
+            self._settle(2.0)
         
         self.voice.speak("Rutina completada")
         return {'success': True}
@@ -609,14 +692,15 @@ class AssistantCapabilities:
         
         try:
             frame = self._capture_screen()
-            analysis = self.vision.read_screen_text(frame)
+            analysis = self.ocr.read_screen_text(frame)
             
             text = analysis.get('all_text', '')
             
             if text:
                 self.voice.speak("En pantalla dice:")
-                self.voice.speak(text)
-                return {'success': True}
+                # En segundo plano: el usuario puede decir "siguiente" o "para"
+                self.speech.speak(text, block=False)
+                return {'success': True, 'source': analysis.get('source')}
             else:
                 self.voice.speak("No hay texto legible en pantalla")
                 return {'success': False, 'reason': 'no_text'}
@@ -638,7 +722,7 @@ class AssistantCapabilities:
             
             description = self.vision.vision.api_call_with_context(prompt, frame)
             
-            self.voice.speak(description)
+            self.speech.speak(description, block=False)
             return {'success': True, 'description': description}
             
         except Exception as e:
@@ -650,8 +734,8 @@ class AssistantCapabilities:
         
         try:
             # Llamada directa
-            subprocess.run(f'adb shell am start -a android.intent.action.CALL -d tel:{number}', 
-                          shell=True)
+            self.adb.run(f'am start -a android.intent.action.CALL -d tel:{number}')
+            self._input_sent()
             
             self.voice.speak(f"Llamando a emergencias {number}")
             return {'success': True}
@@ -678,25 +762,30 @@ class AssistantCapabilities:
         
         try:
             # Abrir app
-            self.control._open_app(package)
-            time.sleep(2)
+            self._open_app(package)
             
             # Buscar botón de crear post
-            frame = self._capture_screen()
-            create_btn = self.vision.find_element(frame, "crear post o nueva publicación")
+            create_btn = self._find("crear post o nueva publicación")
             
             if create_btn.get('found'):
-                self.control.click(create_btn['x'], create_btn['y'], 1080, 1920)
-                time.sleep(1)
+                self._click(create_btn['x'], create_btn['y'])
+                self._settle(2.0)
+                
+                # Editor: campo de texto y botón publicar en una sola búsqueda
+                editor = self._locate("campo de texto de la publicación", "publicar o compartir")
+                text_field = editor["campo de texto de la publicación"]
+                if text_field.get('found'):
+                    self._click(text_field['x'], text_field['y'])
+                    self._settle(1.0)
                 
                 # Escribir contenido
-                self.control._type_text(content)
-                time.sleep(0.5)
+                self._type_text(content)
+                self._settle(1.0)
                 
                 # Publicar
-                publish_btn = self.vision.find_element(frame, "publicar o compartir")
+                publish_btn = self._recheck(editor, "publicar o compartir")
                 if publish_btn.get('found'):
-                    self.control.click(publish_btn['x'], publish_btn['y'], 1080, 1920)
+                    self._click(publish_btn['x'], publish_btn['y'])
                     
                     self.voice.speak(f"Publicado en {platform}")
                     return {'success': True}
@@ -711,11 +800,10 @@ class AssistantCapabilities:
         print("[❤️] Dando like")
         
         try:
-            frame = self._capture_screen()
-            like_btn = self.vision.find_element(frame, "me gusta o corazón o like")
+            like_btn = self._find("me gusta o corazón o like")
             
             if like_btn.get('found'):
-                self.control.click(like_btn['x'], like_btn['y'], 1080, 1920)
+                self._click(like_btn['x'], like_btn['y'])
                 self.voice.speak("Like dado")
                 return {'success': True}
             
@@ -727,42 +815,166 @@ class AssistantCapabilities:
     # ===== UTILIDADES PRIVADAS =====
     
     def _capture_screen(self):
-        """Captura pantalla actual"""
-        if hasattr(self, '_screen_capture'):
-            return self._screen_capture.get_frame()
+        """Frame actual (solo recaptura si hubo input o el último es viejo)"""
+        if self.frames is not None:
+            return self.frames.frame()
         return None
     
-    def _scan_installed_apps(self) -> List[dict]:
-        """Escanea apps instaladas"""
-        try:
-            result = subprocess.run(
-                'adb shell pm list packages',
-                shell=True,
-                capture_output=True,
-                text=True
+    def _input_sent(self):
+        """Marca el frame guardado como obsoleto tras actuar sobre el dispositivo"""
+        if self.frames is not None:
+            self.frames.invalidate()
+    
+    def _mark_reference(self):
+        """Frame previo a una acción: el siguiente _settle espera antes a que cambie"""
+        if self.frames is not None:
+            self._settle_reference = self.frames.current()[1]
+    
+    def _click(self, x: int, y: int):
+        """Click en coordenadas de referencia (1080x1920)"""
+        self._mark_reference()
+        self.control.click(x, y, 1080, 1920)
+        self._input_sent()
+    
+    def _run_fast_path(self, name: str, **params) -> bool:
+        """Atajo por intent; si se lanzó, la pantalla ya no es la misma"""
+        self._mark_reference()
+        launched = self.fast_paths.run(name, **params)
+        if launched:
+            self._input_sent()
+        else:
+            self._settle_reference = None
+        return launched
+    
+    def _open_app(self, package: str):
+        """Abre una app y espera a que esté en primer plano y quieta"""
+        self.control._open_app(package)
+        self._input_sent()
+        self.settle.wait_for_package(package)
+    
+    def _tap_and_type(self, x: int, y: int, text: str, submit: bool = False,
+                      focus_delay: float = 0.4) -> dict:
+        """Tap en un campo, escribe y opcionalmente ENTER: una sola ida y vuelta"""
+        self._mark_reference()
+        batch = InputBatch(self.adb, self.text_input).tap(x, y).sleep(focus_delay).text(text)
+        if submit:
+            batch.keyevent(66)  # ENTER
+        result = batch.run()
+        self._input_sent()
+        return result
+    
+    def _type_text(self, text: str) -> dict:
+        """Escribe texto en el campo con el foco en una sola operación"""
+        self._mark_reference()
+        result = self.text_input.type(text)
+        self._input_sent()
+        return result
+    
+    def _settle(self, timeout: float = 1.0) -> bool:
+        """
+        Espera a que la pantalla deje de cambiar (máximo timeout)
+        Tras una acción, primero espera a que la pantalla cambie respecto al
+        frame previo: en un dispositivo lento dos sondeos iguales antes de
+        que empiece la transición no significan que ya terminó
+        """
+        reference, self._settle_reference = self._settle_reference, None
+        return self.settle.wait_until_settled(timeout=timeout, reference=reference)
+    
+    def _wait_for(self, description: str, timeout: float = 4.0) -> dict:
+        """Espera a que aparezca un elemento y lo devuelve"""
+        return self.settle.wait_for_element(description, timeout=timeout)
+    
+    def _wait_for_again(self, description: str, timeout: float = 4.0) -> dict:
+        """_wait_for con un segundo intento (la app lanzada por intent puede tardar)"""
+        element = self._wait_for(description, timeout)
+        if not element.get('found'):
+            element = self._wait_for(description, timeout)
+        return element
+    
+    def _find_elements(self, frame, descriptions: List[str]) -> Dict[str, dict]:
+        """Busca todos los elementos de una pantalla en una sola llamada"""
+        return self.locator.find_elements(frame, descriptions)
+    
+    def _locate(self, *descriptions: str) -> Dict[str, dict]:
+        """
+        Busca elementos en la pantalla actual (una sola llamada)
+        Cada resultado lleva la versión del frame en que se encontró
+        """
+        if self.frames is not None:
+            version, frame = self.frames.current()
+        else:
+            version, frame = -1, None
+        
+        results = self._find_elements(frame, list(descriptions))
+        for element in results.values():
+            element['frame_version'] = version
+        return results
+    
+    def _find(self, description: str) -> dict:
+        """Busca un elemento en la pantalla actual"""
+        return self._locate(description)[description]
+    
+    def _recheck(self, results: Dict[str, dict], description: str) -> dict:
+        """Elemento de una búsqueda anterior; se vuelve a buscar si la pantalla cambió"""
+        element = results[description]
+        if self.frames is not None and self.frames.changed_since(element.get('frame_version', -1)):
+            return self._find(description)
+        return element
+    
+    def _publish_image(self, frame, timeout: float = 3.0) -> Optional[str]:
+        """Sube el frame como PNG, lo indexa en MediaStore y devuelve su content://"""
+        path = f"/sdcard/Pictures/Screenshots/atlas_{datetime.now():%Y%m%d_%H%M%S}.png"
+        
+        self.adb.run("mkdir -p /sdcard/Pictures/Screenshots")
+        if not self.screencap.push_png(frame, path):
+            return None
+        
+        self.adb.run(f"am broadcast -a android.intent.action.MEDIA_SCANNER_SCAN_FILE "
+                     f"-d file://{path} >/dev/null")
+        
+        # El escaneo es asíncrono: esperar a que aparezca en MediaStore
+        found = {}
+        
+        def indexed():
+            result = self.adb.run(
+                "content query --uri content://media/external/images/media "
+                f"--projection _id --where \"_data='{path}'\""
             )
-            
-            packages = []
-            for line in result.stdout.split('\n'):
-                if line.startswith('package:'):
-                    package = line.replace('package:', '').strip()
-                    packages.append({'package': package})
-            
-            return packages
-            
-        except:
-            return []
+            match = re.search(r'_id=(\d+)', result.output)
+            if match:
+                found['id'] = match.group(1)
+            return bool(match)
+        
+        if not self.settle.wait_until(indexed, timeout=timeout):
+            return None
+        return f"content://media/external/images/media/{found['id']}"
+    
+    @staticmethod
+    def _app_label(package: str) -> str:
+        """Nombre legible aproximado de una app a partir del paquete"""
+        labels = {
+            'com.whatsapp': 'WhatsApp',
+            'org.telegram.messenger': 'Telegram',
+            'com.google.android.gm': 'Gmail',
+            'com.google.android.apps.messaging': 'Mensajes',
+            'com.instagram.android': 'Instagram'
+        }
+        return labels.get(package, package.split('.')[-1].capitalize())
     
     def _use_google_assistant(self, query: str) -> dict:
         """Usa Google Assistant para comandos"""
         try:
-            # Activar Assistant
-            subprocess.run('adb shell input keyevent 231', shell=True)  # VOICE_ASSIST
-            time.sleep(1)
-            
-            # El usuario hablaría aquí, pero podemos simular con texto
-            self.control._type_text(query)
-            subprocess.run("adb shell input keyevent 66", shell=True)  # ENTER
+            # Activar Assistant y escribir la consulta en un solo lote
+            # (el usuario hablaría aquí, pero podemos simular con texto)
+            result = (InputBatch(self.adb, self.text_input)
+                      .keyevent(231)  # VOICE_ASSIST
+                      .sleep(1.5)
+                      .text(query)
+                      .keyevent(66)  # ENTER
+                      .run())
+            self._input_sent()
+            if not result['success']:
+                return result
             
             return {'success': True}
             
@@ -771,167 +983,130 @@ class AssistantCapabilities:
     
     def _toggle_wifi(self, enable: bool) -> dict:
         """Activa/desactiva WiFi"""
-        try:
-            state = "enable" if enable else "disable"
-            subprocess.run(f'adb shell svc wifi {state}', shell=True)
-            
-            status = "activado" if enable else "desactivado"
-            self.voice.speak(f"WiFi {status}")
-            return {'success': True}
-            
-        except Exception as e:
-            return {'success': False, 'error': str(e)}
+        return self._apply_setting('wifi', enable, "WiFi")
     
     def _toggle_bluetooth(self, enable: bool) -> dict:
         """Activa/desactiva Bluetooth"""
-        try:
-            state = "enable" if enable else "disable"
-            subprocess.run(f'adb shell svc bluetooth {state}', shell=True)
-            
-            status = "activado" if enable else "desactivado"
-            self.voice.speak(f"Bluetooth {status}")
-            return {'success': True}
-            
-        except Exception as e:
-            return {'success': False, 'error': str(e)}
+        return self._apply_setting('bluetooth', enable, "Bluetooth")
     
-    def _set_brightness(self, level: int) -> dict:
-        """Ajusta brillo (0-255)"""
-        try:
-            level = max(0, min(255, level))
-            subprocess.run(
-                f'adb shell settings put system screen_brightness {level}',
-                shell=True
-            )
-            
-            self.voice.speak(f"Brillo ajustado a {int(level/255*100)}%")
-            return {'success': True}
-            
-        except Exception as e:
-            return {'success': False, 'error': str(e)}
+    def _set_brightness(self, level) -> dict:
+        """Ajusta brillo (0-255 o porcentaje '30%')"""
+        result = self._apply_setting('brightness', level)
+        if result.get('success'):
+            brightness = self.device.get('brightness') or 0
+            self.voice.speak(f"Brillo ajustado a {int(brightness/255*100)}%")
+        return result
     
-    def _set_volume(self, level: int) -> dict:
-        """Ajusta volumen (0-15)"""
-        try:
-            level = max(0, min(15, level))
-            
-            # Subir/bajar según nivel actual
-            for _ in range(abs(level)):
-                keycode = 24 if level > 0 else 25  # VOLUME_UP : VOLUME_DOWN
-                subprocess.run(f'adb shell input keyevent {keycode}', shell=True)
-                time.sleep(0.1)
-            
-            self.voice.speak(f"Volumen ajustado")
-            return {'success': True}
-            
-        except Exception as e:
-            return {'success': False, 'error': str(e)}
+    def _set_volume(self, level) -> dict:
+        """Ajusta volumen a un nivel absoluto (0-máximo o porcentaje '50%')"""
+        result = self._apply_setting('volume', level)
+        if result.get('success'):
+            self.voice.speak(f"Volumen ajustado a {self.device.get('volume')}")
+        return result
     
     def _toggle_airplane_mode(self, enable: bool) -> dict:
         """Activa/desactiva modo avión"""
-        try:
-            state = 1 if enable else 0
-            subprocess.run(
-                f'adb shell settings put global airplane_mode_on {state}',
-                shell=True
-            )
-            subprocess.run(
-                'adb shell am broadcast -a android.intent.action.AIRPLANE_MODE',
-                shell=True
-            )
-            
-            status = "activado" if enable else "desactivado"
-            self.voice.speak(f"Modo avión {status}")
-            return {'success': True}
-            
-        except Exception as e:
-            return {'success': False, 'error': str(e)}
+        return self._apply_setting('airplane_mode', enable, "Modo avión")
     
     def _toggle_dnd(self, enable: bool) -> dict:
-        """Activa/desactiva No Molestar"""
-        try:
-            # Abrir configuración rápida
-            self.control.swipe(540, 10, 540, 500, duration=0.3)
-            time.sleep(1)
-            
-            # Buscar icono DND
-            frame = self._capture_screen()
-            dnd_btn = self.vision.find_element(frame, "no molestar")
-            
-            if dnd_btn.get('found'):
-                self.control.click(dnd_btn['x'], dnd_btn['y'], 1080, 1920)
-                
-                status = "activado" if enable else "desactivado"
-                self.voice.speak(f"No molestar {status}")
-                return {'success': True}
-            
-            return {'success': False}
-            
-        except Exception as e:
-            return {'success': False, 'error': str(e)}
+        """Activa/desactiva No Molestar (fija el estado, no lo alterna)"""
+        return self._apply_setting('do_not_disturb', enable, "No molestar")
     
     def _toggle_rotation(self, enable: bool) -> dict:
         """Activa/desactiva rotación automática"""
+        return self._apply_setting('rotation', enable, "Rotación automática", feminine=True)
+    
+    def apply_settings_profile(self, profile: str) -> dict:
+        """Aplica un perfil de ajustes (p.ej. 'modo cine') en una sola transacción"""
+        print(f"[⚙️] Perfil: {profile}")
+        
+        result = self.device.apply_profile(profile)
+        if result.get('success'):
+            self.voice.speak(f"{profile.capitalize()} activado")
+        else:
+            self.voice.speak(f"No pude aplicar {profile}")
+        return result
+    
+    def _apply_setting(self, name: str, value, spoken: str = None, feminine: bool = False) -> dict:
+        """Fija un ajuste de forma idempotente y lo anuncia"""
         try:
-            state = 1 if enable else 0
-            subprocess.run(
-                f'adb shell settings put system accelerometer_rotation {state}',
-                shell=True
-            )
-            
-            status = "activada" if enable else "desactivada"
-            self.voice.speak(f"Rotación automática {status}")
-            return {'success': True}
-            
+            result = self.device.set(name, value)
         except Exception as e:
             return {'success': False, 'error': str(e)}
+        
+        if result.get('success') and spoken:
+            enabled = self.device.get(name)
+            status = ("activada" if enabled else "desactivada") if feminine \
+                else ("activado" if enabled else "desactivado")
+            already = " ya estaba" if name in result.get('unchanged', []) else ""
+            self.voice.speak(f"{spoken}{already} {status}")
+        
+        return result
     
     def _parse_datetime(self, date_str: str, time_str: str):
-        """Parsea fecha y hora natural"""
-        # Implementación simple
-        # En producción usar librería como dateparser
-        
-        try:
-            # Ejemplos: "mañana", "en 2 horas", "el viernes", etc.
-            now = datetime.now()
-            
-            # Parseo simple
-            if 'mañana' in date_str.lower():
-                target_date = now + timedelta(days=1)
-            elif 'hoy' in date_str.lower():
-                target_date = now
-            else:
-                # Formato ISO
-                target_date = datetime.fromisoformat(date_str)
-            
-            # Parsear hora
-            if ':' in time_str:
-                hour, minute = map(int, time_str.split(':'))
-                target_date = target_date.replace(hour=hour, minute=minute)
-            
-            return target_date
-            
-        except:
-            return None
+        """Parsea fecha y hora natural ("el viernes", "pasado mañana", "a las 5 y media")"""
+        return parse_datetime(f"{date_str or ''} {time_str or ''}")
     
     def _execute_routine_action(self, action: str) -> dict:
         """Ejecuta una acción de rutina"""
         # Mapear string de acción a método
         # Ejemplo: "open_whatsapp" -> self.control._open_app('com.whatsapp')
         
+        if isinstance(action, dict):
+            params = action.get('params', {})
+            if action.get('action') == 'open_app':
+                action = f"open_{params.get('package') or params.get('app', '')}"
+            elif action.get('action') in ('setting', 'change_settings'):
+                return self.change_settings(params.get('setting') or params.get('name', ''),
+                                            params.get('value'))
+            elif action.get('action') == 'profile':
+                return self.apply_settings_profile(params.get('name', ''))
+            else:
+                return {'success': False}
+        
+        if action.lower() in PROFILES:
+            return self.apply_settings_profile(action)
+        
         if action.startswith('open_'):
-            app = action.replace('open_', '')
-            # Buscar package
-            for installed_app in self.installed_apps:
-                if app in installed_app['package']:
-                    self.control._open_app(installed_app['package'])
-                    return {'success': True}
+            app = self.apps.resolve(action.replace('open_', ''))
+            if app is not None:
+                return self._launch_app(app)
         
         return {'success': False}
     
+    def _launch_app(self, app) -> dict:
+        """Abre una app del catálogo por su actividad lanzadora"""
+        result = self.adb.run(self.apps.launch_command(app))
+        self._input_sent()
+        if not result.ok or 'Error' in result.output:
+            # Componente desactualizado: abrir por paquete
+            self.control._open_app(app.package)
+            self._input_sent()
+        
+        self.settle.wait_for_package(app.package)
+        return {'success': True, 'package': app.package}
+    
     def inject_screen_capture(self, screen_capture):
-        """Inyecta capturador de pantalla"""
-        self._screen_capture = screen_capture
+        """Inyecta capturador de pantalla (envuelto con versiones de frame)"""
+        self.frames = VersionedFrameSource(screen_capture)
+        self.settle.screen = self.frames
+    
+    def inject_adb_session(self, session):
+        """Inyecta sesión adb (p.ej. un dispositivo falso para pruebas)"""
+        self.adb = session
+        self.fast_paths.session = session
+        self.text_input = TextInjector(session)
+        self.contacts = ContactIndex(session)
+        self.notifications = NotificationReader(session)
+        self.device = DeviceSettings(session)
+        self.settle.session = session
+        self.apps = AppCatalog(session)
+        self.routine_compiler = RoutineCompiler(session, catalog=self.apps, device=self.device)
+    
+    def inject_locator(self, locator):
+        """Inyecta localizador de elementos compartido"""
+        self.locator = locator
+        self.settle.locator = locator
     
     def inject_core(self, core):
         """Inyecta núcleo del asistente"""
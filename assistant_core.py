@@ -6,6 +6,10 @@ from dataclasses import dataclass, asdict
 from typing import List, Dict, Any, Optional
 import pickle
 import os
+from plan_cache import PlanCache
+from step_executor import StepExecutor
+from element_locator import ElementLocator
+from confirmation import ConfirmationListener
 
 @dataclass
 class Memory:
@@ -44,6 +48,15 @@ class AssistantCore:
         self.vision = vision_api
         self.voice = voice_manager
         
+        # Búsqueda de elementos (varias descripciones por llamada)
+        self.locator = ElementLocator(vision_api)
+        
+        # Lector de notificaciones (se inyecta; sin él se usa visión)
+        self.notification_reader = None
+        
+        # Confirmaciones sí/no con decisión temprana
+        self.confirmation = ConfirmationListener(voice_manager)
+        
         # Memoria
         self.short_term_memory = deque(maxlen=100)  # Últimas 100 interacciones
         self.long_term_memory = []  # Persistente
@@ -65,6 +78,12 @@ class AssistantCore:
         # Rutinas aprendidas
         self.routines = {}  # {'morning_routine': [...], 'before_sleep': [...]}
         
+        # Planes compilados (execution_steps reutilizables)
+        self.plan_cache = PlanCache()
+        
+        # Ejecutor de pasos con dependencias y timeline
+        self.step_executor = StepExecutor(self)
+        
         # Personalidad del asistente
         self.personality = {
             'name': 'Atlas',  # Nombre personalizable
@@ -78,9 +97,11 @@ class AssistantCore:
         
         print(f"[🧠] {self.personality['name']} inicializado")
     
-    def understand_intent(self, user_input: str, frame=None) -> Dict:
+    def understand_intent(self, user_input: str, frame=None, remember: bool = True) -> Dict:
         """
         Entiende la intención del usuario con contexto completo
+        Con remember=False no guarda nada en memoria (lo hace quien llama con
+        remember_interaction si el turno sigue siendo válido)
         """
         # Construir contexto enriquecido
         context_info = self._build_rich_context(frame)
@@ -98,6 +119,10 @@ CONTEXTO ACTUAL:
 PREFERENCIAS DEL USUARIO:
 {json.dumps(self._get_relevant_preferences(), indent=2)}
 
+PLANES COMPILADOS (intent|action|parámetros):
+{json.dumps(self.plan_cache.known_plans(), ensure_ascii=False)}
+Si el comando corresponde a uno de estos planes con exactamente esos parámetros, deja "execution_steps" vacío: el plan se reutiliza.
+
 COMANDO DEL USUARIO: "{user_input}"
 
 Analiza el comando y responde en JSON:
@@ -141,12 +166,8 @@ Sé conversacional, natural y proactivo. Si detectas que el usuario está hacien
             
             intent_data = json.loads(response)
             
-            # Guardar en memoria
-            self._store_interaction(user_input, intent_data)
-            
-            # Aprender si es necesario
-            if intent_data.get('learn_from_this'):
-                self._learn_from_interaction(user_input, intent_data)
+            if remember:
+                self.remember_interaction(user_input, intent_data)
             
             return intent_data
             
@@ -154,6 +175,13 @@ Sé conversacional, natural y proactivo. Si detectas que el usuario está hacien
             print(f"[!] Error entendiendo intent: {e}")
             return self._fallback_intent(user_input)
     
+    def remember_interaction(self, user_input: str, intent_data: Dict):
+        """Guarda la interacción en memoria y aprende si el intent lo pide"""
+        self._store_interaction(user_input, intent_data)
+        
+        if intent_data.get('learn_from_this'):
+            self._learn_from_interaction(user_input, intent_data)
+    
     def execute_intent(self, intent_data: Dict, control_system) -> Dict:
         """
         Ejecuta la intención entendida
@@ -177,18 +205,30 @@ Sé conversacional, natural y proactivo. Si detectas que el usuario está hacien
                 self.voice.speak("Entendido, cancelado")
                 return {'success': False, 'reason': 'user_cancelled'}
         
-        # Ejecutar pasos
-        results = []
-        for step in steps:
-            result = self._execute_step(step, control_system)
-            results.append(result)
-            
-            if not result.get('success'):
-                self.voice.speak(f"Hubo un problema: {result.get('error')}")
-                return {'success': False, 'results': results}
-            
-            # Pausa entre acciones para naturalidad
-            time.sleep(0.5)
+        # Reutilizar plan compilado si el LLM no generó pasos
+        template_key = None
+        if not steps:
+            compiled = self.plan_cache.lookup(intent_data)
+            if compiled:
+                template_key, steps = compiled
+                print(f"[⚡] Reutilizando plan compilado: {template_key}")
+        
+        # Ejecutar pasos (búsquedas solapadas y esperas por condición)
+        execution = self.step_executor.run(steps, control_system)
+        results = execution['results']
+        
+        if not execution['success']:
+            if template_key:
+                self.plan_cache.record_result(template_key, False)
+            error = results[-1].get('error') if results else None
+            self.voice.speak(f"Hubo un problema: {error}")
+            return {'success': False, 'results': results, 'timeline': execution['timeline']}
+        
+        # Compilar plan exitoso para la próxima vez
+        if template_key:
+            self.plan_cache.record_result(template_key, True)
+        elif steps:
+            self.plan_cache.compile(intent_data, steps)
         
         # Actualizar contexto
         if 'context_updates' in intent_data:
@@ -198,7 +238,7 @@ Sé conversacional, natural y proactivo. Si detectas que el usuario está hacien
         if intent_data.get('follow_up_suggestions'):
             self._suggest_follow_ups(intent_data['follow_up_suggestions'])
         
-        return {'success': True, 'results': results}
+        return {'success': True, 'results': results, 'timeline': execution['timeline']}
     
     def learn_preference(self, key: str, value: Any, source: str = 'implicit'):
         """Aprende una preferencia del usuario"""
@@ -314,14 +354,20 @@ Sé conversacional, natural y proactivo. Si detectas que el usuario está hacien
                 relevant[key] = pref.value
         return relevant
     
-    def _execute_step(self, step: Dict, control_system) -> Dict:
-        """Ejecuta un paso individual"""
+    def _execute_step(self, step: Dict, control_system, element: Optional[Dict] = None) -> Dict:
+        """Ejecuta un paso individual (element: búsqueda ya resuelta)"""
         action_type = step.get('action')
         params = step.get('params', {})
         
         try:
             if action_type == 'open_app':
-                control_system.control._open_app(params['package'])
+                package = params.get('package')
+                capabilities = getattr(control_system, 'capabilities', None)
+                if not package and capabilities is not None:
+                    # "abre Spotify": resolver la etiqueta con el catálogo
+                    app = capabilities.apps.resolve(params.get('app', ''))
+                    package = app.package if app else None
+                control_system.control._open_app(package or params['package'])
                 
             elif action_type == 'click':
                 x, y = params.get('x'), params.get('y')
@@ -329,18 +375,19 @@ Sé conversacional, natural y proactivo. Si detectas que el usuario está hacien
                     control_system.control.click(x, y, 1080, 1920)
                 else:
                     # Buscar elemento
-                    frame = control_system.screen.get_frame()
-                    element = control_system.vision.find_element(
-                        frame, 
-                        params.get('description')
-                    )
+                    if element is None:
+                        element, _ = self._locate_step_target(step, control_system)
                     if element.get('found'):
                         control_system.control.click(
                             element['x'], element['y'], 1080, 1920
                         )
             
             elif action_type == 'type':
-                control_system.control._type_text(params['text'])
+                capabilities = getattr(control_system, 'capabilities', None)
+                if capabilities is not None:
+                    capabilities._type_text(params['text'])
+                else:
+                    control_system.control._type_text(params['text'])
             
             elif action_type == 'wait':
                 time.sleep(params.get('seconds', 1))
@@ -359,6 +406,25 @@ Sé conversacional, natural y proactivo. Si detectas que el usuario está hacien
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def _locate_step_target(self, step: Dict, control_system) -> tuple:
+        """Busca el elemento de un paso (solo lectura); retorna (elemento, frame)"""
+        description = step.get('params', {}).get('description')
+        elements, frame = self._locate_step_targets([description], control_system)
+        return elements[description], frame
+    
+    def _locate_step_targets(self, descriptions: List[str], control_system) -> tuple:
+        """Busca varios elementos sobre el mismo frame en una llamada"""
+        frame = control_system.screen.get_frame()
+        return self.locator.find_elements(frame, descriptions), frame
+    
+    def inject_locator(self, locator):
+        """Inyecta localizador de elementos compartido"""
+        self.locator = locator
+    
+    def inject_notification_reader(self, reader):
+        """Inyecta lector de notificaciones"""
+        self.notification_reader = reader
+    
     def _store_interaction(self, user_input: str, intent_data: Dict):
         """Guarda interacción en memoria"""
         memory = Memory(
@@ -460,7 +526,8 @@ Sé conversacional, natural y proactivo. Si detectas que el usuario está hacien
             'long_term_memory': [asdict(m) for m in self.long_term_memory],
             'preferences': {k: asdict(v) for k, v in self.preferences.items()},
             'routines': self.routines,
-            'personality': self.personality
+            'personality': self.personality,
+            'plan_templates': self.plan_cache.to_dict()
         }
         
         with open('assistant_memory.pkl', 'wb') as f:
@@ -477,6 +544,7 @@ Sé conversacional, natural y proactivo. Si detectas que el usuario está hacien
                 self.preferences = {k: UserPreference(**v) for k, v in data.get('preferences', {}).items()}
                 self.routines = data.get('routines', {})
                 self.personality.update(data.get('personality', {}))
+                self.plan_cache.load_dict(data.get('plan_templates', {}))
                 
                 print(f"[💾] Memoria cargada: {len(self.long_term_memory)} recuerdos")
             except:
@@ -495,14 +563,7 @@ Sé conversacional, natural y proactivo. Si detectas que el usuario está hacien
     def _ask_confirmation(self, intent_data: Dict) -> bool:
         """Pide confirmación al usuario"""
         action = intent_data.get('action')
-        self.voice.speak(f"¿Confirmas que quieres {action}? Di sí o no")
-        
-        # Esperar respuesta
-        response = self.voice.listen_once()
-        if response:
-            return any(word in response.lower() for word in ['sí', 'si', 'yes', 'confirmo', 'ok'])
-        
-        return False
+        return self.confirmation.ask(f"¿Confirmas que quieres {action}? Di sí o no")
     
     def _suggest_follow_ups(self, suggestions: List[str]):
         """Sugiere acciones de seguimiento"""
@@ -514,6 +575,19 @@ Sé conversacional, natural y proactivo. Si detectas que el usuario está hacien
     
     def _context_aware_suggestion(self, frame) -> Optional[str]:
         """Sugerencia basada en lo que ve en pantalla"""
+        # Con lector de notificaciones no hace falta mirar la pantalla
+        if self.notification_reader is not None:
+            messages = self.notification_reader.messages(only_unread=True)
+            if messages:
+                senders = sorted({m.title for m in messages if m.title})[:3]
+                origin = f" de {', '.join(senders)}" if senders else ""
+                return f"Tienes {len(messages)} mensajes sin leer{origin}. ¿Los reviso?"
+            
+            if self.notification_reader.unread(mark=False):
+                return "Hay notificaciones pendientes"
+            
+            return None
+        
         # Analizar pantalla
         analysis = self.vision.detect_all_interactive_elements(frame)
         context = analysis.get('screen_context', '')
@@ -0,0 +1,403 @@
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from confirmation import classify
+from conversation_manager import ConversationManager, ConversationState
+
+# Fases de un turno que ya no se cancelan aunque llegue otra orden
+_PROTECTED_PHASES = ('queued', 'executing')
+
+
+class AsyncConversationManager(ConversationManager):
+    """
+    Gestor de conversación dirigido por eventos (asyncio)
+    Las frases del reconocimiento entran con submit() sin bloquear al que
+    escucha; cada orden es un turno (tarea) que piensa, pregunta, habla y
+    actúa por su cuenta. Una orden nueva corta lo que se está diciendo
+    (barge-in) y cancela los turnos que aún estaban pensando; las
+    acciones sobre el dispositivo se ejecutan de una en una y nunca se
+    interrumpen a medias. Reutiliza los ayudantes del gestor síncrono.
+    """
+
+    def __init__(self, assistant_core, voice_manager, answer_timeout: float = 8.0):
+        super().__init__(assistant_core, voice_manager)
+        self.answer_timeout = answer_timeout
+
+        # Escucha bajo demanda para respuestas (modo palabra de activación)
+        self.answer_listener: Optional[Callable[[], str]] = None
+        # Resultado de cada orden: (texto, resultado)
+        self.on_result: Optional[Callable[[str, dict], None]] = None
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._execution_lock: Optional[asyncio.Lock] = None
+        self._answer: Optional[asyncio.Future] = None
+        self._turns: Dict[asyncio.Task, str] = {}  # tarea -> fase
+        self._speaking = 0
+
+        # Estadísticas
+        self.turns_started = 0
+        self.turns_completed = 0
+        self.stale_cancelled = 0
+        self.barge_ins = 0
+        self.total_turn_time = 0.0
+
+    # ===== BUCLE DE EVENTOS =====
+
+    def start(self):
+        """Arranca el bucle de eventos en su propio hilo"""
+        if self._loop is not None:
+            return
+
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._execution_lock = asyncio.Lock()
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True, name='conversation-loop')
+        self._thread.start()
+        ready.wait()
+
+    def stop(self):
+        if self._loop is None:
+            return
+
+        def shutdown():
+            for task in list(self._turns):
+                task.cancel()
+            self._loop.stop()
+
+        self._loop.call_soon_threadsafe(shutdown)
+        self._thread.join(timeout=2.0)
+        self._loop = None
+
+    def submit(self, user_input: str, frame=None):
+        """Entrega una frase reconocida (desde cualquier hilo, sin esperar)"""
+        self.start()
+        self._loop.call_soon_threadsafe(self._on_utterance, user_input, frame, time.time())
+
+    def process_user_input(self, user_input: str, frame=None) -> dict:
+        """Compatibilidad con el gestor síncrono: encola la frase y retorna"""
+        self.submit(user_input, frame)
+        return {'success': True, 'queued': True}
+
+    def _on_utterance(self, user_input: str, frame, received: float):
+        """Evento de reconocimiento: respuesta pendiente o turno nuevo"""
+        print(f"\n[👤] Usuario: {user_input}")
+        self._add_turn('user', user_input)
+
+        # Respuesta a la pregunta que espera un turno (aunque aún se esté formulando)
+        if self._answer is not None and not self._answer.done():
+            if self._speaking:
+                self._stop_speech()
+            self._answer.set_result(user_input)
+            return
+
+        # Barge-in: la orden nueva corta lo que se estaba diciendo
+        if self._speaking:
+            self.barge_ins += 1
+            self._stop_speech()
+
+        # Lo que aún se estaba pensando ya no vale
+        for task, phase in list(self._turns.items()):
+            if phase not in _PROTECTED_PHASES and not task.done():
+                task.cancel()
+                self.stale_cancelled += 1
+
+        task = self._loop.create_task(self._run_turn(user_input, frame, received))
+        self._turns[task] = 'thinking'
+        task.add_done_callback(lambda t: self._turns.pop(t, None))
+
+    # ===== HABLAR Y ESCUCHAR =====
+
+    async def say_async(self, message: str, emotion: str = 'neutral'):
+        """Habla sin bloquear el bucle (se puede cortar con barge-in)"""
+        print(f"[🤖] {self.core.personality['name']}: {message}")
+
+        message = self._styled(message, emotion)
+        self._add_turn('assistant', message)
+
+        speech = self._speech()
+        self._speaking += 1
+        try:
+            if speech is not None:
+                await asyncio.to_thread(speech.speak, message)
+            else:
+                await asyncio.to_thread(self.voice.speak, message)
+        finally:
+            self._speaking -= 1
+
+    async def ask_async(self, question: str, options: List[str] = None) -> str:
+        """Pregunta y espera la siguiente frase del usuario ('' si no contesta)"""
+        answer = self._expect_answer()
+        await self.say_async(self._question_text(question, options), emotion='curious')
+        return await self._await_answer(answer)
+
+    async def confirm_async(self, action_description: str) -> bool:
+        """Confirmación sí/no sobre la siguiente frase del usuario"""
+        self._change_state(ConversationState.WAITING_CONFIRMATION)
+        prompt = f"Voy a {action_description}. ¿Está bien?"
+
+        for attempt in range(self.confirmation.max_attempts):
+            answer = self._expect_answer()
+            await self.say_async(prompt)
+            text = await self._await_answer(answer)
+            decision = classify(text)
+            if decision is not None:
+                return decision
+            if not text:
+                return False
+            prompt = "No estoy seguro. ¿Es un sí o un no?"
+        return False
+
+    def _expect_answer(self) -> asyncio.Future:
+        """La próxima frase será una respuesta (también si llega mientras se pregunta)"""
+        self._set_phase('waiting')
+        self._answer = self._loop.create_future()
+        return self._answer
+
+    async def _await_answer(self, answer: asyncio.Future) -> str:
+        self._change_state(ConversationState.LISTENING)
+        if answer.done():
+            self._answer = None
+            self._set_phase('thinking')
+            return answer.result()
+
+        # Sin escucha continua: abrir el micrófono solo para esta respuesta
+        if self.answer_listener is not None:
+            listening = asyncio.ensure_future(asyncio.to_thread(self.answer_listener))
+            listening.add_done_callback(self._on_listened)
+
+        try:
+            return await asyncio.wait_for(answer, self.answer_timeout)
+        except asyncio.TimeoutError:
+            return ''
+        finally:
+            if self._answer is answer:
+                self._answer = None
+            self._set_phase('thinking')
+
+    def _on_listened(self, listening: asyncio.Future):
+        try:
+            text = listening.result()
+        except Exception as e:
+            print(f"[!] Error escuchando respuesta: {e}")
+            return
+        if text:
+            self._on_utterance(text, None, time.time())
+
+    # ===== TURNOS =====
+
+    async def _run_turn(self, user_input: str, frame, received: float) -> dict:
+        self.turns_started += 1
+        try:
+            result = await self._handle_command_async(user_input, frame)
+        except asyncio.CancelledError:
+            print(f"[⏭️] Turno descartado: '{user_input[:40]}'")
+            raise
+        except Exception as e:
+            print(f"[!] Error en el turno: {e}")
+            result = {'success': False, 'reason': str(e)}
+            self._change_state(ConversationState.IDLE)
+
+        self.turns_completed += 1
+        self.total_turn_time += time.time() - received
+        if self.on_result:
+            self.on_result(user_input, result)
+        return result
+
+    async def _handle_command_async(self, user_input: str, frame) -> dict:
+        self._change_state(ConversationState.PROCESSING)
+
+        # Comandos conocidos con todos sus datos: sin pasar por el modelo
+        # Puede consultar contactos por adb (la primera vez, la lista entera): fuera del bucle
+        local_intent = await asyncio.to_thread(self.slots.parse_command, user_input)
+        if local_intent and not self._missing_params(local_intent):
+            if self._runs_locally(local_intent) and \
+                    await self._resolve_contact_async(local_intent['parameters']):
+                result = await self._execute_async(local_intent, local_only=True)
+                if result is not None:
+                    # Sin el modelo no pasa por understand_intent: guardar aquí en memoria
+                    self.core._store_interaction(user_input, local_intent)
+                    return result
+
+        intent = await self._understand(user_input, frame)
+
+        # Aclaración: una pregunta y se vuelve a entender (sin recursión)
+        if intent['confidence'] < 0.6 or intent['intent'] == 'ambiguous':
+            self._change_state(ConversationState.CLARIFYING)
+            answer = await self.ask_async(self._generate_clarification_question(intent))
+            if not answer:
+                self._change_state(ConversationState.IDLE)
+                return {'success': False, 'reason': 'no_response'}
+
+            refined = self._refine_intent_with_clarification(intent, answer)
+            self._change_state(ConversationState.PROCESSING)
+            intent = await self._understand(refined.get('refined_input', answer), frame)
+
+        # Datos que faltan: preguntarlos uno a uno
+        if self._is_multi_turn_command(intent):
+            ready = await self._collect_params(intent, user_input)
+        else:
+            # Contacto resuelto aquí: en el hilo de ejecución no se puede preguntar
+            ready = await self._resolve_contact_async(intent.setdefault('parameters', {}))
+        if not ready:
+            self._change_state(ConversationState.IDLE)
+            return {'success': False, 'reason': 'no_response'}
+
+        return await self._execute_async(intent)
+
+    async def _understand(self, user_input: str, frame) -> dict:
+        """
+        Intent del modelo; se guarda en memoria solo si el turno sigue vivo
+        (cancelado mientras pensaba, el await lanza CancelledError y no llega)
+        """
+        intent = await asyncio.to_thread(self.core.understand_intent, user_input, frame, False)
+        self.core.remember_interaction(user_input, intent)
+        return intent
+
+    async def _collect_params(self, intent: dict, user_input: str) -> bool:
+        """Multi-turno: rellena los parámetros que faltan preguntando"""
+        self._change_state(ConversationState.MULTI_TURN)
+        action = intent.get('action')
+        params = intent.setdefault('parameters', {})
+        for key, value in (await asyncio.to_thread(self.slots.extract, action, user_input)).items():
+            params.setdefault(key, value)
+
+        if not await self._resolve_contact_async(params):
+            return False
+
+        for step in self._plan_multi_turn_steps(intent):
+            if params.get(step['key']):
+                continue  # ya llegó en otra respuesta
+
+            answer = await self.ask_async(step['question'])
+            self._change_state(ConversationState.MULTI_TURN)
+            if not answer:
+                return False
+
+            params[step['key']] = await asyncio.to_thread(self.slots.answer, step['key'], answer)
+            for key, value in (await asyncio.to_thread(self.slots.extract, action, answer)).items():
+                params.setdefault(key, value)
+
+            if step['key'] == 'contact' and not await self._resolve_contact_async(params):
+                return False
+        return True
+
+    async def _resolve_contact_async(self, params: dict) -> bool:
+        """Como _resolve_contact, pero la pregunta no bloquea el bucle"""
+        if self.contacts is None or not params.get('contact') or 'number' in params:
+            return True
+
+        for _ in range(2):
+            match = await asyncio.to_thread(self.contacts.resolve, params['contact'])
+            if match is None:
+                return True
+
+            if not match['ambiguous']:
+                params['contact'] = match['name']
+                params['number'] = match['number']
+                return True
+
+            options = match['candidates']
+            answer = await self.ask_async(f"¿Te refieres a {', '.join(options[:-1])} o {options[-1]}?")
+            if not answer:
+                return False
+            params['contact'] = await asyncio.to_thread(self.slots.answer, 'contact', answer)
+
+        return False
+
+    async def _execute_async(self, intent: dict, local_only: bool = False) -> Optional[dict]:
+        """
+        Ejecuta el intent (una acción a la vez) mientras se dice la respuesta
+        Con local_only retorna None si no hay capacidad local para la acción.
+        El contacto ya viene resuelto: en el hilo de ejecución no se pregunta
+        """
+        intent = dict(intent)
+        response = intent.pop('suggested_response', None)
+        if local_only and not self._runs_locally(intent):
+            return None
+
+        # Confirmación antes de tocar el dispositivo (el núcleo ya no la pide);
+        # mensajes y llamadas siempre
+        if self._needs_confirmation(intent):
+            if not await self.confirm_async(self._describe_action(intent, fallback=response)):
+                await self.say_async("Entendido, no lo haré")
+                self._change_state(ConversationState.IDLE)
+                return {'success': False, 'reason': 'user_cancelled'}
+            intent['requires_confirmation'] = False
+
+        self._set_phase('queued')
+        async with self._execution_lock:
+            self._set_phase('executing')
+            self._change_state(ConversationState.EXECUTING)
+
+            speaking = self._loop.create_task(self.say_async(response)) if response else None
+            result, by_core = None, False
+            try:
+                if local_only or not intent.get('execution_steps'):
+                    result = await asyncio.to_thread(self._run_local_action, intent)
+                if result is None and not local_only:
+                    by_core = True
+                    result = await asyncio.to_thread(self.core.execute_intent, intent,
+                                                     self._get_control_system())
+            finally:
+                if speaking is not None:
+                    await speaking
+
+        if result is None:
+            self._set_phase('thinking')
+            return None
+
+        await self._report_async(result, already_reported=by_core)
+        return result
+
+    async def _report_async(self, result: dict, already_reported: bool = False):
+        """Feedback final; el núcleo ya anuncia sus propios fallos"""
+        if result['success']:
+            await self.say_async("Listo", emotion='neutral')
+        else:
+            reason = result.get('reason') or result.get('error')
+            if reason and not already_reported:
+                await self.say_async(f"Hubo un problema: {reason}", emotion='apologetic')
+        self._change_state(ConversationState.IDLE)
+
+    # ===== UTILIDADES PRIVADAS =====
+
+    def _set_phase(self, phase: str):
+        task = asyncio.current_task()
+        if task in self._turns:
+            self._turns[task] = phase
+
+    def _speech(self):
+        """Lector por fragmentos de las capacidades (cancelable), si lo hay"""
+        capabilities = getattr(self._get_control_system(), 'capabilities', None)
+        return getattr(capabilities, 'speech', None)
+
+    def _stop_speech(self):
+        speech = self._speech()
+        if speech is not None:
+            speech.cancel()
+            return
+        stop = getattr(self.voice, 'stop', None)
+        if callable(stop):
+            try:
+                stop()
+            except Exception:
+                pass
+
+    def get_statistics(self) -> Dict:
+        return {
+            'turns_started': self.turns_started,
+            'turns_completed': self.turns_completed,
+            'stale_cancelled': self.stale_cancelled,
+            'barge_ins': self.barge_ins,
+            'avg_turn_ms': (self.total_turn_time / self.turns_completed * 1000)
+            if self.turns_completed else 0.0
+        }
@@ -0,0 +1,206 @@
+import queue
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ui_hierarchy import normalize
+
+# Palabras sueltas y frases (ya normalizadas: sin tildes, minúsculas)
+AFFIRMATIVE_WORDS = {'si', 'yes', 'ok', 'okay', 'vale', 'dale', 'confirmo', 'adelante',
+                     'hazlo', 'claro', 'correcto', 'exacto', 'venga', 'afirmativo', 'perfecto'}
+AFFIRMATIVE_PHRASES = ['por supuesto', 'de acuerdo', 'por favor', 'esta bien', 'eso es']
+NEGATIVE_WORDS = {'no', 'nope', 'cancela', 'cancelar', 'espera', 'detente',
+                  'negativo', 'nunca', 'tampoco'}
+NEGATIVE_PHRASES = ['mejor no', 'ni hablar', 'dejalo', 'no lo hagas']
+
+_PHRASES = [(p, True) for p in AFFIRMATIVE_PHRASES] + [(p, False) for p in NEGATIVE_PHRASES]
+
+# Afirmativos que a menudo abren una negativa ("claro que no", "por favor no")
+WEAK_AFFIRMATIVES = {'claro', 'perfecto', 'por favor', 'por supuesto'}
+
+_END = object()
+
+
+def classify(text: str) -> Optional[bool]:
+    """
+    True (sí), False (no) o None (ambiguo)
+    Decide el primer término decisivo por posición, por palabras completas
+    ("así" no cuenta como "sí", "nota" no cuenta como "no"). Un afirmativo
+    seguido de negación ("claro que no", "por favor no") es un no.
+    """
+    return _decide(normalize(text or '').split())[0]
+
+
+def _first_term(tokens: List[str]) -> Optional[Tuple[int, int, bool, str]]:
+    """Primer término decisivo: (inicio, fin exclusivo, valor, término)"""
+    joined = ' '.join(tokens)
+    first = None
+
+    for phrase, value in _PHRASES:
+        match = re.search(rf'(^| ){re.escape(phrase)}( |$)', joined)
+        if match:
+            position = joined[:match.start()].count(' ') + (1 if match.start() else 0)
+            if first is None or position < first[0]:
+                first = (position, position + len(phrase.split()), value, phrase)
+
+    for position, token in enumerate(tokens[:first[0] if first else len(tokens)]):
+        if token in AFFIRMATIVE_WORDS:
+            return position, position + 1, True, token
+        if token in NEGATIVE_WORDS:
+            return position, position + 1, False, token
+
+    return first
+
+
+def _decide(tokens: List[str]) -> Tuple[Optional[bool], bool, bool]:
+    """
+    (decisión, definitiva, pendiente)
+    Definitiva: lo que venga después ya no puede cambiarla. Pendiente: un
+    afirmativo que aún podría convertirse en negativa (débil sin nada
+    detrás, o seguido de un "que" sin completar)
+    """
+    term = _first_term(tokens)
+    if term is None:
+        return None, False, False
+
+    _, end, value, word = term
+    if not value:
+        return False, end < len(tokens), False
+
+    after = tokens[end:]
+    if after[:1] == ['que']:
+        after = after[1:]
+        if not after:
+            return True, False, True
+    if not after:
+        return True, False, word in WEAK_AFFIRMATIVES
+    if after[0] in NEGATIVE_WORDS:
+        return False, len(after) > 1, False
+    return True, True, False
+
+
+class ConfirmationListener:
+    """
+    Escucha de respuestas sí/no con decisión temprana
+    Si el gestor de voz ofrece transcripciones parciales (listen_stream),
+    decide en cuanto aparece un término afirmativo o negativo estable:
+    seguido de otra palabra que ya no lo cambia o repetido en varios
+    parciales seguidos ("claro" o "claro que" esperan: pueden acabar en
+    "no"). Si no llegan parciales nuevos en endpoint_timeout se cierra
+    con lo que haya. Sin streaming usa listen_once. Los reintentos son un bucle.
+    """
+
+    def __init__(self, voice, stable_partials: int = 2, endpoint_timeout: float = 0.8,
+                 max_wait: float = 6.0, max_attempts: int = 2):
+        self.voice = voice
+        self.stable_partials = stable_partials
+        self.endpoint_timeout = endpoint_timeout
+        self.max_wait = max_wait
+        self.max_attempts = max_attempts
+
+        # Estadísticas
+        self.decisions = 0
+        self.early_decisions = 0
+        self.total_latency = 0.0
+
+    @property
+    def streaming(self) -> bool:
+        return callable(getattr(self.voice, 'listen_stream', None))
+
+    # ===== API PÚBLICA =====
+
+    def ask(self, prompt: str, say: Optional[Callable[[str], None]] = None,
+            retry_prompt: str = "No estoy seguro. ¿Es un sí o un no?",
+            on_response: Optional[Callable[[str], None]] = None) -> bool:
+        """Pregunta y espera un sí/no; False si no hay respuesta clara"""
+        say = say or self.voice.speak
+        say(prompt)
+
+        for attempt in range(self.max_attempts):
+            decision, text = self.listen()
+            if text and on_response:
+                on_response(text)
+            if decision is not None:
+                return decision
+            if not text:
+                return False
+            if attempt + 1 < self.max_attempts:
+                say(retry_prompt)
+        return False
+
+    def listen(self):
+        """Una escucha: (decisión o None, texto oído)"""
+        start = time.time()
+        if self.streaming:
+            decision, text, early = self._listen_streaming()
+        else:
+            text = self.voice.listen_once() or ''
+            decision, early = classify(text), False
+
+        if decision is not None:
+            self.decisions += 1
+            self.early_decisions += int(early)
+            self.total_latency += time.time() - start
+        return decision, text
+
+    def get_statistics(self) -> Dict:
+        return {
+            'decisions': self.decisions,
+            'early_decisions': self.early_decisions,
+            'avg_latency_ms': (self.total_latency / self.decisions * 1000) if self.decisions else 0.0
+        }
+
+    # ===== UTILIDADES PRIVADAS =====
+
+    def _listen_streaming(self):
+        """Consume parciales en otro hilo; decide en cuanto son estables"""
+        partials: queue.Queue = queue.Queue()
+        stream = self.voice.listen_stream()
+
+        def pump():
+            try:
+                for partial in stream:
+                    partials.put(partial)
+            except Exception as e:
+                print(f"[!] Error en transcripción parcial: {e}")
+            finally:
+                partials.put(_END)
+
+        threading.Thread(target=pump, daemon=True, name='confirmation-stream').start()
+
+        deadline = time.time() + self.max_wait
+        text, last_decision, repeats = '', None, 0
+        heard = False
+
+        try:
+            while time.time() < deadline:
+                # Antes de oír nada se espera hasta max_wait; luego, endpointing
+                timeout = self.endpoint_timeout if heard else deadline - time.time()
+                try:
+                    partial = partials.get(timeout=max(0.01, timeout))
+                except queue.Empty:
+                    break
+                if partial is _END:
+                    break
+
+                text, heard = partial or text, True
+                decision, settled, pending = _decide(normalize(text).split())
+                repeats = repeats + 1 if decision is not None and decision == last_decision else 1
+                last_decision = decision
+                if decision is None:
+                    continue
+
+                # Un afirmativo que aún puede negarse ("claro", "claro que") espera al final
+                if settled or (repeats >= self.stable_partials and not pending):
+                    return decision, text, True
+        finally:
+            # Cortar la transcripción en cuanto hay decisión
+            close = getattr(stream, 'close', None)
+            if callable(close):
+                try:
+                    close()
+                except Exception:
+                    pass
+
+        return classify(text), text, False
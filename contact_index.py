@@ -0,0 +1,300 @@
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Dict, List, Optional, Set
+
+from ui_hierarchy import normalize
+
+PHONES_URI = 'content://com.android.contacts/data/phones'
+DELETED_URI = 'content://com.android.contacts/deleted_contacts'
+PHONE_COLUMNS = ['contact_id', 'display_name', 'data1', 'data2', 'contact_last_updated_timestamp']
+PHONE_TYPE_MOBILE = '2'
+
+# Hipocorísticos habituales -> nombre completo
+NICKNAMES = {
+    'pepe': 'jose', 'pepa': 'josefa', 'paco': 'francisco', 'pancho': 'francisco',
+    'curro': 'francisco', 'quico': 'francisco', 'lola': 'dolores', 'loli': 'dolores',
+    'pili': 'pilar', 'nacho': 'ignacio', 'manolo': 'manuel', 'manu': 'manuel',
+    'concha': 'concepcion', 'conchi': 'concepcion', 'chema': 'jose maria',
+    'quique': 'enrique', 'charo': 'rosario', 'lupe': 'guadalupe', 'memo': 'guillermo',
+    'tono': 'antonio', 'toni': 'antonio', 'rafa': 'rafael', 'alex': 'alejandro',
+    'fer': 'fernando', 'dani': 'daniel', 'javi': 'javier', 'edu': 'eduardo',
+    'santi': 'santiago', 'juanma': 'juan manuel', 'mari': 'maria', 'tere': 'teresa',
+    'chus': 'jesus', 'chucho': 'jesus', 'isa': 'isabel', 'bea': 'beatriz',
+    'vicky': 'victoria', 'nando': 'fernando', 'lalo': 'eduardo', 'beto': 'alberto',
+    'guille': 'guillermo', 'migue': 'miguel', 'sergi': 'sergio', 'cris': 'cristina',
+    'rocio': 'rocio', 'maite': 'maria teresa', 'marisa': 'maria luisa',
+}
+
+# Palabras de la petición que no forman parte del nombre
+FILLER = {'a', 'al', 'la', 'el', 'de', 'mi', 'con', 'contacto', 'numero', 'telefono'}
+
+
+@lru_cache(maxsize=4096)
+def phonetic_key(token: str) -> str:
+    """
+    Clave fonética para español (seseo/yeísmo incluidos)
+    'Jiménez' y 'Giménez', 'Vázquez' y 'Básquez' comparten clave
+    """
+    t = normalize(token).replace(' ', '')
+    rules = [
+        (r'ch', '0'),            # conservar 'ch' antes de quitar haches
+        (r'h', ''),
+        (r'0', 'ch'),
+        (r'qu', 'k'), (r'c(?=[aou])', 'k'), (r'c(?=[ei])', 's'), (r'c$', 'k'),
+        (r'gu(?=[ei])', 'g'), (r'g(?=[ei])', 'j'),
+        (r'z', 's'), (r'v', 'b'), (r'w', 'u'), (r'x', 'ks'),
+        (r'll', 'y'), (r'i(?=[aeou])', 'y'),
+        (r'(.)\1+', r'\1'),
+    ]
+    for pattern, replacement in rules:
+        t = re.sub(pattern, replacement, t)
+    return t
+
+
+@dataclass
+class Contact:
+    """Contacto con sus teléfonos y claves de búsqueda"""
+    contact_id: str
+    name: str
+    numbers: List[str] = field(default_factory=list)
+    mobile: Optional[str] = None
+    updated: int = 0
+
+    @property
+    def tokens(self) -> List[str]:
+        return normalize(self.name).split()
+
+    @property
+    def number(self) -> Optional[str]:
+        """Teléfono preferido (móvil si lo hay)"""
+        return self.mobile or (self.numbers[0] if self.numbers else None)
+
+
+class ContactIndex:
+    """
+    Índice local de contactos del teléfono
+    Se construye con 'content query' por ADB y se actualiza de forma
+    incremental (solo contactos modificados/borrados desde la última vez).
+    Resuelve nombres hablados (apodos, acentos, errores de transcripción)
+    a un número sin tocar la UI.
+    """
+
+    def __init__(self, session, refresh_interval: float = 300.0, min_score: float = 0.75):
+        self.session = session
+        self.refresh_interval = refresh_interval
+        self.min_score = min_score
+
+        self.contacts: Dict[str, Contact] = {}
+        self._by_token: Dict[str, Set[str]] = {}
+        self._by_phonetic: Dict[str, Set[str]] = {}
+
+        self._last_timestamp = 0
+        self._last_refresh = 0.0
+        self._refreshing = threading.Lock()
+        self._swap = threading.Lock()  # contactos + índices se cambian juntos
+
+        # Estadísticas
+        self.lookups = 0
+        self.resolved = 0
+        self.refreshes = 0
+
+    # ===== RESOLUCIÓN =====
+
+    def resolve(self, spoken_name: str) -> Optional[Dict]:
+        """
+        Nombre hablado -> contacto
+        Retorna {'name', 'number', 'score', 'ambiguous', 'candidates'} o None
+        """
+        self.lookups += 1
+        self._ensure_fresh()
+
+        query = [t for t in normalize(spoken_name).split() if t not in FILLER]
+        with self._swap:
+            # Instantánea: un refresco en segundo plano sustituye, no modifica
+            contacts, by_token, by_phonetic = self.contacts, self._by_token, self._by_phonetic
+        if not query or not contacts:
+            return None
+
+        expanded = []
+        for token in query:
+            expanded.extend(NICKNAMES.get(token, token).split())
+
+        scored = []
+        for contact_id in self._candidates(expanded, by_token, by_phonetic):
+            contact = contacts[contact_id]
+            if contact.number:
+                scored.append((self._score(expanded, contact), contact))
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        if not scored or scored[0][0] < self.min_score:
+            return None
+
+        best_score, best = scored[0]
+        close = [c for s, c in scored[1:4] if best_score - s < 0.05 and c.name != best.name]
+
+        self.resolved += 1
+        return {
+            'name': best.name,
+            'number': best.number,
+            'score': round(best_score, 2),
+            'ambiguous': bool(close),
+            'candidates': [best.name] + [c.name for c in close]
+        }
+
+    def number_for(self, spoken_name: str) -> Optional[str]:
+        """Número si la resolución es única y fiable"""
+        match = self.resolve(spoken_name)
+        if match and not match['ambiguous']:
+            return match['number']
+        return None
+
+    # ===== ACTUALIZACIÓN =====
+
+    def refresh(self, full: bool = False) -> int:
+        """Carga contactos nuevos/modificados (todos si full). Retorna cuántos cambiaron"""
+        with self._refreshing:
+            since = 0 if full or not self.contacts else self._last_timestamp
+            where = f' --where "contact_last_updated_timestamp>{since}"' if since else ''
+
+            try:
+                commands = [f"content query --uri {PHONES_URI} --projection "
+                            f"{':'.join(PHONE_COLUMNS)}{where}"]
+                if since:
+                    commands.append(f"content query --uri {DELETED_URI} --projection "
+                                    f"contact_id --where \"contact_deleted_timestamp>{since}\"")
+                results = self.session.pipeline(commands)
+            except Exception as e:
+                print(f"[!] Error leyendo contactos: {e}")
+                return 0
+
+            # Se construye todo aparte y se cambia de golpe (resolve() puede estar leyendo)
+            contacts = {} if full else dict(self.contacts)
+            changed = self._apply_rows(contacts, results[0].output, replace=bool(since))
+            if since and len(results) > 1:
+                for row in _parse_rows(results[1].output, ['contact_id']):
+                    if contacts.pop(row['contact_id'], None) is not None:
+                        changed += 1
+
+            by_token, by_phonetic = self._build_indexes(contacts)
+            with self._swap:
+                self.contacts, self._by_token, self._by_phonetic = contacts, by_token, by_phonetic
+            self._last_refresh = time.time()
+            self.refreshes += 1
+            return changed
+
+    def get_statistics(self) -> Dict:
+        return {
+            'contacts': len(self.contacts),
+            'lookups': self.lookups,
+            'resolved': self.resolved,
+            'refreshes': self.refreshes
+        }
+
+    # ===== UTILIDADES PRIVADAS =====
+
+    def _ensure_fresh(self):
+        if not self.contacts and self._last_refresh == 0.0:
+            self.refresh(full=True)
+        elif time.time() - self._last_refresh > self.refresh_interval and not self._refreshing.locked():
+            # Incremental en segundo plano; se responde con el índice actual
+            self._last_refresh = time.time()
+            threading.Thread(target=self.refresh, daemon=True, name='contacts-refresh').start()
+
+    def _apply_rows(self, contacts: Dict[str, Contact], output: str, replace: bool) -> int:
+        rows = _parse_rows(output, PHONE_COLUMNS)
+        updated_ids = set()
+
+        for row in rows:
+            contact_id = row['contact_id']
+            if replace and contact_id not in updated_ids:
+                # El contacto cambió: sus teléfonos vienen completos de nuevo
+                # (objeto nuevo: el anterior puede estar en uso en resolve())
+                contacts.pop(contact_id, None)
+            updated_ids.add(contact_id)
+
+            contact = contacts.get(contact_id)
+            if contact is None:
+                contact = Contact(contact_id=contact_id, name=row['display_name'])
+                contacts[contact_id] = contact
+
+            number = re.sub(r'[^\d+]', '', row['data1'])
+            if number and number not in contact.numbers:
+                contact.numbers.append(number)
+                if row['data2'] == PHONE_TYPE_MOBILE and contact.mobile is None:
+                    contact.mobile = number
+
+            timestamp = int(row['contact_last_updated_timestamp']) \
+                if row['contact_last_updated_timestamp'].isdigit() else 0
+            contact.updated = max(contact.updated, timestamp)
+            self._last_timestamp = max(self._last_timestamp, timestamp)
+
+        return len(updated_ids)
+
+    @staticmethod
+    def _build_indexes(contacts: Dict[str, Contact]):
+        by_token: Dict[str, Set[str]] = {}
+        by_phonetic: Dict[str, Set[str]] = {}
+        for contact_id, contact in contacts.items():
+            for token in contact.tokens:
+                by_token.setdefault(token, set()).add(contact_id)
+                by_phonetic.setdefault(phonetic_key(token), set()).add(contact_id)
+        return by_token, by_phonetic
+
+    @staticmethod
+    def _candidates(tokens: List[str], by_token: Dict[str, Set[str]],
+                    by_phonetic: Dict[str, Set[str]]) -> Set[str]:
+        candidates = set()
+        for token in tokens:
+            candidates |= by_token.get(token, set())
+            candidates |= by_phonetic.get(phonetic_key(token), set())
+
+        if not candidates:
+            # Sin coincidencias directas: comparar aproximado contra los tokens
+            for token in tokens:
+                for known, ids in by_token.items():
+                    if SequenceMatcher(None, token, known).ratio() >= 0.8:
+                        candidates |= ids
+        return candidates
+
+    @staticmethod
+    def _score(query: List[str], contact: Contact) -> float:
+        """Fracción de tokens de la petición presentes en el nombre (exacto > fonético > aproximado)"""
+        names = contact.tokens
+        if not names:
+            return 0.0
+
+        total = 0.0
+        for token in query:
+            best = 0.0
+            for name in names:
+                if token == name:
+                    best = 1.0
+                    break
+                if phonetic_key(token) == phonetic_key(name):
+                    best = max(best, 0.9)
+                else:
+                    best = max(best, SequenceMatcher(None, token, name).ratio() * 0.85)
+            total += best
+
+        score = total / len(query)
+        # Ligera preferencia por nombres que no tienen tokens sobrantes
+        coverage = min(1.0, len(query) / len(names))
+        return score * (0.9 + 0.1 * coverage)
+
+
+def _parse_rows(output: str, columns: List[str]) -> List[Dict[str, str]]:
+    """Parsea la salida de 'content query' (las columnas salen en el orden pedido)"""
+    pattern = re.compile(
+        r'^Row:\s*\d+\s+' + ', '.join(f'{c}=(.*?)' for c in columns) + '$'
+    )
+    rows = []
+    for line in output.splitlines():
+        match = pattern.match(line.strip())
+        if match:
+            values = ['' if v == 'NULL' else v for v in match.groups()]
+            rows.append(dict(zip(columns, values)))
+    return rows
@@ -2,6 +2,8 @@ import time
 from typing import List, Optional, Callable
 from dataclasses import dataclass
 from enum import Enum
+from confirmation import ConfirmationListener, classify
+from slot_filling import SlotFiller
 
 class ConversationState(Enum):
     """Estados de la conversación"""
@@ -22,6 +24,25 @@ class ConversationTurn:
     intent: Optional[str] = None
     metadata: Optional[dict] = None
 
+# Acciones que se ejecutan sin el modelo cuando están todos los datos
+LOCAL_ACTIONS = {
+    'send_message': lambda c, p: c.send_whatsapp_message(p['contact'], p['message'], p.get('number')),
+    'make_call': lambda c, p: c.make_phone_call(p['contact'], p.get('number')),
+    'create_event': lambda c, p: c.create_calendar_event(p['title'], p['date'], p['time']),
+    'set_reminder': lambda c, p: c.set_reminder(p['task'], p['when']),
+    'navigate_to': lambda c, p: c.navigate_to(p['destination']),
+}
+# Casos que la capacidad local cubre (el resto lo decide el modelo)
+LOCAL_CONDITIONS = {
+    'send_message': lambda p: p.get('app') == 'whatsapp',
+}
+# Acciones que llegan a otra persona: siempre se confirman antes
+OUTWARD_ACTIONS = {
+    'send_message': "mandar a {contact} el mensaje: {message}",
+    'make_call': "llamar a {contact}",
+}
+
+
 class ConversationManager:
     """
     Gestiona conversaciones naturales multi-turno
@@ -39,6 +60,15 @@ class ConversationManager:
         self.pending_clarification = None
         self.multi_turn_context = {}
         
+        # Índice de contactos (se inyecta desde el main)
+        self.contacts = None
+        
+        # Respuestas sí/no con decisión temprana sobre transcripciones parciales
+        self.confirmation = ConfirmationListener(voice_manager)
+        
+        # Extracción local de parámetros (fechas, contactos, mensaje)
+        self.slots = SlotFiller()
+        
         # Callbacks
         self.on_state_change: Optional[Callable] = None
         
@@ -60,16 +90,17 @@ class ConversationManager:
         print(f"\n[👤] Usuario: {user_input}")
         self._add_turn('user', user_input)
         
+        state = self.state
         self._change_state(ConversationState.PROCESSING)
         
-        # Manejar según estado
-        if self.state == ConversationState.CLARIFYING:
+        # Manejar según el estado en que llegó la respuesta
+        if state == ConversationState.CLARIFYING:
             return self._handle_clarification(user_input)
         
-        elif self.state == ConversationState.WAITING_CONFIRMATION:
+        elif state == ConversationState.WAITING_CONFIRMATION:
             return self._handle_confirmation(user_input)
         
-        elif self.state == ConversationState.MULTI_TURN:
+        elif state == ConversationState.MULTI_TURN:
             return self._handle_multi_turn(user_input, frame)
         
         else:
@@ -79,26 +110,32 @@ class ConversationManager:
         """Asistente habla con emoción"""
         print(f"[🤖] {self.core.personality['name']}: {message}")
         
-        # Ajustar tono según emoción
+        message = self._styled(message, emotion)
+        self.voice.speak(message)
+        self._add_turn('assistant', message)
+    
+    @staticmethod
+    def _question_text(question: str, options: List[str] = None) -> str:
+        """Pregunta con las opciones posibles al final"""
+        if not options:
+            return question
+        options_str = ', '.join(options[:-1]) + f" o {options[-1]}"
+        return f"{question} Puedes decir {options_str}"
+    
+    @staticmethod
+    def _styled(message: str, emotion: str) -> str:
+        """Ajusta el tono según la emoción"""
         if emotion == 'excited':
-            message = f"¡{message}!"
+            return f"¡{message}!"
         elif emotion == 'apologetic':
-            message = f"Lo siento, {message}"
+            return f"Lo siento, {message}"
         elif emotion == 'curious':
-            message = f"{message}?"
-        
-        self.voice.speak(message)
-        self._add_turn('assistant', message)
+            return f"{message}?"
+        return message
     
     def ask(self, question: str, options: List[str] = None) -> str:
         """Hace una pregunta y espera respuesta"""
-        if options:
-            options_str = ', '.join(options[:-1]) + f" o {options[-1]}"
-            full_question = f"{question} Puedes decir {options_str}"
-        else:
-            full_question = question
-        
-        self.say(full_question, emotion='curious')
+        self.say(self._question_text(question, options), emotion='curious')
         
         # Esperar respuesta
         self._change_state(ConversationState.LISTENING)
@@ -131,13 +168,14 @@ class ConversationManager:
         self._change_state(ConversationState.WAITING_CONFIRMATION)
         
         confirmation_msg = f"Voy a {action_description}. ¿Está bien?"
-        self.say(confirmation_msg)
+        heard = []
         
-        response = self.voice.listen_once()
-        if response:
+        def on_response(response: str):
+            heard.append(response)
             self._add_turn('user', response)
-            confirmed = self._parse_confirmation(response)
-            
+        
+        confirmed = self.confirmation.ask(confirmation_msg, say=self.say, on_response=on_response)
+        if heard:
             if confirmed:
                 self.say("Perfecto", emotion='neutral')
             else:
@@ -151,6 +189,21 @@ class ConversationManager:
     def _handle_new_command(self, user_input: str, frame) -> dict:
         """Maneja un comando nuevo"""
         
+        # Comandos conocidos con todos sus datos: se ejecutan sin pasar por el modelo
+        local_intent = self.slots.parse_command(user_input)
+        if local_intent and not self._missing_params(local_intent):
+            self._change_state(ConversationState.EXECUTING)
+            result = self._execute_local_command(local_intent)
+            if result is not None:
+                # Sin el modelo no pasa por understand_intent: guardar aquí en memoria
+                self.core._store_interaction(user_input, local_intent)
+                if result.get('reason') == 'user_cancelled':
+                    self._change_state(ConversationState.IDLE)
+                    return result
+                self._report_result(result)
+                return result
+            self._change_state(ConversationState.IDLE)
+        
         # Entender con contexto conversacional
         intent = self.core.understand_intent(user_input, frame)
         
@@ -160,7 +213,7 @@ class ConversationManager:
         
         # Verificar si es comando multi-turno
         if self._is_multi_turn_command(intent):
-            return self._start_multi_turn(intent, frame)
+            return self._start_multi_turn(intent, frame, user_input)
         
         # Responder al usuario
         response = intent.get('suggested_response')
@@ -171,14 +224,17 @@ class ConversationManager:
         self._change_state(ConversationState.EXECUTING)
         result = self.core.execute_intent(intent, self._get_control_system())
         
-        # Feedback
+        self._report_result(result)
+        return result
+    
+    def _report_result(self, result: dict):
+        """Feedback de la ejecución y vuelta a reposo"""
         if result['success']:
             self.say("Listo", emotion='neutral')
         else:
             self.say(f"Hubo un problema: {result.get('reason')}", emotion='apologetic')
         
         self._change_state(ConversationState.IDLE)
-        return result
     
     def _handle_clarification(self, user_input: str) -> dict:
         """Maneja respuesta a solicitud de aclaración"""
@@ -221,35 +277,32 @@ class ConversationManager:
         step = context.get('current_step', 0)
         steps = context.get('steps', [])
         
-        if step >= len(steps):
-            # Conversación completada
-            self.say("Perfecto, tengo todo lo que necesito")
-            self._change_state(ConversationState.EXECUTING)
-            
-            # Ejecutar con toda la información recopilada
-            result = self._execute_multi_turn_command(context)
+        if step < len(steps):
+            # Respuesta del paso actual ("el viernes a las 5" rellena también la hora)
+            current_step = steps[step]
+            action = context['intent'].get('action')
+            data = context['data']
+            data[current_step['key']] = self.slots.answer(current_step['key'], user_input)
+            for key, value in self.slots.extract(action, user_input).items():
+                data.setdefault(key, value)
             
-            self.multi_turn_context = {}
-            self._change_state(ConversationState.IDLE)
-            return result
-        
-        # Procesar respuesta del paso actual
-        current_step = steps[step]
-        context['data'][current_step['key']] = user_input
-        
-        # Avanzar al siguiente paso
-        context['current_step'] = step + 1
-        
-        if context['current_step'] < len(steps):
-            next_step = steps[context['current_step']]
-            self.ask(next_step['question'])
+            if current_step['key'] == 'contact' and not self._resolve_contact(data):
+                # Varios contactos posibles sin respuesta: se espera la siguiente
+                self._change_state(ConversationState.MULTI_TURN)
+                return {'success': True, 'in_progress': True}
         
-        return {'success': True, 'in_progress': True}
+        return self._advance_multi_turn()
     
-    def _start_multi_turn(self, intent: dict, frame) -> dict:
+    def _start_multi_turn(self, intent: dict, frame, user_input: str = None) -> dict:
         """Inicia conversación multi-turno"""
         self._change_state(ConversationState.MULTI_TURN)
         
+        # Completar localmente lo que el modelo no extrajo de la orden
+        params = intent.setdefault('parameters', {})
+        if user_input:
+            for key, value in self.slots.extract(intent.get('action'), user_input).items():
+                params.setdefault(key, value)
+        
         # Determinar qué información necesitamos
         steps = self._plan_multi_turn_steps(intent)
         
@@ -261,11 +314,43 @@ class ConversationManager:
             'frame': frame
         }
         
-        # Hacer primera pregunta
-        first_step = steps[0]
-        self.ask(first_step['question'])
+        # Contacto ya dicho en la orden: resolverlo ahora
+        if 'contact' in params:
+            data = {'contact': params['contact']}
+            if self._resolve_contact(data):
+                params.update(data)
         
-        return {'success': True, 'in_progress': True}
+        return self._advance_multi_turn(first=True)
+    
+    def _advance_multi_turn(self, first: bool = False) -> dict:
+        """Pregunta el siguiente dato pendiente o ejecuta si ya están todos"""
+        context = self.multi_turn_context
+        steps = context['steps']
+        known = {**context['intent'].get('parameters', {}), **context['data']}
+        
+        step = 0 if first else context['current_step'] + 1
+        while step < len(steps) and known.get(steps[step]['key']):
+            step += 1  # ya respondido en otra respuesta
+        context['current_step'] = step
+        
+        if step < len(steps):
+            answer = self.ask(steps[step]['question'])
+            self._change_state(ConversationState.MULTI_TURN)
+            if answer:
+                return self._handle_multi_turn(answer, context.get('frame'))
+            return {'success': True, 'in_progress': True}
+        
+        # Conversación completada
+        if not first:
+            self.say("Perfecto, tengo todo lo que necesito")
+        self._change_state(ConversationState.EXECUTING)
+        
+        # Ejecutar con toda la información recopilada
+        result = self._execute_multi_turn_command(context)
+        
+        self.multi_turn_context = {}
+        self._change_state(ConversationState.IDLE)
+        return result
     
     def _is_multi_turn_command(self, intent: dict) -> bool:
         """Verifica si el comando requiere múltiples turnos"""
@@ -355,9 +440,67 @@ class ConversationManager:
         # Actualizar parámetros con los datos recopilados
         intent['parameters'].update(data)
         
+        # Sin pasos del modelo: ejecutar directamente la capacidad
+        if not intent.get('execution_steps'):
+            result = self._execute_local_command(intent)
+            if result is not None:
+                return result
+        
         # Ejecutar
         return self.core.execute_intent(intent, self._get_control_system())
     
+    def _execute_local_command(self, intent: dict) -> Optional[dict]:
+        """
+        Ejecuta la acción con la capacidad correspondiente
+        Retorna None si no hay capacidad local para ella (lo hace el modelo)
+        """
+        if not self._runs_locally(intent):
+            return None
+        
+        params = intent.get('parameters', {})
+        if 'contact' in params and 'number' not in params and not self._resolve_contact(params):
+            return None
+        
+        if self._needs_confirmation(intent):
+            if not self.confirm(self._describe_action(intent)):
+                return {'success': False, 'reason': 'user_cancelled'}
+            self._change_state(ConversationState.EXECUTING)
+        
+        return self._run_local_action(intent)
+    
+    def _runs_locally(self, intent: dict) -> bool:
+        """¿Hay capacidad local para esta acción con estos parámetros?"""
+        capabilities = getattr(self._get_control_system(), 'capabilities', None)
+        action = intent.get('action')
+        condition = LOCAL_CONDITIONS.get(action)
+        return (capabilities is not None and action in LOCAL_ACTIONS and
+                (condition is None or condition(intent.get('parameters', {}))))
+    
+    def _run_local_action(self, intent: dict) -> Optional[dict]:
+        """Llama a la capacidad (contacto ya resuelto y acción ya confirmada)"""
+        if not self._runs_locally(intent):
+            return None
+        
+        capabilities = self._get_control_system().capabilities
+        result = LOCAL_ACTIONS[intent['action']](capabilities, intent.get('parameters', {}))
+        print(f"[⚡] {intent['action']} resuelto sin el modelo")
+        return result
+    
+    @staticmethod
+    def _needs_confirmation(intent: dict) -> bool:
+        return bool(intent.get('requires_confirmation')) or intent.get('action') in OUTWARD_ACTIONS
+    
+    @staticmethod
+    def _describe_action(intent: dict, fallback: Optional[str] = None) -> str:
+        """Frase para "Voy a ..." (mensajes y llamadas con sus datos)"""
+        template = OUTWARD_ACTIONS.get(intent.get('action'))
+        if template:
+            try:
+                return template.format(**intent.get('parameters', {}))
+            except KeyError:
+                pass
+        return fallback or intent.get('action', 'hacerlo')
+    
     def _generate_greeting(self) -> str:
         """Genera saludo personalizado"""
         hour = time.localtime().tm_hour
@@ -402,25 +545,47 @@ class ConversationManager:
         }
     
     def _parse_confirmation(self, response: str) -> bool:
-        """Parsea respuesta de confirmación"""
-        response_lower = response.lower()
-        
-        affirmative = ['sí', 'si', 'yes', 'ok', 'dale', 'confirmo', 'adelante', 'hazlo', 'claro']
-        negative = ['no', 'nope', 'cancela', 'mejor no', 'espera', 'detente']
+        """Parsea respuesta de confirmación (palabras completas, la primera decide)"""
+        decision = classify(response)
+        if decision is not None:
+            return decision
         
-        if any(word in response_lower for word in affirmative):
+        # Si es ambiguo, pedir aclaración una vez (sin recursión)
+        self.say("No estoy seguro. ¿Es un sí o un no?")
+        decision, _ = self.confirmation.listen()
+        return bool(decision)
+    
+    def _resolve_contact(self, data: dict) -> bool:
+        """
+        Resuelve data['contact'] con el índice local y añade data['number']
+        Retorna False si sigue habiendo ambigüedad tras preguntar al usuario
+        """
+        if self.contacts is None or not data.get('contact'):
             return True
-        if any(word in response_lower for word in negative):
-            return False
         
-        # Si es ambiguo, pedir aclaración
-        self.say("No estoy seguro. ¿Es un sí o un no?")
-        retry = self.voice.listen_once()
-        if retry:
-            return self._parse_confirmation(retry)
+        for _ in range(2):
+            match = self.contacts.resolve(data['contact'])
+            if match is None:
+                return True
+            
+            if not match['ambiguous']:
+                data['contact'] = match['name']
+                data['number'] = match['number']
+                return True
+            
+            options = match['candidates']
+            answer = self.ask(f"¿Te refieres a {', '.join(options[:-1])} o {options[-1]}?")
+            if not answer:
+                return False
+            data['contact'] = self.slots.answer('contact', answer)
         
         return False
     
+    def _missing_params(self, intent: dict) -> List[str]:
+        """Parámetros requeridos que aún no tiene el intent"""
+        params = intent.get('parameters', {})
+        return [p for p in self._get_required_params(intent.get('action')) if not params.get(p)]
+    
     def _get_required_params(self, action: str) -> List[str]:
         """Obtiene parámetros requeridos para una acción"""
         requirements = {
@@ -463,6 +628,11 @@ class ConversationManager:
         # Esto se inyectará desde el main
         return getattr(self, '_control_system', None)
     
+    def inject_contact_index(self, contact_index):
+        """Inyecta índice de contactos"""
+        self.contacts = contact_index
+        self.slots.contacts = contact_index
+    
     def inject_control_system(self, control_system):
         """Inyecta sistema de control"""
         self._control_system = control_system
\ No newline at end of file
@@ -0,0 +1,273 @@
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+VOLUME_STREAM_MUSIC = 3
+DEFAULT_VOLUME_MAX = 15
+
+_VOLUME_READ = (f"cmd media_session volume --stream {VOLUME_STREAM_MUSIC} --get | "
+                r"sed -n 's/.*volume is \([0-9]*\) in range \[[0-9]*\.\.\([0-9]*\)\].*/\1 \2/p'")
+
+
+@dataclass
+class SettingSpec:
+    """Cómo leer, comparar y fijar un ajuste del sistema"""
+    read: str                              # comando que imprime el valor actual
+    to_raw: Callable[[Any], str]           # valor deseado -> valor crudo leído
+    write: Callable[[Any], List[str]]      # valor deseado -> comandos
+    parse: Callable[[str], Any]            # valor crudo -> valor de la cache
+
+
+def _flag(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'on', 'true', 'si', 'sí', 'activar', 'activado')
+    return bool(value)
+
+
+def _switch(read: str, on: str, off: str) -> SettingSpec:
+    return SettingSpec(
+        read=read,
+        to_raw=lambda v: '1' if _flag(v) else '0',
+        write=lambda v: [on if _flag(v) else off],
+        parse=lambda raw: raw not in ('0', 'null', '')
+    )
+
+
+SETTINGS: Dict[str, SettingSpec] = {
+    'wifi': _switch('settings get global wifi_on', 'svc wifi enable', 'svc wifi disable'),
+    'bluetooth': _switch('settings get global bluetooth_on',
+                         'svc bluetooth enable', 'svc bluetooth disable'),
+    'airplane_mode': _switch('settings get global airplane_mode_on',
+                             'cmd connectivity airplane-mode enable',
+                             'cmd connectivity airplane-mode disable'),
+    'do_not_disturb': _switch('settings get global zen_mode',
+                              'cmd notification set_dnd on', 'cmd notification set_dnd off'),
+    'rotation': _switch('settings get system accelerometer_rotation',
+                        'settings put system accelerometer_rotation 1',
+                        'settings put system accelerometer_rotation 0'),
+    'brightness': SettingSpec(
+        read='settings get system screen_brightness',
+        to_raw=lambda v: str(max(0, min(255, int(v)))),
+        write=lambda v: ['settings put system screen_brightness_mode 0',
+                         f'settings put system screen_brightness {max(0, min(255, int(v)))}'],
+        parse=lambda raw: int(raw) if raw.isdigit() else None
+    ),
+    'volume': SettingSpec(
+        read=_VOLUME_READ,
+        to_raw=lambda v: str(int(v)),
+        write=lambda v: [f'cmd media_session volume --stream {VOLUME_STREAM_MUSIC} --set {int(v)}'],
+        parse=lambda raw: int(raw.split()[0]) if raw.split() and raw.split()[0].isdigit() else None
+    ),
+    'orientation': SettingSpec(
+        read='settings get system user_rotation',
+        to_raw=lambda v: '1' if v == 'landscape' else '0',
+        write=lambda v: ['settings put system accelerometer_rotation 0',
+                         f"settings put system user_rotation {1 if v == 'landscape' else 0}"],
+        parse=lambda raw: 'landscape' if raw in ('1', '3') else 'portrait'
+    ),
+}
+
+# Perfiles: varios ajustes aplicados en una sola transacción
+PROFILES: Dict[str, Dict[str, Any]] = {
+    'modo cine': {
+        'do_not_disturb': True,
+        'brightness': 10,
+        'volume': '50%',
+        'orientation': 'landscape',
+        'open_app': 'com.netflix.mediaclient',
+    },
+    'modo noche': {
+        'do_not_disturb': True,
+        'brightness': 5,
+        'volume': '20%',
+    },
+    'modo normal': {
+        'do_not_disturb': False,
+        'brightness': 128,
+        'rotation': True,
+    },
+}
+
+
+class DeviceSettings:
+    """
+    Ajustes del dispositivo con estado conocido
+    Lee todos los ajustes en una ida y vuelta y los cachea (con TTL e
+    invalidación al escribir). Las escrituras fijan valores absolutos y
+    van protegidas en el propio dispositivo ('solo si difiere'), así que
+    son idempotentes aunque la cache esté desactualizada. Un perfil
+    completo se aplica en un único script.
+    """
+
+    def __init__(self, session, ttl: float = 30.0):
+        self.session = session
+        self.ttl = ttl
+
+        self._state: Dict[str, Any] = {}
+        self._read_at: Dict[str, float] = {}
+        self.volume_max = DEFAULT_VOLUME_MAX
+        self.previous: Dict[str, Any] = {}  # valores antes del último apply
+
+        # Estadísticas
+        self.reads = 0
+        self.writes = 0
+        self.skipped = 0
+
+    # ===== LECTURA =====
+
+    def read_all(self) -> Dict[str, Any]:
+        """Lee todos los ajustes en una sola ida y vuelta"""
+        script = '\n'.join(f'echo "__GET {name} $({spec.read} 2>/dev/null)"'
+                           for name, spec in SETTINGS.items())
+        try:
+            output = self.session.run(script).output
+        except Exception as e:
+            print(f"[!] Error leyendo ajustes: {e}")
+            return dict(self._state)
+
+        self.reads += 1
+        for name, raw in self._parse_markers(output, '__GET').items():
+            self._store(name, raw)
+        return dict(self._state)
+
+    def get(self, name: str) -> Any:
+        """Valor actual (de la cache si es reciente)"""
+        if not self._fresh(name):
+            self.read_all()
+        return self._state.get(name)
+
+    def invalidate(self, name: Optional[str] = None):
+        """Olvida el valor cacheado (o todos)"""
+        if name is None:
+            self._read_at.clear()
+        else:
+            self._read_at.pop(name, None)
+
+    # ===== ESCRITURA =====
+
+    def set(self, name: str, value: Any) -> Dict:
+        return self.apply({name: value})
+
+    def apply(self, changes: Dict[str, Any], extra_commands: Optional[List[str]] = None) -> Dict:
+        """
+        Aplica varios ajustes en un único script
+        Retorna {'success', 'changed': [...], 'unchanged': [...]}
+        """
+        script, unchanged, targets, sent = [], [], {}, []
+
+        for name, value in changes.items():
+            spec = SETTINGS.get(name)
+            if spec is None:
+                return {'success': False, 'reason': f'ajuste_no_soportado: {name}'}
+
+            value = self._resolve_value(name, value)
+            raw = spec.to_raw(value)
+            targets[name] = (value, raw)
+
+            if self._fresh(name) and self._state.get(name) == spec.parse(raw):
+                # La cache dice que ya está así: ni siquiera se envía
+                unchanged.append(name)
+                continue
+
+            sent.append(name)
+            script.append(self.guarded_command(name, value))
+
+        script += extra_commands or []
+        self.skipped += len(unchanged)
+        if not script:
+            return {'success': True, 'changed': [], 'unchanged': unchanged}
+
+        try:
+            result = self.session.run('\n'.join(script))
+        except Exception as e:
+            self.invalidate()
+            return {'success': False, 'error': str(e)}
+
+        self.writes += 1
+        changed_raw = self._parse_markers(result.output, '__SET')
+        kept_raw = self._parse_markers(result.output, '__KEEP')
+
+        self.previous = {}
+        for name, old in changed_raw.items():
+            self.previous[name] = SETTINGS[name].parse(old)
+        for name, (value, raw) in targets.items():
+            if name in changed_raw or name in kept_raw:
+                self._store(name, raw)
+
+        # Cada ajuste enviado informa de su resultado con un marcador
+        reported = all(name in changed_raw or name in kept_raw for name in sent)
+        return {
+            'success': reported,
+            'changed': list(changed_raw),
+            'unchanged': unchanged + list(kept_raw)
+        }
+
+    def guarded_command(self, name: str, value: Any) -> str:
+        """
+        Línea de shell que fija el ajuste solo si difiere del valor actual
+        Imprime '__SET nombre anterior' o '__KEEP nombre actual'
+        """
+        spec = SETTINGS[name]
+        value = self._resolve_value(name, value)
+        raw = spec.to_raw(value)
+        writes = '; '.join(spec.write(value))
+        return (f'__v=$({spec.read} 2>/dev/null); '
+                f'if [ "${{__v%% *}}" != "{raw}" ]; then {{ {writes}; }} >/dev/null 2>&1; '
+                f'echo "__SET {name} $__v"; else echo "__KEEP {name} $__v"; fi')
+
+    def apply_profile(self, profile: str) -> Dict:
+        """Aplica un perfil (p.ej. 'modo cine') en una sola transacción"""
+        settings = PROFILES.get(profile.lower())
+        if settings is None:
+            return {'success': False, 'reason': 'perfil_desconocido'}
+
+        settings = dict(settings)
+        extra = []
+        package = settings.pop('open_app', None)
+        if package:
+            extra.append(f"monkey -p {package} -c android.intent.category.LAUNCHER 1 >/dev/null 2>&1")
+
+        result = self.apply(settings, extra)
+        result['profile'] = profile
+        return result
+
+    def restore_previous(self) -> Dict:
+        """Deshace el último apply"""
+        if not self.previous:
+            return {'success': True, 'changed': [], 'unchanged': []}
+        return self.apply({k: v for k, v in self.previous.items() if v is not None})
+
+    def get_statistics(self) -> Dict:
+        return {'reads': self.reads, 'writes': self.writes, 'skipped': self.skipped,
+                'cached': len(self._state)}
+
+    # ===== UTILIDADES PRIVADAS =====
+
+    def _fresh(self, name: str) -> bool:
+        return time.time() - self._read_at.get(name, 0.0) < self.ttl
+
+    def _store(self, name: str, raw: str):
+        if name == 'volume' and len(raw.split()) == 2 and raw.split()[1].isdigit():
+            self.volume_max = int(raw.split()[1])
+        self._state[name] = SETTINGS[name].parse(raw)
+        self._read_at[name] = time.time()
+
+    def _resolve_value(self, name: str, value: Any) -> Any:
+        """'50%' -> nivel absoluto según el rango real"""
+        if isinstance(value, str) and value.strip().endswith('%'):
+            percent = float(value.strip().rstrip('%')) / 100
+            scale = self.volume_max if name == 'volume' else 255
+            return int(round(percent * scale))
+        if name == 'volume':
+            return max(0, min(self.volume_max, int(value)))
+        return value
+
+    @staticmethod
+    def _parse_markers(output: str, marker: str) -> Dict[str, str]:
+        values = {}
+        for line in output.splitlines():
+            if line.startswith(marker + ' '):
+                parts = line.split(' ', 2)
+                if len(parts) >= 2:
+                    values[parts[1]] = parts[2].strip() if len(parts) > 2 else ''
+        return values
@@ -0,0 +1,232 @@
+import os
+import pickle
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from element_locator import SCREEN_W, SCREEN_H
+from ui_hierarchy import normalize
+
+CACHE_PATH = 'element_cache.pkl'
+PATCH_SIZE = 24        # lado del parche de verificación (px tras reducir)
+PATCH_RADIUS = 40      # radio del parche en coordenadas de referencia
+
+
+def screen_hash(frame) -> int:
+    """dHash de 64 bits del frame (tolerante a cambios pequeños)"""
+    gray = _gray(frame)
+    h, w = gray.shape
+    rows = np.linspace(0, h - 1, 8).astype(int)
+    cols = np.linspace(0, w - 1, 9).astype(int)
+    small = gray[np.ix_(rows, cols)]
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(sum(1 << i for i, b in enumerate(bits) if b))
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def _gray(frame) -> np.ndarray:
+    if frame.ndim == 3:
+        return frame[..., :3].mean(axis=2).astype(np.float32)
+    return frame.astype(np.float32)
+
+
+@dataclass
+class CachedElement:
+    """Posición conocida de un elemento en una pantalla"""
+    signature: int
+    x: int
+    y: int
+    confidence: float
+    patch: bytes
+    version: Optional[str]
+    created: float
+    hits: int = 0
+
+
+class ElementCache:
+    """
+    Cache de posiciones de elementos
+    Clave: (app en primer plano, firma perceptual de la pantalla, descripción).
+    Antes de devolver una posición se verifica comparando un parche pequeño
+    alrededor del punto guardado; si no coincide, o la app se actualizó,
+    la entrada se descarta. Se persiste en disco entre ejecuciones.
+    """
+
+    def __init__(self, session=None, package_provider: Optional[Callable[[], Optional[str]]] = None,
+                 path: str = CACHE_PATH, max_distance: int = 10, patch_threshold: float = 14.0,
+                 max_per_key: int = 4):
+        self.session = session
+        self.package_provider = package_provider
+        self.path = path
+        self.max_distance = max_distance
+        self.patch_threshold = patch_threshold
+        self.max_per_key = max_per_key
+
+        self._entries: Dict[Tuple[str, str], List[CachedElement]] = {}
+        self._versions: Dict[str, Optional[str]] = {}  # versión vista en esta ejecución
+        self._dirty = False
+        self._last_save = 0.0
+
+        # Estadísticas
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.load()
+
+    # ===== API PÚBLICA =====
+
+    def current_package(self) -> str:
+        if self.package_provider is None:
+            return ''
+        try:
+            return self.package_provider() or ''
+        except Exception:
+            return ''
+
+    def lookup(self, frame, description: str, package: str = '') -> Optional[Dict]:
+        """Elemento verificado desde la cache, o None"""
+        if frame is None:
+            return None
+
+        key = (package, normalize(description))
+        entries = self._entries.get(key)
+        if not entries:
+            self.misses += 1
+            return None
+
+        self._check_version(package)
+        entries = self._entries.get(key, [])
+
+        signature = screen_hash(frame)
+        for entry in sorted(entries, key=lambda e: hamming(e.signature, signature)):
+            if hamming(entry.signature, signature) > self.max_distance:
+                break
+
+            if self._patch_matches(frame, entry):
+                entry.hits += 1
+                self.hits += 1
+                return {'found': True, 'x': entry.x, 'y': entry.y,
+                        'confidence': entry.confidence, 'source': 'cache'}
+
+            # La pantalla se parece pero el elemento ya no está ahí
+            entries.remove(entry)
+            self.evictions += 1
+            self._dirty = True
+            break
+
+        self.misses += 1
+        return None
+
+    def store(self, frame, description: str, element: Dict, package: str = ''):
+        """Guarda la posición de un elemento encontrado"""
+        if frame is None or not element.get('found') or element.get('source') == 'cache':
+            return
+
+        key = (package, normalize(description))
+        entry = CachedElement(
+            signature=screen_hash(frame),
+            x=int(element['x']), y=int(element['y']),
+            confidence=float(element.get('confidence', 1.0)),
+            patch=self._patch(frame, element['x'], element['y']).tobytes(),
+            version=self._check_version(package),
+            created=time.time()
+        )
+
+        entries = self._entries.setdefault(key, [])
+        entries.insert(0, entry)
+        del entries[self.max_per_key:]
+
+        self._dirty = True
+        if time.time() - self._last_save > 10.0:
+            self.save()
+
+    def invalidate_package(self, package: str):
+        """Descarta todas las posiciones de una app"""
+        for key in [k for k in self._entries if k[0] == package]:
+            self.evictions += len(self._entries.pop(key))
+        self._dirty = True
+
+    def get_statistics(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            'entries': sum(len(v) for v in self._entries.values()),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits / total * 100) if total else 0.0
+        }
+
+    # ===== PERSISTENCIA =====
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                self._entries = pickle.load(f)
+        except Exception as e:
+            print(f"[!] Cache de elementos ilegible, se descarta: {e}")
+            self._entries = {}
+
+    def save(self):
+        if not self._dirty:
+            return
+        try:
+            with open(self.path, 'wb') as f:
+                pickle.dump(self._entries, f)
+            self._dirty = False
+            self._last_save = time.time()
+        except Exception as e:
+            print(f"[!] Error guardando cache de elementos: {e}")
+
+    # ===== UTILIDADES PRIVADAS =====
+
+    def _check_version(self, package: str) -> Optional[str]:
+        """Versión de la app; si cambió desde que se guardó, se vacía su cache"""
+        if not package or self.session is None:
+            return None
+
+        if package not in self._versions:
+            try:
+                output = self.session.run(f"dumpsys package {package} | grep -m1 versionCode").output
+                match = re.search(r'versionCode=(\d+)', output)
+                self._versions[package] = match.group(1) if match else None
+            except Exception:
+                self._versions[package] = None
+
+            version = self._versions[package]
+            stale = any(e.version != version for k, v in self._entries.items()
+                        if k[0] == package for e in v)
+            if version is not None and stale:
+                print(f"[♻️] {package} actualizada: posiciones en cache descartadas")
+                self.invalidate_package(package)
+
+        return self._versions[package]
+
+    def _patch(self, frame, x: int, y: int) -> np.ndarray:
+        """Parche gris reducido alrededor del punto (coordenadas de referencia)"""
+        h, w = frame.shape[:2]
+        sx, sy = w / SCREEN_W, h / SCREEN_H
+        cx, cy = int(x * sx), int(y * sy)
+        rx, ry = max(1, int(PATCH_RADIUS * sx)), max(1, int(PATCH_RADIUS * sy))
+
+        region = frame[max(0, cy - ry):min(h, cy + ry), max(0, cx - rx):min(w, cx + rx)]
+        if region.size == 0:
+            return np.zeros((PATCH_SIZE, PATCH_SIZE), dtype=np.uint8)
+
+        gray = _gray(region)
+        rows = np.linspace(0, gray.shape[0] - 1, PATCH_SIZE).astype(int)
+        cols = np.linspace(0, gray.shape[1] - 1, PATCH_SIZE).astype(int)
+        return gray[np.ix_(rows, cols)].astype(np.uint8)
+
+    def _patch_matches(self, frame, entry: CachedElement) -> bool:
+        current = self._patch(frame, entry.x, entry.y).astype(np.float32)
+        stored = np.frombuffer(entry.patch, dtype=np.uint8).reshape(PATCH_SIZE, PATCH_SIZE)
+        return float(np.abs(current - stored).mean()) <= self.patch_threshold
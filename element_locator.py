@@ -0,0 +1,180 @@
+import json
+import re
+from typing import Dict, List, Optional
+
+# Sistema de coordenadas que usan todos los clicks (control.click(x, y, 1080, 1920))
+SCREEN_W, SCREEN_H = 1080, 1920
+
+
+class ElementLocator:
+    """
+    Localizador de elementos en pantalla
+    Primero consulta la cache de posiciones verificadas y la jerarquía de
+    UI (si hay); lo que no encuentra se resuelve con una sola llamada al
+    modelo para todas las descripciones
+    """
+
+    def __init__(self, vision, ui_tree=None, min_confidence: float = 0.5, cache=None):
+        self.vision = vision
+        self.ui_tree = ui_tree
+        self.min_confidence = min_confidence
+        self.cache = cache  # ElementCache (opcional)
+
+        # Estadísticas
+        self.model_calls = 0
+        self.elements_resolved = 0
+        self.ui_tree_hits = 0
+        self.cache_hits = 0
+
+    def inject_cache(self, cache):
+        """Inyecta cache de posiciones de elementos"""
+        self.cache = cache
+
+    def find_element(self, frame, description: str) -> Dict:
+        """Busca un elemento (misma forma de respuesta que vision.find_element)"""
+        return self.find_elements(frame, [description])[description]
+
+    def find_elements(self, frame, descriptions: List[str]) -> Dict[str, Dict]:
+        """
+        Busca varios elementos en el mismo frame con una sola llamada
+        Retorna {descripción: {'found', 'x', 'y', 'confidence'}}
+        """
+        descriptions = list(dict.fromkeys(d for d in descriptions if d))
+        if not descriptions:
+            return {}
+
+        results = {}
+
+        # Nivel 0: posiciones ya vistas en esta pantalla (verificadas por parche)
+        package = ''
+        if self.cache is not None and frame is not None:
+            package = self.cache.current_package()
+            for description in descriptions:
+                element = self.cache.lookup(frame, description, package)
+                if element is not None:
+                    results[description] = element
+                    self.cache_hits += 1
+
+            descriptions = [d for d in descriptions if d not in results]
+            if not descriptions:
+                return results
+
+        resolved = {}
+
+        # Nivel rápido: árbol de UI (sin red)
+        if self.ui_tree is not None:
+            for description in descriptions:
+                element = self.ui_tree.find_element(description, frame)
+                if element.get('found'):
+                    resolved[description] = element
+                    self.ui_tree_hits += 1
+
+            descriptions = [d for d in descriptions if d not in resolved]
+
+        if descriptions:
+            if frame is None:
+                resolved.update({d: self._not_found() for d in descriptions})
+            else:
+                resolved.update(self._find_with_vision(frame, descriptions))
+
+        if self.cache is not None and frame is not None:
+            for description, element in resolved.items():
+                self.cache.store(frame, description, element, package)
+
+        results.update(resolved)
+        return results
+
+    def _find_with_vision(self, frame, descriptions: List[str]) -> Dict[str, Dict]:
+        """Resuelve las descripciones con el modelo (una llamada)"""
+        # Un solo elemento: usar la ruta existente del módulo de visión
+        if len(descriptions) == 1:
+            self.model_calls += 1
+            element = self.vision.find_element(frame, descriptions[0])
+            element.setdefault('confidence', 1.0 if element.get('found') else 0.0)
+            self.elements_resolved += 1
+            return {descriptions[0]: element}
+
+        prompt = self._build_batch_prompt(descriptions)
+
+        try:
+            self.model_calls += 1
+            response = self.vision.vision.api_call_with_context(prompt, frame)
+            parsed = self._parse_response(response)
+        except Exception as e:
+            print(f"[!] Error en búsqueda múltiple: {e}")
+            parsed = {}
+
+        results = {}
+        for index, description in enumerate(descriptions):
+            item = parsed.get(str(index)) or parsed.get(description)
+            results[description] = self._to_element(item)
+
+        self.elements_resolved += len(descriptions)
+        found = sum(1 for r in results.values() if r['found'])
+        print(f"[🔎] {found}/{len(descriptions)} elementos en una llamada")
+
+        return results
+
+    def get_statistics(self) -> Dict:
+        return {
+            'cache_hits': self.cache_hits,
+            'ui_tree_hits': self.ui_tree_hits,
+            'model_calls': self.model_calls,
+            'elements_resolved': self.elements_resolved,
+            'elements_per_call': (self.elements_resolved / self.model_calls) if self.model_calls else 0.0
+        }
+
+    # ===== UTILIDADES PRIVADAS =====
+
+    def _build_batch_prompt(self, descriptions: List[str]) -> str:
+        listing = '\n'.join(f'{i}. {d}' for i, d in enumerate(descriptions))
+
+        return f"""Localiza estos elementos en la captura de pantalla de Android:
+{listing}
+
+Responde solo en JSON, una entrada por número:
+{{
+  "0": {{"found": true/false, "x": 0.0-1.0, "y": 0.0-1.0, "confidence": 0.0-1.0}},
+  ...
+}}
+
+x e y son el centro del elemento como fracción del ancho y alto de la pantalla.
+Si un elemento no es visible, usa "found": false."""
+
+    def _parse_response(self, response: str) -> Dict:
+        """Extrae el JSON de la respuesta (tolera texto o ```json alrededor)"""
+        if isinstance(response, dict):
+            return response
+
+        match = re.search(r'\{.*\}', response or '', re.DOTALL)
+        if not match:
+            return {}
+        return json.loads(match.group(0))
+
+    def _to_element(self, item: Optional[Dict]) -> Dict:
+        if not isinstance(item, dict) or not item.get('found'):
+            return self._not_found()
+
+        try:
+            x, y = float(item['x']), float(item['y'])
+        except (KeyError, TypeError, ValueError):
+            return self._not_found()
+
+        # Encontrado sin confianza explícita: se da por buena
+        confidence = item.get('confidence')
+        try:
+            confidence = 1.0 if confidence is None else float(confidence)
+        except (TypeError, ValueError):
+            confidence = 1.0
+        if confidence < self.min_confidence:
+            return self._not_found(confidence)
+
+        # Fracciones -> coordenadas de pantalla (acepta píxeles si vienen así)
+        if x <= 1.0 and y <= 1.0:
+            x, y = x * SCREEN_W, y * SCREEN_H
+
+        return {'found': True, 'x': int(x), 'y': int(y), 'confidence': confidence}
+
+    @staticmethod
+    def _not_found(confidence: float = 0.0) -> Dict:
+        return {'found': False, 'confidence': confidence}
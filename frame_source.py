@@ -0,0 +1,96 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from screen_settle import frame_signature, frames_differ
+
+
+class VersionedFrameSource:
+    """
+    Fuente de frames con versión monotónica
+    Envuelve cualquier fuente con get_frame() (stream, screencap). La
+    versión solo sube cuando el contenido cambia de verdad; tras enviar
+    input se marca como sucia y cada consulta recaptura hasta que la
+    pantalla cambie (o pase change_window sin cambio: input sin efecto
+    visible). Así los flujos reutilizan el último frame mientras siga
+    siendo válido y nunca buscan elementos en una pantalla anterior a su
+    última acción, aunque la transición tarde en empezar.
+    """
+
+    def __init__(self, source, max_age: float = 1.0, threshold: float = 3.0,
+                 change_window: float = 1.0):
+        self.source = source
+        self.max_age = max_age      # segundos que un frame sin input se da por bueno
+        self.threshold = threshold
+        self.change_window = change_window  # segundos esperando el primer cambio tras input
+
+        self.version = 0
+        self._frame = None
+        self._signature = None
+        self._captured_at = 0.0
+        self._dirty = True
+        self._invalidated_at = 0.0
+        self._lock = threading.Lock()
+
+        # Estadísticas
+        self.captures = 0
+        self.reuses = 0
+
+    # ===== API PÚBLICA =====
+
+    def get_frame(self):
+        """Captura siempre (compatible con cualquier fuente de frames)"""
+        return self.capture()[1]
+
+    def frame(self):
+        """Frame actual, recapturando solo si hace falta"""
+        return self.current()[1]
+
+    def current(self) -> Tuple[int, Optional[object]]:
+        """(versión, frame) vigentes; recaptura tras input o si el frame es viejo"""
+        with self._lock:
+            stale = (self._dirty or self._frame is None or
+                     time.time() - self._captured_at > self.max_age)
+            if not stale:
+                self.reuses += 1
+                return self.version, self._frame
+        return self.capture()
+
+    def capture(self) -> Tuple[int, Optional[object]]:
+        """Captura un frame nuevo; sube la versión si el contenido cambió"""
+        frame = self.source.get_frame()
+        signature = frame_signature(frame)
+
+        with self._lock:
+            self.captures += 1
+            if frame is None:
+                return self.version, self._frame
+
+            changed = self._frame is None or frames_differ(self._signature, signature, self.threshold)
+            if changed:
+                self.version += 1
+            self._frame, self._signature = frame, signature
+            self._captured_at = time.time()
+            # Igual que antes del input: puede que la transición aún no empezó
+            if changed or self._captured_at - self._invalidated_at > self.change_window:
+                self._dirty = False
+            return self.version, frame
+
+    def changed_since(self, version: int) -> bool:
+        """¿La pantalla cambió desde esa versión? (recaptura solo si hace falta)"""
+        return self.current()[0] > version
+
+    def invalidate(self):
+        """Se envió input: el frame guardado ya no es de fiar"""
+        with self._lock:
+            self._dirty = True
+            self._invalidated_at = time.time()
+
+    def get_statistics(self) -> Dict:
+        total = self.captures + self.reuses
+        return {
+            'version': self.version,
+            'captures': self.captures,
+            'reuses': self.reuses,
+            'reuse_rate': (self.reuses / total * 100) if total else 0.0
+        }
@@ -0,0 +1,225 @@
+import re
+import shlex
+from typing import Dict, List, Optional, Tuple
+
+from element_locator import SCREEN_W, SCREEN_H
+
+# Códigos de evento de Linux para sendevent
+EV_SYN, EV_KEY, EV_ABS = 0, 1, 3
+SYN_REPORT = 0
+BTN_TOUCH = 0x14a
+ABS_MT_SLOT = 0x2f
+ABS_MT_TOUCH_MAJOR = 0x30
+ABS_MT_POSITION_X = 0x35
+ABS_MT_POSITION_Y = 0x36
+ABS_MT_TRACKING_ID = 0x39
+ABS_MT_PRESSURE = 0x3a
+
+
+def escape_input_text(text: str) -> str:
+    """
+    Escapa texto para 'input text' (espacios como %s y comillas de shell)
+    'input text' no tiene escape para '%': un "%s" literal se parte con
+    input_text_commands
+    """
+    return shlex.quote(text.replace(' ', '%s'))
+
+
+def input_text_commands(text: str, chunk: Optional[int] = None) -> List[str]:
+    """Comandos 'input text' para el texto, cortando donde un "%s" literal se leería como espacio"""
+    pieces = [p for p in re.split(r'(?<=%)(?=s)', text) if p]
+    if chunk:
+        pieces = [p[i:i + chunk] for p in pieces for i in range(0, len(p), chunk)]
+    return [f"input text {escape_input_text(p)}" for p in pieces]
+
+
+class InputBatch:
+    """
+    Compilador de entrada por lotes
+    Acumula taps, swipes, teclas, texto y pausas y los ejecuta como un
+    único script en el dispositivo: una ida y vuelta en lugar de una por
+    acción, con los tiempos entre eventos medidos en el propio dispositivo.
+    Incluye pinch real de dos dedos (sendevent multitouch) y arrastre continuo.
+    """
+
+    # Información de pantalla / touchscreen por sesión (se consulta una vez)
+    _device_info: Dict[str, Dict] = {}
+
+    def __init__(self, session, injector=None):
+        self.session = session
+        self.injector = injector  # TextInjector opcional para text()
+        self.lines: List[str] = []
+
+    # ===== OPERACIONES =====
+
+    def tap(self, x: int, y: int) -> 'InputBatch':
+        dx, dy = self._to_device(x, y)
+        self.lines.append(f"input tap {dx} {dy}")
+        return self
+
+    def swipe(self, x1: int, y1: int, x2: int, y2: int, duration: float = 0.3) -> 'InputBatch':
+        a, b = self._to_device(x1, y1), self._to_device(x2, y2)
+        self.lines.append(f"input swipe {a[0]} {a[1]} {b[0]} {b[1]} {int(duration * 1000)}")
+        return self
+
+    def keyevent(self, *keycodes: int) -> 'InputBatch':
+        if keycodes:
+            self.lines.append("input keyevent " + ' '.join(str(k) for k in keycodes))
+        return self
+
+    def text(self, text: str) -> 'InputBatch':
+        if not text:
+            return self
+        if self.injector is not None:
+            self.lines.extend(self.injector.commands(text))
+        else:
+            self.lines.extend(input_text_commands(text))
+        return self
+
+    def sleep(self, seconds: float) -> 'InputBatch':
+        if seconds > 0:
+            self.lines.append(f"sleep {seconds:.3f}")
+        return self
+
+    def raw(self, command: str) -> 'InputBatch':
+        """Comando de shell arbitrario dentro del lote"""
+        self.lines.append(command)
+        return self
+
+    def drag(self, points: List[Tuple[int, int]], duration: float = 0.5) -> 'InputBatch':
+        """Arrastre continuo por varios puntos (input motionevent, Android 11+)"""
+        if len(points) < 2:
+            return self
+
+        pause = duration / (len(points) - 1)
+        device = [self._to_device(x, y) for x, y in points]
+
+        self.lines.append(f"input motionevent DOWN {device[0][0]} {device[0][1]}")
+        for x, y in device[1:]:
+            self.lines.append(f"sleep {pause:.3f}")
+            self.lines.append(f"input motionevent MOVE {x} {y}")
+        self.lines.append(f"input motionevent UP {device[-1][0]} {device[-1][1]}")
+        return self
+
+    def pinch(self, cx: int, cy: int, start_distance: int, end_distance: int,
+              duration: float = 0.4, steps: int = 10) -> 'InputBatch':
+        """
+        Pinch de dos dedos real con sendevent (protocolo multitouch B)
+        start < end: zoom in; start > end: zoom out
+        Sin touchscreen accesible, aproxima con dos swipes simultáneos
+        """
+        touch = self._touch_device()
+        if touch is None:
+            half_s, half_e = start_distance // 2, end_distance // 2
+            a = [self._to_device(cx - half_s, cy), self._to_device(cx - half_e, cy)]
+            b = [self._to_device(cx + half_s, cy), self._to_device(cx + half_e, cy)]
+            ms = int(duration * 1000)
+            self.lines.append(f"input swipe {a[0][0]} {a[0][1]} {a[1][0]} {a[1][1]} {ms} & "
+                              f"input swipe {b[0][0]} {b[0][1]} {b[1][0]} {b[1][1]} {ms}; wait")
+            return self
+
+        dev = touch['path']
+        send = lambda t, c, v: self.lines.append(f"sendevent {dev} {t} {c} {v}")
+
+        for i in range(steps + 1):
+            distance = start_distance + (end_distance - start_distance) * i / steps
+            fingers = [(cx - distance / 2, cy), (cx + distance / 2, cy)]
+
+            for slot, (x, y) in enumerate(fingers):
+                tx, ty = self._to_touch(touch, x, y)
+                send(EV_ABS, ABS_MT_SLOT, slot)
+                if i == 0:
+                    send(EV_ABS, ABS_MT_TRACKING_ID, 100 + slot)
+                    send(EV_ABS, ABS_MT_TOUCH_MAJOR, 5)
+                    send(EV_ABS, ABS_MT_PRESSURE, 50)
+                send(EV_ABS, ABS_MT_POSITION_X, tx)
+                send(EV_ABS, ABS_MT_POSITION_Y, ty)
+
+            if i == 0:
+                send(EV_KEY, BTN_TOUCH, 1)
+            send(EV_SYN, SYN_REPORT, 0)
+            self.lines.append(f"sleep {duration / steps:.3f}")
+
+        # Levantar ambos dedos
+        for slot in range(2):
+            send(EV_ABS, ABS_MT_SLOT, slot)
+            send(EV_ABS, ABS_MT_TRACKING_ID, -1)
+        send(EV_KEY, BTN_TOUCH, 0)
+        send(EV_SYN, SYN_REPORT, 0)
+        return self
+
+    # ===== EJECUCIÓN =====
+
+    def compile(self) -> str:
+        """Script de shell con todo el lote"""
+        return '\n'.join(self.lines)
+
+    def run(self, timeout: Optional[float] = None) -> Dict:
+        """Ejecuta el lote en una sola ida y vuelta"""
+        if not self.lines:
+            return {'success': True, 'operations': 0}
+
+        script = self.compile()
+        operations = len(self.lines)
+        self.lines = []
+
+        try:
+            result = self.session.run(script, timeout=timeout)
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+        return {'success': result.ok, 'operations': operations,
+                'elapsed_ms': result.elapsed_ms, 'output': result.output}
+
+    # ===== DISPOSITIVO =====
+
+    def _info(self) -> Dict:
+        # Por dispositivo (serial o comando de la sesión), no por objeto: id() se reutiliza
+        key = getattr(self.session, 'serial', None) or ' '.join(getattr(self.session, 'argv', None) or [])
+        if key not in self._device_info:
+            self._device_info[key] = {'size': self._query_size(), 'touch': 'unknown'}
+        return self._device_info[key]
+
+    def _query_size(self) -> Tuple[int, int]:
+        try:
+            output = self.session.run('wm size').output
+            # "Override size" tiene prioridad sobre "Physical size"
+            sizes = re.findall(r'(\d+)x(\d+)', output)
+            if sizes:
+                w, h = sizes[-1]
+                return int(w), int(h)
+        except Exception:
+            pass
+        return SCREEN_W, SCREEN_H
+
+    def _to_device(self, x: float, y: float) -> Tuple[int, int]:
+        """Coordenadas de referencia (1080x1920) -> píxeles del dispositivo"""
+        w, h = self._info()['size']
+        return int(x * w / SCREEN_W), int(y * h / SCREEN_H)
+
+    def _to_touch(self, touch: Dict, x: float, y: float) -> Tuple[int, int]:
+        """Coordenadas de referencia -> rango ABS del touchscreen"""
+        return (int(x / SCREEN_W * touch['max_x']), int(y / SCREEN_H * touch['max_y']))
+
+    def _touch_device(self) -> Optional[Dict]:
+        """Busca el touchscreen multitouch con 'getevent -pl'"""
+        info = self._info()
+        if info['touch'] != 'unknown':
+            return info['touch']
+
+        touch = None
+        try:
+            output = self.session.run('getevent -pl').output
+            for block in re.split(r'(?=add device \d+:)', output):
+                path = re.search(r'add device \d+:\s*(\S+)', block)
+                max_x = re.search(r'ABS_MT_POSITION_X\s*:.*?max (\d+)', block)
+                max_y = re.search(r'ABS_MT_POSITION_Y\s*:.*?max (\d+)', block)
+                if path and max_x and max_y:
+                    touch = {'path': path.group(1), 'max_x': int(max_x.group(1)),
+                             'max_y': int(max_y.group(1))}
+                    break
+        except Exception:
+            touch = None
+
+        info['touch'] = touch
+        return touch
@@ -0,0 +1,149 @@
+import re
+import shlex
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from urllib.parse import quote
+
+# capacidad -> constructor de comandos 'am start ...'
+FAST_PATHS: Dict[str, Callable[..., Optional[List[str]]]] = {}
+
+
+def fast_path(capability: str):
+    """Registra un atajo por intent para una capacidad"""
+    def decorator(builder):
+        FAST_PATHS[capability] = builder
+        return builder
+    return decorator
+
+
+def is_phone_number(value: str) -> bool:
+    return bool(value) and re.fullmatch(r'\+?[\d\s\-()]{6,}', value.strip()) is not None
+
+
+def digits(value: str) -> str:
+    return re.sub(r'[^\d+]', '', value or '')
+
+
+def am_start(action: str, data: Optional[str] = None, package: Optional[str] = None,
+             extras: Optional[Dict] = None) -> str:
+    """Construye un 'am start' con los valores escapados para el shell"""
+    parts = ['am start', '-a', action]
+    if data:
+        parts += ['-d', shlex.quote(data)]
+    for key, value in (extras or {}).items():
+        flag = '--el' if isinstance(value, int) else '--es'
+        parts += [flag, key, shlex.quote(str(value))]
+    if package:
+        parts += ['-p', package]
+    return ' '.join(parts)
+
+
+# ===== ATAJOS =====
+
+@fast_path('make_phone_call')
+def _call(contact: str, number: Optional[str] = None, **_) -> Optional[List[str]]:
+    number = number or (contact if is_phone_number(contact) else None)
+    if not number:
+        return None
+    return [am_start('android.intent.action.CALL', f'tel:{digits(number)}')]
+
+
+@fast_path('send_whatsapp_message')
+def _whatsapp(contact: str, message: str, number: Optional[str] = None, **_) -> Optional[List[str]]:
+    # Abre el chat con el mensaje ya escrito; solo falta pulsar enviar
+    number = number or (contact if is_phone_number(contact) else None)
+    if not number:
+        return None
+    url = f"https://wa.me/{digits(number).lstrip('+')}?text={quote(message)}"
+    return [am_start('android.intent.action.VIEW', url, 'com.whatsapp')]
+
+
+@fast_path('navigate_to')
+def _navigate(destination: str, app: str = 'google_maps', **_) -> Optional[List[str]]:
+    if app != 'google_maps':
+        return None
+    return [am_start('android.intent.action.VIEW', f'google.navigation:q={quote(destination)}',
+                     'com.google.android.apps.maps')]
+
+
+@fast_path('web_search')
+def _web_search(query: str, package: Optional[str] = None, **_) -> Optional[List[str]]:
+    return [am_start('android.intent.action.WEB_SEARCH', package=package,
+                     extras={'query': query})]
+
+
+@fast_path('create_calendar_event')
+def _calendar(title: str, event_datetime: datetime, duration: int = 60, **_) -> Optional[List[str]]:
+    # Abre el editor con título y horas rellenos; solo falta guardar
+    begin = int(event_datetime.timestamp() * 1000)
+    end = begin + duration * 60 * 1000
+    return [am_start('android.intent.action.INSERT', 'content://com.android.calendar/events',
+                     extras={'title': title, 'beginTime': begin, 'endTime': end})]
+
+
+@fast_path('search_youtube')
+def _youtube(query: str, **_) -> Optional[List[str]]:
+    return [am_start('android.intent.action.SEARCH', package='com.google.android.youtube',
+                     extras={'query': query})]
+
+
+class IntentFastPaths:
+    """
+    Atajos por intent de Android para las capacidades
+    Cada capacidad prueba primero su intent directo (tel:, wa.me,
+    google.navigation:, WEB_SEARCH, INSERT, SEARCH) y solo si no aplica
+    o falla recurre a la automatización de UI
+    """
+
+    def __init__(self, session, enabled: bool = True):
+        self.session = session
+        self.enabled = enabled
+
+        # Estadísticas
+        self.hits = 0
+        self.fallbacks = 0
+
+    def run(self, capability: str, **kwargs) -> Optional[Dict]:
+        """
+        Ejecuta el atajo de la capacidad
+        Retorna {'success': True, 'via': 'intent', ...} o None para usar la UI
+        """
+        builder = FAST_PATHS.get(capability)
+        if not self.enabled or builder is None:
+            return None
+
+        try:
+            commands = builder(**kwargs)
+        except Exception as e:
+            print(f"[!] Atajo {capability} no aplicable: {e}")
+            commands = None
+
+        if not commands:
+            self.fallbacks += 1
+            return None
+
+        start = time.time()
+        try:
+            results = self.session.pipeline(commands)
+        except Exception as e:
+            print(f"[!] Error en atajo {capability}: {e}")
+            self.fallbacks += 1
+            return None
+
+        failed = [r for r in results if not r.ok or 'Error' in r.output]
+        if failed:
+            print(f"[!] Atajo {capability} falló: {failed[0].output.strip()[:120]}")
+            self.fallbacks += 1
+            return None
+
+        self.hits += 1
+        elapsed = (time.time() - start) * 1000
+        print(f"[⚡] {capability} por intent ({elapsed:.0f} ms)")
+        return {'success': True, 'via': 'intent', 'elapsed_ms': elapsed}
+
+    def has(self, capability: str) -> bool:
+        return capability in FAST_PATHS
+
+    def get_statistics(self) -> Dict:
+        return {'hits': self.hits, 'fallbacks': self.fallbacks}
@@ -0,0 +1,186 @@
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from element_locator import SCREEN_W, SCREEN_H
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+
+@dataclass
+class TextBlock:
+    """Línea de texto reconocida (caja en coordenadas de referencia 1080x1920)"""
+    text: str
+    x: int
+    y: int
+    w: int
+    h: int
+    confidence: float  # 0-100
+
+
+def text_signature(frame, margin: int = 24) -> str:
+    """
+    Huella del contenido: dHash a resolución completa
+    Signo del gradiente horizontal de cada píxel, con zona muerta para
+    que el ruido de compresión en zonas planas no cuente. Sin reducir
+    la imagen: un cambio en texto fino (un dígito, una tilde) cambia la
+    huella.
+    """
+    # Canal verde como gris: barato y casi igual a la luminancia
+    gray = (frame[..., 1] if frame.ndim == 3 else frame).astype(np.int16)
+    diff = np.diff(gray, axis=1)
+    edges = np.packbits(diff > margin).tobytes() + np.packbits(diff < -margin).tobytes()
+    return hashlib.blake2b(edges, digest_size=16).hexdigest()
+
+
+class LocalOCR:
+    """
+    Lectura de texto en pantalla con OCR local (Tesseract en CPU)
+    Devuelve bloques con caja y confianza, cachea por huella del frame y
+    solo escala al modelo remoto si el OCR no está disponible o la
+    confianza es baja. Misma forma de respuesta que vision.read_screen_text.
+    """
+
+    def __init__(self, vision=None, lang: str = 'spa+eng', min_confidence: float = 70.0,
+                 min_words: int = 2, cache_size: int = 32, downscale: int = 1):
+        self.vision = vision
+        self.lang = lang
+        self.min_confidence = min_confidence
+        self.min_words = min_words
+        self.cache_size = cache_size
+        self.downscale = max(1, downscale)  # 2 = la mitad de píxeles (más rápido)
+
+        self._cache: OrderedDict = OrderedDict()
+
+        # Estadísticas
+        self.local_reads = 0
+        self.cache_hits = 0
+        self.escalations = 0
+        self.total_time = 0.0
+
+    @property
+    def available(self) -> bool:
+        return pytesseract is not None
+
+    # ===== API PÚBLICA =====
+
+    def read_screen_text(self, frame) -> Dict:
+        """
+        Texto de la pantalla: OCR local y, si no basta, el modelo
+        Retorna {'all_text', 'blocks', 'confidence', 'source'}
+        """
+        result = self.read(frame)
+        if result is not None and self._good_enough(result):
+            return result
+
+        if self.vision is None:
+            return result or {'all_text': '', 'blocks': [], 'confidence': 0.0, 'source': 'none'}
+
+        self.escalations += 1
+        analysis = self.vision.read_screen_text(frame)
+        analysis.setdefault('source', 'vision')
+        return analysis
+
+    def read(self, frame) -> Optional[Dict]:
+        """Solo OCR local (None si no hay backend o frame)"""
+        if frame is None or not self.available:
+            return None
+
+        key = text_signature(frame)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return self._cache[key]
+
+        start = time.time()
+        try:
+            blocks = self._recognize(frame)
+        except Exception as e:
+            print(f"[!] Error en OCR local: {e}")
+            return None
+
+        self.local_reads += 1
+        self.total_time += time.time() - start
+
+        result = self._to_result(blocks)
+        self._cache[key] = result
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def get_statistics(self) -> Dict:
+        return {
+            'available': self.available,
+            'local_reads': self.local_reads,
+            'cache_hits': self.cache_hits,
+            'escalations': self.escalations,
+            'avg_ocr_ms': (self.total_time / self.local_reads * 1000) if self.local_reads else 0.0
+        }
+
+    # ===== UTILIDADES PRIVADAS =====
+
+    def _good_enough(self, result: Dict) -> bool:
+        return (len(result['all_text'].split()) >= self.min_words and
+                result['confidence'] >= self.min_confidence)
+
+    def _recognize(self, frame) -> List[TextBlock]:
+        """Palabras de Tesseract agrupadas en líneas"""
+        frame = frame[::self.downscale, ::self.downscale]
+        gray = frame.mean(axis=2) if frame.ndim == 3 else frame.astype(np.float32)
+        # Temas oscuros: Tesseract rinde mejor con texto oscuro sobre fondo claro
+        if gray.mean() < 110:
+            gray = 255 - gray
+        image = gray.astype(np.uint8)
+
+        data = pytesseract.image_to_data(
+            image, lang=self.lang, config='--oem 1 --psm 11',
+            output_type=pytesseract.Output.DICT
+        )
+
+        h, w = image.shape[:2]
+        sx, sy = SCREEN_W / w, SCREEN_H / h
+
+        lines: Dict[tuple, List[int]] = {}
+        for i, word in enumerate(data['text']):
+            if word.strip() and float(data['conf'][i]) >= 0:
+                key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+                lines.setdefault(key, []).append(i)
+
+        blocks = []
+        for indices in lines.values():
+            left = min(data['left'][i] for i in indices)
+            top = min(data['top'][i] for i in indices)
+            right = max(data['left'][i] + data['width'][i] for i in indices)
+            bottom = max(data['top'][i] + data['height'][i] for i in indices)
+            words = [data['text'][i].strip() for i in indices]
+            confidence = sum(float(data['conf'][i]) * len(data['text'][i]) for i in indices) / \
+                max(1, sum(len(data['text'][i]) for i in indices))
+
+            blocks.append(TextBlock(
+                text=' '.join(words),
+                x=int(left * sx), y=int(top * sy),
+                w=int((right - left) * sx), h=int((bottom - top) * sy),
+                confidence=round(confidence, 1)
+            ))
+
+        # Orden de lectura: de arriba abajo, de izquierda a derecha
+        blocks.sort(key=lambda b: (b.y // 20, b.x))
+        return blocks
+
+    @staticmethod
+    def _to_result(blocks: List[TextBlock]) -> Dict:
+        chars = sum(len(b.text) for b in blocks)
+        confidence = (sum(b.confidence * len(b.text) for b in blocks) / chars) if chars else 0.0
+        return {
+            'all_text': '\n'.join(b.text for b in blocks),
+            'blocks': [asdict(b) for b in blocks],
+            'confidence': round(confidence, 1),
+            'source': 'ocr'
+        }
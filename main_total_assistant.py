@@ -1,9 +1,9 @@
 import cv2
 import time
 import json
-import sys
+import threading
 from assistant_core import AssistantCore
-from conversation_manager import ConversationManager
+from async_conversation import AsyncConversationManager
 from assistant_capabilities import AssistantCapabilities
 from multimodal_fusion import MultimodalFusionSystem
 
@@ -17,6 +17,15 @@ from vision_gemini import GeminiVision
 from screen_capture import ScreenCapture
 from controlador_manager import ControladorHibrido
 from smart_cache import SmartCache
+from element_locator import ElementLocator
+from element_cache import ElementCache
+from ui_hierarchy import UIHierarchy
+from adb_session import get_session
+from input_batch import InputBatch
+from raw_screencap import RawScreencap
+from screen_stream import ScreenStream
+from tts_cache import CachedSpeech, KNOWN_PHRASES
+from wake_word import WakeWordDetector
 
 class TotalAssistant:
     """
@@ -47,27 +56,57 @@ class TotalAssistant:
         
         # Conexión con dispositivo
         modo, url, ip = self._setup_connection()
-        self.screen = ScreenCapture(modo=modo, url_stream=url)
+        # En ADB: stream H.264 continuo (con screencap en crudo de respaldo)
+        if modo == 'adb':
+            self.screen = self._setup_adb_screen(config.get('screen_stream', {}))
+        else:
+            self.screen = ScreenCapture(modo=modo, url_stream=url)
         self.control = ControladorHibrido(modo=modo, ip=ip)
         
         # Visión y cache
         self.vision = GeminiVision(config['api_services']['openrouter'])
         self.cache = SmartCache(max_memory_mb=150)
         
-        # Voz
-        self.voice = VoiceManager()
+        # Búsqueda de elementos: árbol de UI (solo ADB) y luego visión
+        self.adb = get_session()
+        self.ui_tree = UIHierarchy(self.adb) if modo == 'adb' else None
+        self.locator = ElementLocator(self.vision, ui_tree=self.ui_tree)
+        self.modo = modo
+        
+        # Voz (frases fijas servidas desde cache de audio)
+        self.voice = CachedSpeech(VoiceManager())
+        
+        # Palabra de activación local: nada va al reconocimiento hasta oírla
+        self.wake = WakeWordDetector()
+        # Quién usa el micrófono fuera del detector (orden tras la palabra, respuestas)
+        self._mic_users = 0
+        self._mic_lock = threading.Lock()
         
         # === PASO 2: NÚCLEO INTELIGENTE ===
         print("[🧠] Inicializando núcleo cognitivo...")
         
         self.core = AssistantCore(self.vision, self.voice)
-        self.conversation = ConversationManager(self.core, self.voice)
+        self.conversation = AsyncConversationManager(self.core, self.voice)
         self.capabilities = AssistantCapabilities(self.control, self.vision, self.voice)
         
         # Inyectar dependencias
         self.capabilities.inject_screen_capture(self.screen)
         self.capabilities.inject_core(self.core)
+        self.capabilities.inject_locator(self.locator)
+        self.core.inject_locator(self.locator)
+        self.settle = self.capabilities.settle
+        
+        # Posiciones ya resueltas: en ADB se separan por app y versión
+        self.element_cache = ElementCache(
+            self.adb if modo == 'adb' else None,
+            package_provider=self.settle.foreground_package if modo == 'adb' else None
+        )
+        self.locator.inject_cache(self.element_cache)
+        self.conversation.inject_contact_index(self.capabilities.contacts)
+        self.core.inject_notification_reader(self.capabilities.notifications)
         self.conversation.inject_control_system(self)
+        self.conversation.on_result = self._on_conversation_result
+        self.voice.prewarm(KNOWN_PHRASES + self._greeting_phrases())
         
         # === PASO 3: INPUTS MULTIMODALES ===
         print("[🎮] Inicializando controles multimodales...")
@@ -93,6 +132,27 @@ class TotalAssistant:
         print("\n[✓] Sistema completo inicializado")
         print(f"[🤖] {self.core.personality['name']} listo para ayudarte\n")
     
+    def _greeting_phrases(self) -> list:
+        """Todas las variantes de saludo de ConversationManager._generate_greeting"""
+        name = self.core.personality['name']
+        return [f"{start}. Soy {name}{end}"
+                for start in ("Buenos días", "Buenas tardes", "Buenas noches")
+                for end in (". ¿En qué te ayudo hoy?", ", tu asistente personal. ¿Qué necesitas?")]
+    
+    def _setup_adb_screen(self, stream_config: dict):
+        """Fuente de frames en modo ADB: stream si está disponible, screencap si no"""
+        screencap = RawScreencap()
+        if not stream_config.get('enabled', True):
+            return screencap
+        
+        size = stream_config.get('size')
+        stream = ScreenStream(
+            size=tuple(size) if size else None,
+            bit_rate=stream_config.get('bit_rate', 6_000_000),
+            fallback=screencap
+        )
+        return stream if stream.start() else screencap
+    
     def _setup_connection(self):
         """Configurar conexión"""
         print("\n=== CONFIGURACIÓN DE CONEXIÓN ===")
@@ -165,8 +225,8 @@ class TotalAssistant:
         # Iniciar conversación
         self.conversation.start_conversation()
         
-        # Configurar escucha de voz continua
-        self.voice.listen_continuous(self._handle_voice_input)
+        # Escucha de voz (palabra de activación local o escucha continua)
+        self._start_listening()
         
         # Main loop
         self.running = True
@@ -176,8 +236,12 @@ class TotalAssistant:
         """Modo solo voz"""
         print("\n[🎤] Modo Solo Voz activado")
         
+        if self.wake.available and not self.wake.ready:
+            if self._ask_yes_no("¿Grabar la palabra de activación?"):
+                self._enroll_wake_word()
+        
         self.conversation.start_conversation()
-        self.voice.listen_continuous(self._handle_voice_input)
+        self._start_listening()
         
         self.running = True
         
@@ -389,10 +453,64 @@ class TotalAssistant:
     
     # === HANDLERS DE INPUTS ===
     
+    def _start_listening(self):
+        """Palabra de activación local si hay plantillas; si no, escucha continua"""
+        if self.wake.start(self._on_wake_word):
+            print(f"[👂] Esperando '{self._wake_phrase()}' (detección local)")
+            # Sin escucha continua: las respuestas se escuchan bajo demanda
+            self.conversation.answer_listener = self._listen_for_answer
+        else:
+            self.voice.listen_continuous(self._handle_voice_input)
+    
+    def _on_wake_word(self):
+        """Palabra de activación oída: solo ahora se transcribe lo que sigue"""
+        self._borrow_mic()
+        try:
+            if not self.capabilities.speech.speaking:
+                self.voice.speak("Dime")
+            text = self.voice.listen_once()
+            if text:
+                self._handle_voice_input(text)
+        finally:
+            self._return_mic()
+    
+    def _listen_for_answer(self) -> str:
+        """Escucha una respuesta con el micrófono prestado por la palabra de activación"""
+        self._borrow_mic()
+        try:
+            return self.voice.listen_once() or ''
+        finally:
+            self._return_mic()
+    
+    def _borrow_mic(self):
+        """El detector suelta el micrófono con el primer usuario..."""
+        with self._mic_lock:
+            self._mic_users += 1
+            if self._mic_users == 1:
+                self.wake.pause()
+    
+    def _return_mic(self):
+        """...y solo lo recupera cuando lo devuelve el último"""
+        with self._mic_lock:
+            self._mic_users -= 1
+            if self._mic_users == 0:
+                self.wake.resume()
+    
     def _handle_voice_input(self, text: str):
         """Handler para input de voz"""
         print(f"\n[🎤] Usuario dice: '{text}'")
         
+        # Control de una lectura en curso
+        speech = self.capabilities.speech
+        if speech.speaking:
+            command = text.lower().strip()
+            if command in ('para', 'cállate', 'callate', 'basta', 'stop'):
+                speech.cancel()
+                return
+            if command in ('siguiente', 'salta', 'sáltate eso'):
+                speech.skip()
+                return
+        
         # Verificar si es activación
         wake_words = ['hola', 'hey', 'oye']
         if any(wake in text.lower() for wake in wake_words):
@@ -400,11 +518,12 @@ class TotalAssistant:
                 self.voice.speak("Dime")
                 return
         
-        # Procesar como comando
+        # Procesar como comando (sin esperar: la escucha sigue mientras se piensa y actúa)
         android_frame = self.screen.get_frame()
-        result = self.conversation.process_user_input(text, android_frame)
-        
-        # Si fue exitoso, agregar a memoria
+        self.conversation.submit(text, android_frame)
+    
+    def _on_conversation_result(self, text: str, result: dict):
+        """Turno terminado: si fue exitoso, agregar a memoria"""
         if result.get('success'):
             self.core.context.recent_actions.append(f"voice_{text[:20]}")
     
@@ -473,6 +592,12 @@ class TotalAssistant:
         
         center_x, center_y = 540, 960
         
+        if self.modo == 'adb':
+            # Pinch real de dos dedos en un solo script en el dispositivo
+            start, end = (200, 600) if direction == 'in' else (600, 200)
+            InputBatch(self.adb).pinch(center_x, center_y, start, end, duration=0.3).run()
+            return
+        
         if direction == 'in':
             self.control.swipe(center_x-100, center_y, center_x-200, center_y, 0.3)
             time.sleep(0.05)
@@ -507,7 +632,7 @@ class TotalAssistant:
         
         # Usar conversación manager
         android_frame = self.screen.get_frame()
-        self.conversation.process_user_input(command, android_frame)
+        self.conversation.submit(command, android_frame)
     
     # === UTILIDADES ===
     
@@ -756,9 +881,34 @@ class TotalAssistant:
         self.voice.speak("Calibración de audio. Haz un chasquido cuando te lo indique")
         self.audio_controller.calibrate()
         
+        # Palabra de activación (si hay micrófono para la detección local)
+        if self.wake.available:
+            self._enroll_wake_word()
+        
         self.voice.speak("Calibración completa. Sistema listo")
         print("\n[✓] Calibración completada")
     
+    def _wake_phrase(self) -> str:
+        return f"Hola {self.core.personality['name']}"
+    
+    def _enroll_wake_word(self, samples: int = 3):
+        """Graba varias veces la frase de activación como plantillas"""
+        phrase = self._wake_phrase()
+        print(f"\n[👂] Palabra de activación: '{phrase}'")
+        self.voice.speak(f"Di {phrase} cada vez que te lo pida")
+        
+        # Plantillas nuevas en lugar de las anteriores (si no, el umbral solo se afloja)
+        self.wake.clear_templates()
+        recorded = 0
+        for i in range(samples):
+            input(f"  {i + 1}/{samples}: pulsa Enter y di '{phrase}'...")
+            if self.wake.enroll(self.wake.record(2.0)):
+                recorded += 1
+            else:
+                print("  [!] No se oyó nada, repite")
+        
+        print(f"[✓] {recorded} plantillas grabadas (umbral {self.wake.threshold:.1f})")
+    
     def _ask_yes_no(self, question: str) -> bool:
         """Pregunta sí/no"""
         response = input(f"{question} (s/n): ").lower()
@@ -777,9 +927,27 @@ class TotalAssistant:
         if hasattr(self, 'audio_controller'):
             self.audio_controller.stop()
         
+        if hasattr(self, 'wake'):
+            self.wake.stop()
+        
+        if hasattr(self, 'conversation'):
+            self.conversation.stop()
+        
         if hasattr(self, 'webcam'):
             self.webcam.release()
         
+        if isinstance(getattr(self, 'screen', None), ScreenStream):
+            self.screen.stop()
+        
+        if hasattr(self, 'element_cache'):
+            self.element_cache.save()
+        
+        if isinstance(getattr(self, 'voice', None), CachedSpeech):
+            self.voice.cache.save()
+        
+        if hasattr(self, 'adb'):
+            self.adb.close()
+        
         cv2.destroyAllWindows()
         
         # Guardar memoria
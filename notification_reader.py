@@ -0,0 +1,173 @@
+import re
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# Flags de Notification que no interesa leer en voz alta
+FLAG_ONGOING_EVENT = 0x2
+FLAG_FOREGROUND_SERVICE = 0x40
+FLAG_GROUP_SUMMARY = 0x200
+
+# Apps cuyas notificaciones son mensajes
+MESSAGING_PACKAGES = {
+    'com.whatsapp', 'com.whatsapp.w4b', 'org.telegram.messenger',
+    'com.google.android.apps.messaging', 'com.facebook.orca', 'com.instagram.android',
+    'com.discord', 'com.Slack', 'com.google.android.gm', 'com.microsoft.teams',
+    'org.thoughtcrime.securesms',
+}
+
+_RECORD_SPLIT = re.compile(r'^\s*NotificationRecord\(', re.MULTILINE)
+_EXTRA = r'^\s*android\.{name}=\w+(?:\[\])? \((.*)\)\s*$'
+
+
+@dataclass
+class NotificationRecord:
+    """Notificación activa"""
+    key: str
+    package: str
+    title: str
+    text: str
+    time: float  # segundos epoch
+    group: Optional[str] = None
+    category: Optional[str] = None
+    flags: int = 0
+
+    @property
+    def is_message(self) -> bool:
+        return self.category == 'msg' or self.package in MESSAGING_PACKAGES
+
+    @property
+    def summary(self) -> str:
+        if self.title and self.text:
+            return f"{self.title}: {self.text}"
+        return self.title or self.text
+
+
+class NotificationReader:
+    """
+    Lector de notificaciones vía 'dumpsys notification --noredact'
+    Convierte la salida en registros estructurados sin abrir el panel ni
+    llamar a visión. Cache incremental por clave de notificación: solo se
+    parsean los bloques nuevos o actualizados.
+    """
+
+    def __init__(self, session, ttl: float = 2.0):
+        self.session = session
+        self.ttl = ttl
+
+        self._records: Dict[str, NotificationRecord] = {}
+        self._stamps: Dict[str, str] = {}  # clave -> marca de actualización
+        self._announced: set = set()
+        self._fetched_at = 0.0
+
+        # Estadísticas
+        self.dumps = 0
+        self.parsed = 0
+        self.reused = 0
+
+    # ===== CONSULTAS =====
+
+    def active(self, include_silent: bool = False) -> List[NotificationRecord]:
+        """Notificaciones activas, más recientes primero"""
+        self._refresh()
+        records = list(self._records.values())
+        if not include_silent:
+            records = [r for r in records if not r.flags & (
+                FLAG_ONGOING_EVENT | FLAG_FOREGROUND_SERVICE | FLAG_GROUP_SUMMARY)]
+        return sorted(records, key=lambda r: r.time, reverse=True)
+
+    def unread(self, mark: bool = True) -> List[NotificationRecord]:
+        """Notificaciones que aún no se han anunciado al usuario"""
+        records = [r for r in self.active() if r.key not in self._announced]
+        if mark:
+            self._announced.update(r.key for r in records)
+        return records
+
+    def messages(self, only_unread: bool = False) -> List[NotificationRecord]:
+        """Notificaciones de mensajería"""
+        records = self.active()
+        if only_unread:
+            records = [r for r in records if r.key not in self._announced]
+        return [r for r in records if r.is_message]
+
+    def get_statistics(self) -> Dict:
+        return {'active': len(self._records), 'dumps': self.dumps,
+                'parsed': self.parsed, 'reused': self.reused}
+
+    # ===== PARSEO =====
+
+    def _refresh(self):
+        if time.time() - self._fetched_at < self.ttl:
+            return
+
+        try:
+            output = self.session.run('dumpsys notification --noredact').output
+        except Exception as e:
+            print(f"[!] Error leyendo notificaciones: {e}")
+            return
+
+        self.dumps += 1
+        self._fetched_at = time.time()
+
+        # Solo la lista de activas (no archivadas ni pospuestas)
+        start = output.find('Notification List:')
+        if start >= 0:
+            output = output[start:]
+        end = re.search(r'^\s*(?:snoozed|Snoozed|mArchive|ArchivedNotifications)', output, re.MULTILINE)
+        if end:
+            output = output[:end.start()]
+
+        records = {}
+        for block in _RECORD_SPLIT.split(output)[1:]:
+            key = _first(r'^\s*key=(\S+)', block) or _first(r'key=(\S+?):', block)
+            if not key or key in records:
+                continue
+
+            stamp = _first(r'mUpdateTimeMs=(\d+)', block) or _first(r'\bwhen=(\d+)', block) or ''
+            cached = self._records.get(key)
+            if cached is not None and self._stamps.get(key) == stamp:
+                records[key] = cached
+                self.reused += 1
+                continue
+
+            record = self._parse_block(key, block)
+            if record is not None:
+                records[key] = record
+                self._stamps[key] = stamp
+                self.parsed += 1
+
+        # Las descartadas desaparecen de la cache
+        for key in set(self._records) - set(records):
+            self._stamps.pop(key, None)
+            self._announced.discard(key)
+        self._records = records
+
+    @staticmethod
+    def _parse_block(key: str, block: str) -> Optional[NotificationRecord]:
+        package = _first(r'pkg=(\S+)', block)
+        if not package:
+            return None
+
+        title = _first(_EXTRA.format(name='title'), block, re.MULTILINE) or ''
+        text = (_first(_EXTRA.format(name='bigText'), block, re.MULTILINE)
+                or _first(_EXTRA.format(name='text'), block, re.MULTILINE) or '')
+
+        when = (_first(r'mCreationTimeMs=(\d+)', block) or _first(r'\bwhen=(\d+)', block)
+                or _first(r'postTime=(\d+)', block))
+        flags = _first(r'flags=0x([0-9a-fA-F]+)', block)
+
+        return NotificationRecord(
+            key=key,
+            package=package,
+            title=title.strip(),
+            text=text.strip(),
+            time=int(when) / 1000 if when else time.time(),
+            group=_first(r'groupKey=(\S+)', block),
+            category=_first(r'category=(\w+)', block),
+            flags=int(flags, 16) if flags else 0
+        )
+
+
+def _first(pattern: str, text: str, flags: int = re.MULTILINE) -> Optional[str]:
+    match = re.search(pattern, text, flags)
+    return match.group(1) if match else None
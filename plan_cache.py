@@ -0,0 +1,206 @@
+import copy
+import re
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+PLACEHOLDER = "{{%s}}"
+
+
+@dataclass
+class PlanTemplate:
+    """Plan de ejecución compilado y parametrizado"""
+    intent: str
+    action: str
+    param_schema: List[str]
+    steps: List[Dict[str, Any]]  # params con marcadores {{nombre}}
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    created: float = field(default_factory=time.time)
+    last_used: float = 0.0
+
+    @property
+    def failure_rate(self) -> float:
+        total = self.successes + self.failures
+        return self.failures / total if total else 0.0
+
+
+class PlanCache:
+    """
+    Cache de planes compilados
+    Convierte los execution_steps de ejecuciones exitosas en plantillas
+    parametrizadas por (intent, action, esquema de parámetros) para
+    reutilizarlas sin pedirle el plan otra vez al LLM
+    """
+
+    def __init__(self, max_templates: int = 200, max_failure_rate: float = 0.25,
+                 max_consecutive_failures: int = 2):
+        self.templates: Dict[str, PlanTemplate] = {}
+        self.max_templates = max_templates
+        self.max_failure_rate = max_failure_rate
+        self.max_consecutive_failures = max_consecutive_failures
+
+        # Estadísticas
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ===== API PÚBLICA =====
+
+    @staticmethod
+    def make_key(intent: str, action: str, params: Dict[str, Any]) -> str:
+        """Clave de plantilla: intent|action|parámetros ordenados"""
+        schema = ','.join(sorted(params.keys())) if params else ''
+        return f"{intent or ''}|{action or ''}|{schema}"
+
+    def lookup(self, intent_data: Dict) -> Optional[Tuple[str, List[Dict]]]:
+        """
+        Busca una plantilla para el intent y la instancia con sus parámetros
+        Retorna (clave, pasos) o None
+        """
+        params = intent_data.get('parameters') or {}
+        key = self.make_key(intent_data.get('intent'), intent_data.get('action'), params)
+
+        template = self.templates.get(key)
+        if template is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        template.last_used = time.time()
+        return key, self.instantiate(template, params)
+
+    def compile(self, intent_data: Dict, steps: List[Dict]) -> Optional[str]:
+        """Compila los pasos de una ejecución exitosa en una plantilla"""
+        if not steps:
+            return None
+
+        params = intent_data.get('parameters') or {}
+        key = self.make_key(intent_data.get('intent'), intent_data.get('action'), params)
+
+        template = self.templates.get(key)
+        if template is None:
+            if len(self.templates) >= self.max_templates:
+                self._evict_least_used()
+
+            template = PlanTemplate(
+                intent=intent_data.get('intent'),
+                action=intent_data.get('action'),
+                param_schema=sorted(params.keys()),
+                steps=[self._parametrize(step, params) for step in steps]
+            )
+            self.templates[key] = template
+            print(f"[⚡] Plan compilado: {key}")
+
+        template.successes += 1
+        template.consecutive_failures = 0
+        template.last_used = time.time()
+        return key
+
+    def record_result(self, key: str, success: bool):
+        """Registra el resultado de una plantilla reutilizada"""
+        template = self.templates.get(key)
+        if template is None:
+            return
+
+        if success:
+            template.successes += 1
+            template.consecutive_failures = 0
+            return
+
+        template.failures += 1
+        template.consecutive_failures += 1
+
+        if (template.consecutive_failures >= self.max_consecutive_failures or
+                template.failure_rate > self.max_failure_rate):
+            self.evict(key)
+
+    def evict(self, key: str):
+        """Elimina una plantilla"""
+        if self.templates.pop(key, None) is not None:
+            self.evictions += 1
+            print(f"[🗑️] Plan compilado descartado: {key}")
+
+    def instantiate(self, template: PlanTemplate, params: Dict[str, Any]) -> List[Dict]:
+        """Sustituye los marcadores de la plantilla por los parámetros"""
+        return [self._substitute(copy.deepcopy(step), params) for step in template.steps]
+
+    def known_plans(self) -> List[str]:
+        """Claves de los planes disponibles (para el prompt)"""
+        return list(self.templates.keys())
+
+    def get_statistics(self) -> Dict:
+        """Estadísticas de uso"""
+        total = self.hits + self.misses
+        return {
+            'templates': len(self.templates),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / total * 100) if total else 0.0,
+            'evictions': self.evictions
+        }
+
+    # ===== PERSISTENCIA =====
+
+    def to_dict(self) -> Dict:
+        return {key: asdict(t) for key, t in self.templates.items()}
+
+    def load_dict(self, data: Dict):
+        self.templates = {key: PlanTemplate(**t) for key, t in (data or {}).items()}
+
+    # ===== UTILIDADES PRIVADAS =====
+
+    def _parametrize(self, value: Any, params: Dict[str, Any], key: Optional[str] = None) -> Any:
+        """
+        Reemplaza valores concretos de parámetros por marcadores
+        Los textos se sustituyen por palabras completas; los valores no
+        textuales (coordenadas, duraciones) solo si el campo se llama como
+        el parámetro
+        """
+        if isinstance(value, dict):
+            return {k: self._parametrize(v, params, k) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._parametrize(v, params, key) for v in value]
+
+        if not isinstance(value, str):
+            if key in params and value == params[key] and not isinstance(value, bool):
+                return PLACEHOLDER % key
+            return value
+
+        # Texto idéntico: marcador completo (conserva el tipo al instanciar)
+        for name, param_value in params.items():
+            if isinstance(param_value, str) and value == param_value:
+                return PLACEHOLDER % name
+
+        # Texto que contiene el valor: "chat de Ana" -> "chat de {{contact}}"
+        # Primero los valores más largos para no romper solapamientos
+        for name, param_value in sorted(params.items(), key=lambda kv: -len(str(kv[1]))):
+            if isinstance(param_value, str) and len(param_value) >= 2:
+                pattern = rf'(?<!\w){re.escape(param_value)}(?!\w)'
+                value = re.sub(pattern, lambda m: PLACEHOLDER % name, value)
+
+        return value
+
+    def _substitute(self, value: Any, params: Dict[str, Any]) -> Any:
+        """Sustituye marcadores por valores"""
+        if isinstance(value, dict):
+            return {k: self._substitute(v, params) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._substitute(v, params) for v in value]
+
+        if isinstance(value, str) and '{{' in value:
+            for name, param_value in params.items():
+                marker = PLACEHOLDER % name
+                if value == marker:
+                    return param_value
+                value = value.replace(marker, str(param_value))
+
+        return value
+
+    def _evict_least_used(self):
+        """Descarta la plantilla menos usada recientemente"""
+        if not self.templates:
+            return
+        oldest = min(self.templates, key=lambda k: self.templates[k].last_used)
+        self.evict(oldest)
@@ -0,0 +1,177 @@
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from element_locator import SCREEN_W, SCREEN_H
+
+
+class RawScreencap:
+    """
+    Captura de pantalla en crudo vía 'adb exec-out screencap'
+    Lee el RGBA sin comprimir (sin codificar/decodificar PNG) directamente
+    en un buffer numpy reutilizable. Soporta región y reducción de escala
+    como vistas sobre el buffer (sin copias extra).
+    """
+
+    def __init__(self, serial: Optional[str] = None, downscale: int = 1,
+                 timeout: float = 5.0):
+        self.serial = serial
+        self.downscale = max(1, downscale)
+        self.timeout = timeout
+
+        self._buffer: Optional[np.ndarray] = None
+        self._header_size: Optional[int] = None
+        self._lock = threading.Lock()
+        self.last_capture_at = 0.0
+
+        # Estadísticas
+        self.captures = 0
+        self.total_time = 0.0
+
+    # ===== CAPTURA =====
+
+    def get_frame(self, region: Optional[Tuple[int, int, int, int]] = None,
+                  downscale: Optional[int] = None, copy: bool = True) -> Optional[np.ndarray]:
+        """
+        Frame BGR actual
+        region: (x1, y1, x2, y2) en coordenadas de referencia (1080x1920)
+        copy=False devuelve una vista del buffer (se sobrescribe en la
+        siguiente captura)
+        """
+        with self._lock:
+            rgba = self._capture()
+            if rgba is None:
+                return None
+
+            view = rgba
+            if region is not None:
+                view = view[self._region_slices(region, rgba.shape)]
+
+            step = downscale or self.downscale
+            if step > 1:
+                view = view[::step, ::step]
+
+            # RGBA -> BGR como vista con stride negativo
+            bgr = view[..., 2::-1]
+            return np.ascontiguousarray(bgr) if copy else bgr
+
+    def get_statistics(self) -> Dict:
+        return {
+            'captures': self.captures,
+            'avg_capture_ms': (self.total_time / self.captures * 1000) if self.captures else 0.0,
+            'resolution': None if self._buffer is None else self._buffer.shape[1::-1]
+        }
+
+    # ===== GUARDAR / PUBLICAR =====
+
+    def push_png(self, frame: np.ndarray, remote_path: str) -> bool:
+        """Codifica el frame como PNG y lo sube al dispositivo"""
+        try:
+            import cv2
+        except ImportError:
+            print("[!] opencv no disponible para codificar PNG")
+            return False
+
+        ok, encoded = cv2.imencode('.png', frame)
+        if not ok:
+            return False
+
+        # 'exec-in' escribe stdin directamente en el fichero remoto
+        try:
+            result = subprocess.run(self._adb(['exec-in', f'cat > {remote_path}']),
+                                    input=encoded.tobytes(), capture_output=True,
+                                    timeout=self.timeout)
+        except Exception as e:
+            print(f"[!] Error subiendo imagen: {e}")
+            return False
+
+        return result.returncode == 0
+
+    # ===== UTILIDADES PRIVADAS =====
+
+    def _adb(self, args: List[str]) -> List[str]:
+        return ['adb'] + (['-s', self.serial] if self.serial else []) + args
+
+    def _capture(self) -> Optional[np.ndarray]:
+        start = time.time()
+        try:
+            process = subprocess.Popen(self._adb(['exec-out', 'screencap']),
+                                       stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            print(f"[!] Error lanzando screencap: {e}")
+            return None
+
+        try:
+            frame = self._read_into_buffer(process.stdout)
+        finally:
+            process.stdout.close()
+            try:
+                process.wait(timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+        if frame is not None:
+            self.captures += 1
+            self.total_time += time.time() - start
+            self.last_capture_at = time.time()
+        return frame
+
+    def _read_into_buffer(self, stream) -> Optional[np.ndarray]:
+        """Lee cabecera + píxeles; los píxeles van directos al buffer"""
+        # Cabecera: ancho, alto, formato (+ espacio de color en Android 9+)
+        header = _read_exact(stream, 12)
+        if header is None:
+            return None
+        width, height, _ = np.frombuffer(header, dtype='<u4')
+        width, height = int(width), int(height)
+
+        if self._header_size is None:
+            # Primera captura: leer todo para saber el tamaño de la cabecera
+            rest = stream.read()
+            extra = len(rest) - width * height * 4
+            if extra < 0:
+                return None
+            self._header_size = 12 + extra
+            self._ensure_buffer(width, height)
+            self._buffer.reshape(-1)[:] = np.frombuffer(rest, dtype=np.uint8, offset=extra)
+            return self._buffer
+
+        if self._header_size > 12 and _read_exact(stream, self._header_size - 12) is None:
+            return None
+
+        self._ensure_buffer(width, height)
+        view = memoryview(self._buffer.reshape(-1))
+        received = 0
+        while received < len(view):
+            n = stream.readinto(view[received:])
+            if not n:
+                return None
+            received += n
+        return self._buffer
+
+    def _ensure_buffer(self, width: int, height: int):
+        if self._buffer is None or self._buffer.shape[:2] != (height, width):
+            # Rotación o cambio de resolución: nuevo buffer
+            self._buffer = np.empty((height, width, 4), dtype=np.uint8)
+
+    @staticmethod
+    def _region_slices(region: Tuple[int, int, int, int], shape) -> Tuple[slice, slice]:
+        """Región en coordenadas de referencia -> slices del buffer"""
+        height, width = shape[:2]
+        x1, y1, x2, y2 = region
+        sx, sy = width / SCREEN_W, height / SCREEN_H
+        return (slice(max(0, int(y1 * sy)), min(height, int(y2 * sy))),
+                slice(max(0, int(x1 * sx)), min(width, int(x2 * sx))))
+
+
+def _read_exact(stream, size: int) -> Optional[bytes]:
+    data = b''
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
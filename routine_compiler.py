@@ -0,0 +1,251 @@
+import hashlib
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from device_settings import SETTINGS, PROFILES
+from intent_fast_paths import FAST_PATHS
+
+REMOTE_DIR = '/data/local/tmp/atlas_routines'
+
+# Acciones de rutina en forma de texto que equivalen a una tecla
+KEY_ACTIONS = {'press_home': 3, 'press_back': 4, 'press_recents': 187,
+               'screen_off': 26, 'play_pause': 85, 'next_track': 87}
+
+
+@dataclass
+class CompiledRoutine:
+    """Rutina convertida en script de shell para el dispositivo"""
+    name: str
+    script: str
+    digest: str
+    steps: List[str]
+
+
+class RoutineCompiler:
+    """
+    Compilador de rutinas a scripts del dispositivo
+    Las rutinas hechas solo de operaciones deterministas (abrir app,
+    ajustes, teclas, intents, esperas) se convierten en un script que se
+    sube una vez (cacheado por hash del contenido) y se ejecuta con
+    nohup: corre a velocidad del dispositivo y sobrevive a cortes breves
+    del enlace. El progreso se lee de la salida del script.
+    """
+
+    def __init__(self, session, catalog=None, device=None, remote_dir: str = REMOTE_DIR):
+        self.session = session
+        self.catalog = catalog  # AppCatalog para 'open_<app>'
+        self.device = device    # DeviceSettings para ajustes idempotentes
+        self.remote_dir = remote_dir
+
+        self._pushed = set()
+
+        # Estadísticas
+        self.compiled = 0
+        self.not_compilable = 0
+        self.runs = 0
+
+    # ===== COMPILACIÓN =====
+
+    def compile(self, actions: List, name: str = 'rutina') -> Optional[CompiledRoutine]:
+        """Script de la rutina, o None si alguna acción necesita la UI"""
+        steps: List[Tuple[str, List[str]]] = []
+        for action in actions:
+            step = self._step(action)
+            if step is None:
+                self.not_compilable += 1
+                return None
+            steps.append(step)
+
+        total = len(steps)
+        lines = ['#!/system/bin/sh', f'# rutina: {name}']
+        for i, (description, commands) in enumerate(steps, 1):
+            body = '\n'.join(commands)
+            lines += [
+                f'echo "__STEP {i}/{total} {description}"',
+                f'if {{ {body}\n}} >/dev/null 2>&1; then echo "__OK {i}"; '
+                f'else echo "__FAIL {i}"; exit 1; fi'
+            ]
+        lines.append('echo "__DONE"')
+
+        script = '\n'.join(lines) + '\n'
+        digest = hashlib.sha1(script.encode('utf-8')).hexdigest()[:16]
+        self.compiled += 1
+        return CompiledRoutine(name=name, script=script, digest=digest,
+                               steps=[d for d, _ in steps])
+
+    # ===== EJECUCIÓN =====
+
+    def run(self, routine: CompiledRoutine, on_progress: Optional[Callable[[int, int, str], None]] = None,
+            timeout: float = 60.0, poll_interval: float = 0.15) -> Dict:
+        """
+        Sube (si hace falta) y lanza la rutina; sigue su progreso
+        Retorna {'success', 'completed': pasos terminados, 'failed_step', 'elapsed_ms'}
+        """
+        start = time.time()
+        path, log = self._paths(routine)
+        # Log vaciado antes de lanzar (si no, el primer sondeo puede leer la
+        # ejecución anterior); grupo de procesos propio y su PID en el
+        # dispositivo para pararlo entero si se agota el tiempo
+        launch = f": > {log}; setsid nohup sh {path} >> {log} 2>&1 & echo $! > {log}.pid;"
+
+        try:
+            if routine.digest in self._pushed:
+                result = self.session.run(
+                    f"if [ -f {path} ]; then {launch} echo __STARTED; else echo __MISSING; fi")
+                if '__MISSING' in result.output:
+                    self._pushed.discard(routine.digest)
+
+            if routine.digest not in self._pushed:
+                # Subida y arranque en la misma ida y vuelta
+                self.session.run(f"mkdir -p {self.remote_dir}\n"
+                                 f"cat > {path} <<'__ATLAS_ROUTINE__'\n{routine.script}__ATLAS_ROUTINE__\n"
+                                 f"{launch}")
+                self._pushed.add(routine.digest)
+        except Exception as e:
+            return {'success': False, 'completed': 0, 'error': str(e)}
+
+        self.runs += 1
+        return self._follow(routine, log, on_progress, start, timeout, poll_interval)
+
+    def get_statistics(self) -> Dict:
+        return {'compiled': self.compiled, 'not_compilable': self.not_compilable,
+                'runs': self.runs, 'scripts_on_device': len(self._pushed)}
+
+    # ===== UTILIDADES PRIVADAS =====
+
+    def _paths(self, routine: CompiledRoutine) -> Tuple[str, str]:
+        return (f"{self.remote_dir}/{routine.digest}.sh", f"{self.remote_dir}/{routine.digest}.log")
+
+    def _follow(self, routine: CompiledRoutine, log: str, on_progress, start: float,
+                timeout: float, poll_interval: float) -> Dict:
+        """Lee la salida del script hasta __DONE / __FAIL"""
+        seen, completed = 0, 0
+        total = len(routine.steps)
+
+        while time.time() - start < timeout:
+            try:
+                lines = self.session.run(f"cat {log} 2>/dev/null").output.splitlines()
+            except Exception:
+                # Enlace caído: el script sigue en el dispositivo; reintentar
+                time.sleep(poll_interval)
+                continue
+
+            for line in lines[seen:]:
+                if line.startswith('__OK '):
+                    completed = int(line.split()[1])
+                    if on_progress:
+                        on_progress(completed, total, routine.steps[completed - 1])
+                elif line.startswith('__FAIL '):
+                    failed = int(line.split()[1])
+                    return self._result(False, completed, start, failed_step=failed)
+                elif line == '__DONE':
+                    return self._result(True, completed, start)
+            seen = len(lines)
+
+            time.sleep(poll_interval)
+
+        # El script seguiría corriendo mientras el host repite los pasos pendientes
+        completed = self._stop(routine, log, completed, on_progress)
+        return self._result(False, completed, start, error='timeout')
+
+    def _stop(self, routine: CompiledRoutine, log: str, completed: int, on_progress) -> int:
+        """Mata el script de la rutina y relee cuántos pasos llegó a terminar"""
+        try:
+            # Todo el grupo: el script y el comando que esté ejecutando
+            output = self.session.run(f"__pid=$(cat {log}.pid); kill -- -$__pid 2>/dev/null || "
+                                      f"kill $__pid 2>/dev/null; cat {log} 2>/dev/null").output
+        except Exception as e:
+            print(f"[!] No se pudo parar la rutina en el dispositivo: {e}")
+            return completed
+
+        for line in output.splitlines():
+            if line.startswith('__OK ') and int(line.split()[1]) > completed:
+                completed = int(line.split()[1])
+                if on_progress:
+                    on_progress(completed, len(routine.steps), routine.steps[completed - 1])
+        return completed
+
+    @staticmethod
+    def _result(success: bool, completed: int, start: float, **extra) -> Dict:
+        result = {'success': success, 'completed': completed,
+                  'elapsed_ms': (time.time() - start) * 1000}
+        result.update(extra)
+        return result
+
+    def _step(self, action) -> Optional[Tuple[str, List[str]]]:
+        """(descripción, comandos) de una acción determinista, o None"""
+        if isinstance(action, str):
+            if action.startswith('open_'):
+                return self._open_app(action[len('open_'):], action)
+            if action in KEY_ACTIONS:
+                return action, [f"input keyevent {KEY_ACTIONS[action]}"]
+            if action.lower() in PROFILES:
+                return self._profile(action.lower())
+            return None
+
+        if not isinstance(action, dict):
+            return None
+
+        kind = action.get('action', '')
+        params = action.get('params', action.get('parameters', {})) or {}
+
+        if kind == 'open_app':
+            return self._open_app(params.get('package') or params.get('app', ''), kind)
+
+        if kind == 'keyevent':
+            codes = params.get('keycodes') or [params.get('keycode')]
+            if not all(isinstance(c, int) for c in codes):
+                return None
+            return kind, ["input keyevent " + ' '.join(str(c) for c in codes)]
+
+        if kind in ('setting', 'change_settings'):
+            name, value = params.get('setting') or params.get('name'), params.get('value')
+            if self.device is None or name not in SETTINGS:
+                return None
+            return f"{name}={value}", [self.device.guarded_command(name, value)]
+
+        if kind == 'profile' and params.get('name', '').lower() in PROFILES:
+            return self._profile(params['name'].lower())
+
+        if kind == 'wait':
+            return kind, [f"sleep {float(params.get('seconds', 1)):.2f}"]
+
+        if kind in FAST_PATHS:
+            try:
+                commands = FAST_PATHS[kind](**params)
+            except Exception:
+                return None
+            return (kind, commands) if commands else None
+
+        return None
+
+    def _open_app(self, name: str, description: str) -> Optional[Tuple[str, List[str]]]:
+        if not name:
+            return None
+
+        app = self.catalog.resolve(name) if self.catalog is not None else None
+        if app is not None:
+            package, launch = app.package, self.catalog.launch_command(app)
+        elif re.fullmatch(r'[\w]+(\.[\w]+)+', name):
+            package = name
+            launch = f"monkey -p {package} -c android.intent.category.LAUNCHER 1"
+        else:
+            return None
+
+        # Esperar en el propio dispositivo a que la app tenga el foco
+        wait = (f"__i=0; while [ $__i -lt 50 ]; do "
+                f"dumpsys window | grep -E 'mCurrentFocus|mFocusedApp' | grep -q '{package}/' && break; "
+                f"sleep 0.1; __i=$((__i+1)); done")
+        return description, [launch, wait]
+
+    def _profile(self, profile: str) -> Optional[Tuple[str, List[str]]]:
+        if self.device is None:
+            return None
+        settings = dict(PROFILES[profile])
+        package = settings.pop('open_app', None)
+        commands = [self.device.guarded_command(n, v) for n, v in settings.items()]
+        if package:
+            commands.append(f"monkey -p {package} -c android.intent.category.LAUNCHER 1")
+        return profile, commands
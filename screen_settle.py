@@ -0,0 +1,189 @@
+import re
+import time
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+
+def frame_signature(frame, step: int = 16):
+    """Versión diminuta en gris de un frame (barata de comparar)"""
+    if frame is None:
+        return None
+    small = frame[::step, ::step]
+    if small.ndim == 3:
+        small = small.mean(axis=2)
+    return small.astype(np.float32)
+
+
+def frames_differ(a, b, threshold: float = 3.0) -> bool:
+    """True si dos firmas (o frames) son distintas"""
+    if a is None or b is None:
+        return True
+    if a.ndim == 3 or b.ndim == 3:
+        a, b = frame_signature(a), frame_signature(b)
+    if a.shape != b.shape:
+        return True
+    return float(np.abs(a - b).mean()) > threshold
+
+
+class ScreenSettleDetector:
+    """
+    Espera adaptativa en lugar de time.sleep fijos
+    Sondea frames reducidos (o el árbol de UI) y vuelve en cuanto la
+    pantalla está quieta o se cumple la condición pedida (app en primer
+    plano, elemento presente), con timeout
+    """
+
+    def __init__(self, screen=None, session=None, locator=None,
+                 poll_interval: float = 0.08, stable_polls: int = 2,
+                 threshold: float = 3.0):
+        self.screen = screen
+        self.session = session
+        self.locator = locator
+        self.poll_interval = poll_interval
+        self.stable_polls = stable_polls
+        self.threshold = threshold
+
+        # Estadísticas
+        self.waits = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+
+    # ===== ESPERAS =====
+
+    def wait_until_settled(self, timeout: float = 2.0, reference=None) -> bool:
+        """
+        Vuelve cuando varios sondeos seguidos no muestran cambios
+        reference: frame anterior a la acción; si se da, primero espera a
+        que la pantalla cambie respecto a él (hasta la mitad del timeout)
+        """
+        if self.screen is None:
+            # Sin fuente de frames: espera mínima conservadora
+            time.sleep(min(timeout, 0.5))
+            return True
+
+        start = time.time()
+        deadline = start + timeout
+
+        if reference is not None:
+            reference = frame_signature(reference)
+            self._poll(lambda: frames_differ(reference, self._signature(), self.threshold),
+                       start + timeout / 2)
+
+        previous, stable = self._signature(), 0
+        while time.time() < deadline:
+            time.sleep(self.poll_interval)
+            current = self._signature()
+            if not frames_differ(previous, current, self.threshold):
+                stable += 1
+                if stable >= self.stable_polls:
+                    return self._done(start, True)
+            else:
+                stable = 0
+            previous = current
+
+        return self._done(start, False)
+
+    def wait_for_change(self, reference, timeout: float = 2.0) -> bool:
+        """Espera a que la pantalla difiera del frame de referencia"""
+        if self.screen is None:
+            time.sleep(min(timeout, 0.5))
+            return True
+
+        start = time.time()
+        reference = frame_signature(reference)
+        met = self._poll(lambda: frames_differ(reference, self._signature(), self.threshold),
+                         start + timeout)
+        return self._done(start, met)
+
+    def wait_for_package(self, package: str, timeout: float = 5.0, settle: bool = True) -> bool:
+        """Espera a que la app esté en primer plano (y opcionalmente quieta)"""
+        start = time.time()
+
+        if self.session is not None:
+            met = self._poll(lambda: self.foreground_package() == package, start + timeout)
+        else:
+            met = True
+
+        if settle:
+            self.wait_until_settled(timeout=max(0.5, timeout - (time.time() - start)))
+
+        return self._done(start, met)
+
+    def wait_for_element(self, description: str, timeout: float = 4.0) -> Dict:
+        """
+        Espera a que aparezca un elemento y lo devuelve (dict de find_element)
+        Con árbol de UI sondea el árbol; si no, espera a que la pantalla
+        se asiente y hace una sola búsqueda por visión
+        """
+        start = time.time()
+        ui_tree = getattr(self.locator, 'ui_tree', None)
+
+        if ui_tree is not None:
+            found = {}
+
+            def present():
+                ui_tree.invalidate()
+                found.update(ui_tree.find_element(description))
+                return found.get('found')
+
+            # El árbol responde rápido: si no aparece pronto, no está en el árbol
+            if self._poll(present, start + min(timeout, 1.5)):
+                self._done(start, True)
+                return dict(found)
+
+        self.wait_until_settled(timeout=max(0.3, timeout - (time.time() - start)))
+        if self.locator is None or self.screen is None:
+            return {'found': False}
+
+        element = self.locator.find_element(self.screen.get_frame(), description)
+        self._done(start, bool(element.get('found')))
+        return element
+
+    def wait_until(self, condition: Callable[[], bool], timeout: float = 3.0) -> bool:
+        """Espera una condición arbitraria"""
+        start = time.time()
+        return self._done(start, self._poll(condition, start + timeout))
+
+    # ===== CONSULTAS =====
+
+    def foreground_package(self) -> Optional[str]:
+        """Paquete de la ventana con el foco"""
+        if self.session is None:
+            return None
+        try:
+            result = self.session.run("dumpsys window | grep -E 'mCurrentFocus|mFocusedApp'")
+        except Exception:
+            return None
+        match = re.search(r'\s([\w.]+)/[\w.$]+', result.output)
+        return match.group(1) if match else None
+
+    def get_statistics(self) -> Dict:
+        return {
+            'waits': self.waits,
+            'timeouts': self.timeouts,
+            'avg_wait_ms': (self.total_wait / self.waits * 1000) if self.waits else 0.0
+        }
+
+    # ===== UTILIDADES PRIVADAS =====
+
+    def _signature(self):
+        return frame_signature(self.screen.get_frame())
+
+    def _poll(self, condition: Callable[[], bool], deadline: float) -> bool:
+        while True:
+            try:
+                if condition():
+                    return True
+            except Exception:
+                pass
+            if time.time() >= deadline:
+                return False
+            time.sleep(self.poll_interval)
+
+    def _done(self, start: float, met: bool) -> bool:
+        self.waits += 1
+        self.total_wait += time.time() - start
+        if not met:
+            self.timeouts += 1
+        return met
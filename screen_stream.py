@@ -0,0 +1,171 @@
+import subprocess
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+try:
+    import av
+except ImportError:
+    av = None
+
+# screenrecord corta a los 180 s: se abre el siguiente segmento antes
+SCREENRECORD_LIMIT = 180
+
+
+class _Segment:
+    """Un proceso screenrecord y su hilo decodificador"""
+
+    def __init__(self, process: subprocess.Popen):
+        self.process = process
+        self.started_at = time.time()
+        self.first_frame = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.started_at
+
+    def alive(self) -> bool:
+        return self.process.poll() is None and self.thread is not None and self.thread.is_alive()
+
+    def stop(self):
+        try:
+            self.process.kill()
+        except Exception:
+            pass
+
+
+class ScreenStream:
+    """
+    Captura continua de pantalla vía 'adb exec-out screenrecord' (H.264)
+    Un hilo decodifica el stream (PyAV) y deja siempre el último frame en
+    un buffer; get_frame() no toca el dispositivo. Antes del límite de
+    3 minutos se arranca un segmento nuevo y solo se cierra el anterior
+    cuando el nuevo ya entrega frames, así que no hay huecos.
+    """
+
+    def __init__(self, serial: Optional[str] = None, size: Optional[Tuple[int, int]] = None,
+                 bit_rate: int = 6_000_000, restart_after: float = SCREENRECORD_LIMIT - 10,
+                 fallback=None):
+        self.serial = serial
+        self.size = size  # (ancho, alto); None = resolución nativa
+        self.bit_rate = bit_rate
+        self.restart_after = restart_after
+        self.fallback = fallback  # fuente con get_frame() mientras no hay stream
+
+        self._latest = None
+        self._lock = threading.Lock()
+        self._segment: Optional[_Segment] = None
+        self._supervisor: Optional[threading.Thread] = None
+        self.running = False
+
+        # Estadísticas
+        self.frames = 0
+        self.restarts = 0
+        self.started_at = 0.0
+
+    # ===== API PÚBLICA =====
+
+    def start(self) -> bool:
+        """Arranca el stream (False si PyAV no está disponible)"""
+        if av is None:
+            print("[!] PyAV no instalado: captura por screencap")
+            return False
+
+        if self.running:
+            return True
+
+        self.running = True
+        self.started_at = time.time()
+        self._segment = self._start_segment()
+        self._supervisor = threading.Thread(target=self._supervise, daemon=True,
+                                            name='screen-stream-supervisor')
+        self._supervisor.start()
+        print(f"[📺] Stream de pantalla iniciado ({self._size_label()})")
+        return True
+
+    def stop(self):
+        self.running = False
+        if self._segment is not None:
+            self._segment.stop()
+
+    def get_frame(self):
+        """Último frame decodificado (BGR)"""
+        with self._lock:
+            frame = self._latest
+        if frame is None and self.fallback is not None:
+            return self.fallback.get_frame()
+        return frame
+
+    def get_statistics(self) -> Dict:
+        elapsed = time.time() - self.started_at if self.started_at else 0.0
+        return {
+            'frames': self.frames,
+            'fps': self.frames / elapsed if elapsed > 0 else 0.0,
+            'restarts': self.restarts,
+            'streaming': self.running and self._segment is not None and self._segment.alive()
+        }
+
+    # ===== SEGMENTOS =====
+
+    def _start_segment(self) -> _Segment:
+        args = ['adb'] + (['-s', self.serial] if self.serial else [])
+        args += ['exec-out', 'screenrecord', '--output-format=h264',
+                 f'--bit-rate={self.bit_rate}']
+        if self.size:
+            args.append(f'--size={self.size[0]}x{self.size[1]}')
+        args.append('-')
+
+        process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                   bufsize=0)
+        segment = _Segment(process)
+        segment.thread = threading.Thread(target=self._decode, args=(segment,), daemon=True,
+                                          name='screen-stream-decoder')
+        segment.thread.start()
+        return segment
+
+    def _supervise(self):
+        """Relevo de segmentos antes del límite y tras caídas"""
+        while self.running:
+            time.sleep(0.5)
+            current = self._segment
+
+            if current.alive() and current.age < self.restart_after:
+                continue
+
+            if not current.alive():
+                print("[📺] Stream caído, reiniciando...")
+
+            # Solapar: el actual sigue sirviendo frames hasta que el nuevo arranque
+            following = self._start_segment()
+            following.first_frame.wait(timeout=5.0)
+
+            self._segment = following
+            current.stop()
+            self.restarts += 1
+
+            if not following.first_frame.is_set() and not following.alive():
+                # Dispositivo desconectado: no reintentar en bucle cerrado
+                time.sleep(2.0)
+
+    def _decode(self, segment: _Segment):
+        """Hilo decodificador: H.264 -> último frame"""
+        try:
+            container = av.open(segment.process.stdout, format='h264', mode='r')
+            for frame in container.decode(video=0):
+                image = frame.to_ndarray(format='bgr24')
+                with self._lock:
+                    self._latest = image
+                self.frames += 1
+                segment.first_frame.set()
+
+                if not self.running:
+                    break
+        except Exception as e:
+            if self.running and segment is self._segment:
+                print(f"[!] Error decodificando stream: {e}")
+        finally:
+            segment.stop()
+
+    def _size_label(self) -> str:
+        return f"{self.size[0]}x{self.size[1]}" if self.size else "nativa"
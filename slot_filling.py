@@ -0,0 +1,422 @@
+import re
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+# ===== VOCABULARIO =====
+
+NUMBER_WORDS = {
+    'un': 1, 'una': 1, 'uno': 1, 'dos': 2, 'tres': 3, 'cuatro': 4, 'cinco': 5,
+    'seis': 6, 'siete': 7, 'ocho': 8, 'nueve': 9, 'diez': 10, 'once': 11, 'doce': 12,
+    'trece': 13, 'catorce': 14, 'quince': 15, 'dieciseis': 16, 'diecisiete': 17,
+    'dieciocho': 18, 'diecinueve': 19, 'veinte': 20, 'veinticinco': 25,
+    'treinta': 30, 'cuarenta': 40, 'cincuenta': 50,
+}
+WEEKDAYS = {'lunes': 0, 'martes': 1, 'miercoles': 2, 'jueves': 3, 'viernes': 4,
+            'sabado': 5, 'domingo': 6}
+MONTHS = {'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4, 'mayo': 5, 'junio': 6,
+          'julio': 7, 'agosto': 8, 'septiembre': 9, 'setiembre': 9, 'octubre': 10,
+          'noviembre': 11, 'diciembre': 12}
+MESSAGE_APPS = {'whatsapp': 'whatsapp', 'wasap': 'whatsapp', 'guasap': 'whatsapp',
+                'sms': 'sms', 'mensaje de texto': 'sms', 'telegram': 'telegram'}
+
+_NUM_WORDS = r'\d{1,2}|' + '|'.join(sorted(NUMBER_WORDS, key=len, reverse=True))
+_NUM = f'({_NUM_WORDS})'
+_WEEKDAY = '(' + '|'.join(WEEKDAYS) + ')'
+_MONTH = '(' + '|'.join(MONTHS) + ')'
+_PERIOD = r'(?:\s+(?:de|por)\s+la\s+(manana|tarde|noche|madrugada))?'
+
+# Comandos que se entienden sin el modelo. Solo se buscan en la cabeza de
+# la orden (antes de "diciendo", "que" o ":"): el cuerpo no decide la acción.
+# Verbos y apps explícitos mandan; los sustantivos solo si no hay ninguno
+COMMAND_TRIGGERS = [
+    ('make_call', re.compile(r'^(?:oye\s+)?(?:por favor\s+)?(llama|llamame|marca|marcale)\b')),
+    ('navigate_to', re.compile(r'^(?:oye\s+)?(llevame|navega|como llego)\b')),
+    ('send_message', re.compile(r'\b(whatsapp|wasap|guasap|escribele|dile|mandale|enviale)\b')),
+    ('set_reminder', re.compile(r'\b(recuerdame|recuerda)\b')),
+    ('create_event', re.compile(r'\b(agenda|agendar|agendame)\b')),
+]
+NOUN_TRIGGERS = [
+    ('set_reminder', re.compile(r'\b(recordatorio)\b')),
+    ('create_event', re.compile(r'\b(evento|cita|reunion|calendario)\b')),
+    ('send_message', re.compile(r'\b(mensaje)\b')),
+    ('navigate_to', re.compile(r'^(?:oye\s+)?(ruta)\b')),
+]
+
+_CONNECTORS = r'(?:de|del|con|para|sobre|llamad[oa]|que|el|la|a|al)'
+
+
+def fold(text: str) -> str:
+    """Minúsculas sin tildes conservando la longitud (los índices valen para el original)"""
+    return ''.join(unicodedata.normalize('NFKD', c)[0].lower() if c.strip() else ' '
+                   for c in text or '')
+
+
+def command_head(folded: str) -> str:
+    """Parte de la orden anterior al cuerpo del mensaje ("diciendo", "que", ":")"""
+    m = re.search(r'\bdiciendo|\bque\b|:', folded)
+    return folded[:m.start()] if m else folded
+
+
+def _number(token: str) -> Optional[int]:
+    if token.isdigit():
+        return int(token)
+    return NUMBER_WORDS.get(token)
+
+
+# ===== FECHAS Y HORAS =====
+
+class DateTimeMatch:
+    """Resultado del análisis de fecha/hora con los tramos de texto usados"""
+
+    def __init__(self):
+        self.date = None          # date
+        self.time = None          # (hora, minuto)
+        self.delta = None         # timedelta relativo ("en dos horas")
+        self.spans: List[Tuple[int, int]] = []
+
+    @property
+    def found(self) -> bool:
+        return self.date is not None or self.time is not None or self.delta is not None
+
+    def to_datetime(self, now: datetime) -> Optional[datetime]:
+        if self.delta is not None:
+            return now + self.delta
+        if not self.found:
+            return None
+
+        day = self.date or now.date()
+        hour, minute = self.time if self.time else (9, 0)
+        result = datetime(day.year, day.month, day.day, hour, minute)
+        if self.date is None and result < now:
+            result += timedelta(days=1)  # "a las 8" ya pasadas: mañana
+        return result
+
+    def text(self, original: str) -> str:
+        """Trozo del texto original que expresa el momento"""
+        return ' '.join(original[a:b].strip() for a, b in sorted(self.spans))
+
+
+def find_datetime(text: str, now: Optional[datetime] = None) -> DateTimeMatch:
+    """Fecha/hora en español natural ("el viernes a las 5", "en dos horas", "pasado mañana")"""
+    now = now or datetime.now()
+    folded = fold(text)
+    match = DateTimeMatch()
+
+    def take(m):
+        match.spans.append(m.span())
+
+    # --- Relativos: en/dentro de N horas/minutos/días/semanas
+    m = re.search(rf'\b(?:en|dentro de)\s+(?:{_NUM}|media)\s+(hora|horas|minuto|minutos|dia|dias|semana|semanas)'
+                  r'(\s+y\s+media)?\b', folded)
+    if m:
+        amount = _number(m.group(1)) if m.group(1) else 0.5
+        unit = m.group(2)
+        if unit.startswith('hora'):
+            match.delta = timedelta(hours=amount + (0.5 if m.group(3) else 0))
+        elif unit.startswith('minuto'):
+            match.delta = timedelta(minutes=amount)
+        else:
+            days = amount * (7 if unit.startswith('semana') else 1)
+            match.date = (now + timedelta(days=days)).date()
+        take(m)
+    elif re.search(r'\ben media hora\b', folded):
+        m = re.search(r'\ben media hora\b', folded)
+        match.delta = timedelta(minutes=30)
+        take(m)
+
+    # --- Fechas
+    if match.date is None:
+        for pattern, resolve in (
+            (r'\bpasado manana\b', lambda m: now.date() + timedelta(days=2)),
+            (r'(?<!la )(?<!la  )\bmanana\b', lambda m: now.date() + timedelta(days=1)),
+            (r'\bhoy\b', lambda m: now.date()),
+            (r'\b(?:la semana que viene|la proxima semana)\b', lambda m: now.date() + timedelta(days=7)),
+            (r'\b(?:el\s+)?fin de semana\b', lambda m: _next_weekday(now, 5, allow_today=True)),
+            (rf'\b(?:el\s+)?(?:(proximo|este)\s+)?{_WEEKDAY}(?:\s+que viene|\s+proximo)?\b',
+             lambda m: _next_weekday(now, WEEKDAYS[m.group(2)], allow_today=m.group(1) == 'este')),
+            (rf'\b(?:el\s+)?(?:dia\s+)?{_NUM}\s+de\s+{_MONTH}(?:\s+de\s+(\d{{4}}))?\b',
+             lambda m: _calendar_date(now, _number(m.group(1)), MONTHS[m.group(2)], m.group(3))),
+            (r'\b(\d{4})-(\d{2})-(\d{2})\b',
+             lambda m: datetime(int(m.group(1)), int(m.group(2)), int(m.group(3))).date()),
+            (r'\b(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b',
+             lambda m: _calendar_date(now, int(m.group(1)), int(m.group(2)), m.group(3))),
+            (r'\bel\s+(?:dia\s+)?(\d{1,2})\b(?!\s*(?::|h\b|horas?))',
+             lambda m: _calendar_date(now, int(m.group(1)), None, None)),
+        ):
+            m = re.search(pattern, folded)
+            if m:
+                try:
+                    match.date = resolve(m)
+                except ValueError:
+                    continue
+                take(m)
+                break
+
+    # --- Horas
+    if match.delta is None:
+        m = re.search(r'\b(?:a\s+las?\s+)?(\d{1,2}):(\d{2})' + _PERIOD, folded)
+        if m:
+            match.time = _adjust_hour(int(m.group(1)), int(m.group(2)), m.group(3), explicit=True)
+            take(m)
+        else:
+            m = re.search(rf'\b(?:a\s+)?las?\s+{_NUM}'
+                          rf'(?:\s+y\s+(media|cuarto|{_NUM_WORDS})|\s+menos\s+(cuarto|{_NUM_WORDS}))?'
+                          r'(?:\s+en punto)?' + _PERIOD, folded)
+            if m:
+                hour = _number(m.group(1))
+                minute = 0
+                if m.group(2):
+                    minute = {'media': 30, 'cuarto': 15}.get(m.group(2)) or _number(m.group(2)) or 0
+                elif m.group(3):
+                    hour -= 1
+                    minute = 60 - ({'cuarto': 15}.get(m.group(3)) or _number(m.group(3)) or 0)
+                match.time = _adjust_hour(hour % 24, minute, m.group(4))
+                take(m)
+            else:
+                m = re.search(r'\b(?:a\s+)?(?:al\s+)?(mediodia|medianoche)\b', folded)
+                if m:
+                    match.time = (12, 0) if m.group(1) == 'mediodia' else (0, 0)
+                    take(m)
+
+    # "por la mañana/tarde/noche" sin hora concreta
+    if match.time is None and match.delta is None:
+        m = re.search(r'\b(?:por|de|en)\s+la\s+(manana|tarde|noche)\b', folded)
+        if m:
+            match.time = {'manana': (9, 0), 'tarde': (17, 0), 'noche': (21, 0)}[m.group(1)]
+            take(m)
+
+    return match
+
+
+def parse_datetime(text: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """Fecha y hora absolutas del texto, o None"""
+    now = now or datetime.now()
+    return find_datetime(text, now).to_datetime(now)
+
+
+def _next_weekday(now: datetime, weekday: int, allow_today: bool = False):
+    days = (weekday - now.weekday()) % 7
+    if days == 0 and not allow_today:
+        days = 7
+    return now.date() + timedelta(days=days)
+
+
+def _calendar_date(now: datetime, day: int, month: Optional[int], year: Optional[str]):
+    if year:
+        year = int(year) + (2000 if len(year) == 2 else 0)
+        return datetime(year, month or now.month, day).date()
+    candidate = datetime(now.year, month or now.month, day).date()
+    if candidate < now.date():
+        # Ya pasó: el mes (o año) siguiente
+        if month is None:
+            next_month = now.month % 12 + 1
+            candidate = datetime(now.year + (now.month == 12), next_month, day).date()
+        else:
+            candidate = datetime(now.year + 1, month, day).date()
+    return candidate
+
+
+def _adjust_hour(hour: int, minute: int, period: Optional[str], explicit: bool = False) -> Tuple[int, int]:
+    """'5 de la tarde' -> 17; sin periodo, 1-7 se entiende por la tarde"""
+    if period in ('noche', 'madrugada') and hour == 12:
+        hour = 0  # "las 12 de la noche" es medianoche
+    elif period in ('tarde', 'noche') and hour < 12:
+        hour += 12
+    elif period is None and not explicit and 1 <= hour <= 7:
+        hour += 12
+    return hour % 24, minute
+
+
+# ===== ENTIDADES =====
+
+def match_app(text: str) -> Optional[str]:
+    folded = fold(text)
+    for name, app in MESSAGE_APPS.items():
+        if re.search(rf'\b{name}\b', folded):
+            return app
+    return None
+
+
+def _strip_spans(text: str, spans: List[Tuple[int, int]]) -> str:
+    """Texto sin los tramos indicados (fecha/hora ya interpretadas)"""
+    for start, end in sorted(spans, reverse=True):
+        text = text[:start] + ' ' + text[end:]
+    return ' '.join(text.split())
+
+
+def _clean_phrase(text: str) -> str:
+    """Quita conectores sueltos al principio y al final"""
+    text = text.strip(' ,.:;')
+    while True:
+        folded = fold(text)
+        m = re.match(rf'{_CONNECTORS}\s+', folded)
+        if m:
+            text = text[m.end():]
+            continue
+        m = re.search(rf'\s+{_CONNECTORS}$', folded)
+        if m:
+            text = text[:m.start()]
+            continue
+        return text.strip(' ,.:;')
+
+
+class SlotFiller:
+    """
+    Extracción local de parámetros (sin el modelo)
+    Entiende fechas/horas relativas en español, contactos (validados con
+    el índice del teléfono si está), la app de mensajería y el cuerpo del
+    mensaje. Sirve para rellenar los datos de un diálogo multi-turno y para
+    ejecutar directamente los comandos que ya traen todo lo necesario.
+    """
+
+    def __init__(self, contacts=None):
+        self.contacts = contacts  # ContactIndex (opcional)
+
+        # Estadísticas
+        self.commands_parsed = 0
+        self.slots_filled = 0
+
+    # ===== API PÚBLICA =====
+
+    def parse_command(self, text: str, now: Optional[datetime] = None) -> Optional[Dict]:
+        """{'action', 'parameters'} si el comando es de los conocidos, o None"""
+        head = command_head(fold(text).strip())
+        for triggers in (COMMAND_TRIGGERS, NOUN_TRIGGERS):
+            # El primero que aparece en la cabeza ("recuérdame mandarle un mensaje")
+            found = [(m.start(), action) for action, trigger in triggers
+                     for m in [trigger.search(head)] if m]
+            if not found:
+                continue
+            action = min(found)[1]
+            slots = self.extract(action, text, now)
+            if slots:
+                self.commands_parsed += 1
+                return {'action': action, 'parameters': slots}
+            return None
+        return None
+
+    def extract(self, action: str, text: str, now: Optional[datetime] = None) -> Dict:
+        """Todos los parámetros de la acción que aparecen en el texto"""
+        now = now or datetime.now()
+        extractor = getattr(self, f"_extract_{action}", None)
+        slots = extractor(text, now) if extractor else {}
+        slots = {k: v for k, v in slots.items() if v}
+        self.slots_filled += len(slots)
+        return slots
+
+    def answer(self, key: str, text: str, now: Optional[datetime] = None) -> str:
+        """Valor de un parámetro cuando el usuario responde a su pregunta"""
+        now = now or datetime.now()
+        match = find_datetime(text, now)
+
+        if key == 'date' and match.found:
+            moment = match.to_datetime(now)
+            return moment.strftime('%Y-%m-%d')
+        if key == 'time' and (match.time or match.delta):
+            return match.to_datetime(now).strftime('%H:%M')
+        if key == 'when' and match.found:
+            return match.text(text)
+        if key == 'app':
+            return match_app(text) or text.strip()
+        if key == 'contact':
+            return self._contact(_clean_phrase(text)) or _clean_phrase(text)
+        return text.strip()
+
+    def get_statistics(self) -> Dict:
+        return {'commands_parsed': self.commands_parsed, 'slots_filled': self.slots_filled}
+
+    # ===== EXTRACTORES POR ACCIÓN =====
+
+    def _extract_send_message(self, text: str, now: datetime) -> Dict:
+        folded = fold(text)
+        slots = {'app': match_app(text)}
+
+        # "por whatsapp", "en telegram": fuera antes de separar destinatario y cuerpo
+        # (con espacios: los índices siguen valiendo para el original)
+        apps = '|'.join(sorted(MESSAGE_APPS, key=len, reverse=True))
+        via = re.search(rf'\b(?:por|en|con|via|a traves de)\s+(?:el\s+)?(?:{apps})\b', folded)
+        if via:
+            blank = ' ' * (via.end() - via.start())
+            folded = folded[:via.start()] + blank + folded[via.end():]
+            text = text[:via.start()] + blank + text[via.end():]
+
+        # Cuerpo: "diciendo que ...", "que diga ...", ": ...", "dile a X que ..."
+        body = re.search(r'(?:diciendo(?:le)?|que diga|con el (?:texto|mensaje)|el mensaje es|:)\s*(?:que\s+)?(.+)$',
+                         folded)
+        cut = body.start() if body else None
+        if body is None:
+            body = re.search(r'\b(?:a|para)\s+\S+(?:\s+\S+)?\s+que\s+(.+)$', folded)
+            cut = body.start(1) if body else None  # el destinatario va antes del "que"
+        if body:
+            slots['message'] = text[body.start(1):].strip()
+            folded, text = folded[:cut], text[:cut]
+
+        # Destinatario: "a Juan", "para María López"
+        for m in re.finditer(r'\b(?:a|para)\s+(\S+(?:\s+\S+)?)', folded):
+            candidate = _clean_phrase(text[m.start(1):m.end(1)])
+            if fold(candidate).split()[0:1] in (['whatsapp'], ['sms'], ['telegram']):
+                continue
+            contact = self._contact(candidate)
+            if contact:
+                slots['contact'] = contact
+                break
+        return slots
+
+    def _extract_make_call(self, text: str, now: datetime) -> Dict:
+        m = re.search(r'\b(?:llama|llamame|marca|marcale)\s+(?:a\s+|al\s+)?(.+)$', fold(text))
+        if not m:
+            return {}
+        return {'contact': self._contact(_clean_phrase(text[m.start(1):]))}
+
+    def _extract_create_event(self, text: str, now: datetime) -> Dict:
+        match = find_datetime(text, now)
+        slots = {}
+        moment = match.to_datetime(now)
+        if match.date or match.delta:
+            slots['date'] = moment.strftime('%Y-%m-%d')
+        if match.time or match.delta:
+            slots['time'] = moment.strftime('%H:%M')
+
+        rest = _strip_spans(text, match.spans)
+        m = re.search(r'\b(evento|cita|reunion)\b\s*(.*)$', fold(rest))
+        if m:
+            # "evento X" -> "X"; "cita con el dentista" conserva la palabra
+            start = m.start(2) if m.group(1) == 'evento' else m.start()
+            title = _clean_phrase(rest[start:])
+            slots['title'] = title[:1].upper() + title[1:]
+        return slots
+
+    def _extract_set_reminder(self, text: str, now: datetime) -> Dict:
+        match = find_datetime(text, now)
+        slots = {'when': match.text(text) if match.found else None}
+
+        rest = _strip_spans(text, match.spans)
+        m = re.search(r'\b(?:recuerdame|recuerda(?:me)?|recordatorio(?:\s+para)?)\b\s*(?:que\s+)?(.*)$', fold(rest))
+        if m:
+            slots['task'] = _clean_phrase(rest[m.start(1):])
+        return slots
+
+    def _extract_navigate_to(self, text: str, now: datetime) -> Dict:
+        m = re.search(r'\b(?:llevame|navega|como llego|ruta)\s+(?:a|al|hasta|hacia|para)\s+(.+)$', fold(text))
+        if not m:
+            return {}
+        return {'destination': text[m.start(1):].strip(' .')}
+
+    # ===== UTILIDADES PRIVADAS =====
+
+    def _contact(self, candidate: str) -> Optional[str]:
+        """Nombre validado con el índice de contactos (o tal cual si no hay índice)"""
+        candidate = candidate.strip(' ,.')
+        if not candidate:
+            return None
+        if self.contacts is None:
+            return candidate
+
+        # Probar de la frase más larga a la más corta ("María López mañana" -> "María López")
+        words = candidate.split()
+        for size in range(min(3, len(words)), 0, -1):
+            match = self.contacts.resolve(' '.join(words[:size]))
+            if match is not None:
+                return match['name'] if not match['ambiguous'] else ' '.join(words[:size])
+        return None
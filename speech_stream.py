@@ -0,0 +1,224 @@
+import queue
+import re
+import threading
+import time
+from typing import Dict, List
+
+# Cortes naturales: fin de frase, punto y coma, dos puntos y saltos de línea
+_SENTENCE_END = re.compile(r'(?<=[.!?¡¿…;:])\s+|\n+')
+_CLAUSE_END = re.compile(r'(?<=[,)])\s+')
+
+_DONE = object()
+
+
+def split_sentences(text: str, max_chars: int = 220, first_max: int = 90) -> List[str]:
+    """
+    Trocea el texto en fragmentos para sintetizar por partes
+    El primero es corto (menos tiempo hasta el primer audio); los demás
+    agrupan frases hasta max_chars. Las frases demasiado largas se parten
+    por comas y, en último caso, por palabras.
+    """
+    sentences = []
+    for sentence in _SENTENCE_END.split(text or ''):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if len(sentence) <= max_chars:
+            sentences.append(sentence)
+            continue
+        for clause in _CLAUSE_END.split(sentence):
+            sentences.extend(_wrap(clause.strip(), max_chars))
+
+    chunks: List[str] = []
+    for sentence in sentences:
+        if chunks:
+            limit = first_max if len(chunks) == 1 else max_chars
+            if len(chunks[-1]) + 1 + len(sentence) <= limit:
+                chunks[-1] = f"{chunks[-1]} {sentence}"
+                continue
+        chunks.append(sentence)
+    return chunks
+
+
+def _wrap(text: str, max_chars: int) -> List[str]:
+    parts, current = [], ''
+    for word in text.split():
+        if current and len(current) + 1 + len(word) > max_chars:
+            parts.append(current)
+            current = word
+        else:
+            current = f"{current} {word}".strip()
+    if current:
+        parts.append(current)
+    return parts
+
+
+class SpeechStream:
+    """
+    Lectura en voz alta por fragmentos
+    Si el gestor de voz separa síntesis y reproducción (synthesize/play),
+    un hilo productor sintetiza por delante mientras suena el fragmento
+    anterior; si solo tiene speak(), se habla fragmento a fragmento. En
+    ambos casos el primer audio no depende de la longitud del texto y se
+    puede saltar la frase actual o cancelar la lectura.
+    """
+
+    def __init__(self, voice, max_chars: int = 220, first_max: int = 90, lookahead: int = 2):
+        self.voice = voice
+        self.max_chars = max_chars
+        self.first_max = first_max
+        self.lookahead = lookahead
+
+        self._cancel = threading.Event()
+        self._skip = threading.Event()
+        self._speaking = threading.Event()
+        self._lock = threading.Lock()
+
+        # Estadísticas
+        self.readings = 0
+        self.chunks_spoken = 0
+        self.cancelled = 0
+        self.total_first_audio = 0.0
+
+    @property
+    def speaking(self) -> bool:
+        return self._speaking.is_set()
+
+    @property
+    def pipelined(self) -> bool:
+        return callable(getattr(self.voice, 'synthesize', None)) and \
+            callable(getattr(self.voice, 'play', None))
+
+    # ===== API PÚBLICA =====
+
+    def speak(self, text: str, block: bool = True) -> bool:
+        """
+        Lee el texto por fragmentos
+        Retorna True si se leyó entero (False si se canceló)
+        """
+        chunks = split_sentences(text, self.max_chars, self.first_max)
+        if not chunks:
+            return True
+
+        if not block:
+            threading.Thread(target=self._read, args=(chunks,), daemon=True,
+                             name='speech-stream').start()
+            return True
+        return self._read(chunks)
+
+    def skip(self):
+        """Salta el fragmento que está sonando"""
+        if self.speaking:
+            self._skip.set()
+            self._stop_audio()
+
+    def cancel(self):
+        """Corta la lectura en curso"""
+        if self.speaking:
+            self._cancel.set()
+            self._stop_audio()
+
+    def get_statistics(self) -> Dict:
+        return {
+            'readings': self.readings,
+            'chunks_spoken': self.chunks_spoken,
+            'cancelled': self.cancelled,
+            'avg_first_audio_ms': (self.total_first_audio / self.readings * 1000)
+            if self.readings else 0.0
+        }
+
+    # ===== LECTURA =====
+
+    def _read(self, chunks: List[str]) -> bool:
+        with self._lock:  # una lectura a la vez
+            self._cancel.clear()
+            self._skip.clear()
+            self._speaking.set()
+            self.readings += 1
+            start = time.time()
+
+            try:
+                if self.pipelined:
+                    completed = self._read_pipelined(chunks, start)
+                else:
+                    completed = self._read_sequential(chunks, start)
+            finally:
+                self._speaking.clear()
+
+            if not completed:
+                self.cancelled += 1
+            return completed
+
+    def _read_sequential(self, chunks: List[str], start: float) -> bool:
+        for i, chunk in enumerate(chunks):
+            if self._cancel.is_set():
+                return False
+            if i == 0:
+                self.total_first_audio += time.time() - start
+            self.voice.speak(chunk)
+            self.chunks_spoken += 1
+            # Sin stop() en el gestor de voz, saltar = no alargar más este fragmento
+            self._skip.clear()
+        return not self._cancel.is_set()
+
+    def _read_pipelined(self, chunks: List[str], start: float) -> bool:
+        audio: queue.Queue = queue.Queue(maxsize=self.lookahead)
+
+        def produce():
+            for chunk in chunks:
+                if self._cancel.is_set():
+                    break
+                try:
+                    clip = self.voice.synthesize(chunk)
+                except Exception as e:
+                    print(f"[!] Error sintetizando fragmento: {e}")
+                    clip = None
+                while not self._cancel.is_set():
+                    try:
+                        audio.put(clip, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+            audio.put(_DONE)
+
+        producer = threading.Thread(target=produce, daemon=True, name='speech-producer')
+        producer.start()
+
+        first = True
+        while True:
+            try:
+                clip = audio.get(timeout=0.1)
+            except queue.Empty:
+                if self._cancel.is_set():
+                    break
+                continue
+            if clip is _DONE or self._cancel.is_set():
+                break
+            if clip is None:
+                continue
+            if self._skip.is_set():
+                self._skip.clear()
+                continue
+
+            if first:
+                self.total_first_audio += time.time() - start
+                first = False
+            self.voice.play(clip)
+            self.chunks_spoken += 1
+            self._skip.clear()  # un skip durante play() ya cortó este fragmento
+
+        # Vaciar la cola para que el productor pueda terminar
+        while producer.is_alive():
+            try:
+                audio.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return not self._cancel.is_set()
+
+    def _stop_audio(self):
+        stop = getattr(self.voice, 'stop', None)
+        if callable(stop):
+            try:
+                stop()
+            except Exception:
+                pass
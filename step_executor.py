@@ -0,0 +1,274 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from screen_settle import frames_differ
+
+
+@dataclass
+class StepTiming:
+    """Tiempos de un paso en el timeline"""
+    index: int
+    action: str
+    lookup_ms: float = 0.0
+    lookup_prefetched: bool = False
+    lookup_blocked_ms: float = 0.0  # tiempo esperando el prefetch
+    action_ms: float = 0.0
+    wait_ms: float = 0.0
+    condition: Optional[str] = None
+    condition_met: bool = True
+    success: bool = True
+
+
+class StepExecutor:
+    """
+    Ejecutor de execution_steps con dependencias
+    Solapa el trabajo de solo lectura (captura + búsqueda de elementos)
+    con la acción de UI anterior y reemplaza la pausa fija por
+    condiciones de finalización con timeout
+    """
+
+    # Acciones que cambian lo que hay en pantalla
+    SCREEN_CHANGING = {'open_app', 'click', 'scroll', 'search', 'navigate', 'wait'}
+
+    # Condición de finalización por defecto según acción
+    DEFAULT_CONDITIONS = {
+        'open_app': {'until': 'screen_changed', 'timeout': 5.0},
+        'click': {'until': 'screen_changed', 'timeout': 1.5},
+        'scroll': {'until': 'screen_changed', 'timeout': 1.0},
+        'search': {'until': 'screen_changed', 'timeout': 3.0},
+        'navigate': {'until': 'screen_changed', 'timeout': 3.0},
+    }
+
+    def __init__(self, core, max_workers: int = 2, poll_interval: float = 0.1,
+                 change_threshold: float = 4.0):
+        self.core = core
+        self.poll_interval = poll_interval
+        self.change_threshold = change_threshold
+        self._pool = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix='step-lookup')
+
+    def run(self, steps: List[Dict], control_system) -> Dict:
+        """
+        Ejecuta los pasos respetando dependencias
+        Retorna {'success', 'results', 'timeline'}
+        """
+        run_start = time.time()
+        lookup_deps = self._lookup_dependencies(steps)
+        completed: Set[int] = set()
+        lookups: Dict[int, Any] = {}
+        timeline: List[StepTiming] = []
+        results = []
+
+        # Búsquedas que ya pueden empezar (dependen de la pantalla inicial)
+        self._schedule_lookups(steps, lookup_deps, completed, lookups, control_system)
+
+        for index, step in enumerate(steps):
+            timing = StepTiming(index=index, action=step.get('action', '?'))
+            timeline.append(timing)
+
+            # 1. Resultado de la búsqueda (prefetch o síncrona) y frame previo
+            try:
+                element, frame, condition = self._prepare_step(
+                    index, step, timing, lookups, control_system
+                )
+            except Exception as e:
+                print(f"[!] Error preparando paso {index}: {e}")
+                timing.success = False
+                results.append({'success': False, 'error': str(e)})
+                break
+
+            # 2. Acción de UI
+            start = time.time()
+            result = self.core._execute_step(step, control_system, element=element)
+            timing.action_ms = (time.time() - start) * 1000
+            timing.success = bool(result.get('success'))
+            results.append(result)
+
+            if not timing.success:
+                break
+
+            # 3. Condición de finalización
+            start = time.time()
+            timing.condition, timing.condition_met = self._wait_for_completion(
+                condition, control_system, frame
+            )
+            timing.wait_ms = (time.time() - start) * 1000
+
+            completed.add(index)
+            self._schedule_lookups(steps, lookup_deps, completed, lookups, control_system)
+
+        # Cancelar búsquedas que ya no se usarán
+        for future in lookups.values():
+            future.cancel()
+
+        self._print_timeline(timeline, (time.time() - run_start) * 1000)
+
+        return {
+            'success': all(t.success for t in timeline) and len(results) == len(steps),
+            'results': results,
+            'timeline': [asdict(t) for t in timeline]
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+    # ===== DEPENDENCIAS =====
+
+    def _lookup_dependencies(self, steps: List[Dict]) -> Dict[int, Set[int]]:
+        """
+        Dependencias de la búsqueda de cada paso
+        Explícitas ('depends_on': [índices]) o inferidas: el último paso
+        anterior que cambia la pantalla
+        """
+        deps = {}
+        last_screen_change = None
+
+        for index, step in enumerate(steps):
+            if self._needs_lookup(step):
+                if 'depends_on' in step:
+                    deps[index] = {d for d in step['depends_on'] if isinstance(d, int) and d < index}
+                elif last_screen_change is not None:
+                    deps[index] = {last_screen_change}
+                else:
+                    deps[index] = set()
+
+            if step.get('action') in self.SCREEN_CHANGING:
+                last_screen_change = index
+
+        return deps
+
+    def _schedule_lookups(self, steps, lookup_deps, completed, lookups, control_system):
+        """
+        Lanza en segundo plano las búsquedas cuyas dependencias terminaron
+        Las que comparten dependencias ven la misma pantalla: una sola llamada
+        """
+        groups: Dict[frozenset, List[int]] = {}
+        for index, deps in list(lookup_deps.items()):
+            if deps <= completed:
+                del lookup_deps[index]
+                groups.setdefault(frozenset(deps), []).append(index)
+
+        for indices in groups.values():
+            descriptions = [self._description(steps[i]) for i in indices]
+            future = self._pool.submit(self._timed_batch_lookup, descriptions, control_system)
+            for index in indices:
+                lookups[index] = future
+
+    @staticmethod
+    def _needs_lookup(step: Dict) -> bool:
+        params = step.get('params', {})
+        return (step.get('action') == 'click' and
+                not (params.get('x') and params.get('y')) and
+                bool(params.get('description')))
+
+    @staticmethod
+    def _description(step: Dict) -> str:
+        return step.get('params', {}).get('description')
+
+    def _prepare_step(self, index: int, step: Dict, timing: StepTiming, lookups: Dict[int, Any],
+                      control_system) -> tuple:
+        """Elemento del paso (prefetch o búsqueda síncrona), frame previo y condición"""
+        element, frame = None, None
+        if index in lookups:
+            start = time.time()
+            elements, frame, timing.lookup_ms = lookups.pop(index).result()
+            element = elements.get(self._description(step), {'found': False})
+            timing.lookup_blocked_ms = (time.time() - start) * 1000
+            timing.lookup_prefetched = True
+
+            # El prefetch no vio el elemento (p.ej. botón enviar aparece al escribir)
+            if not element.get('found'):
+                element, frame, timing.lookup_ms = self._timed_lookup(step, control_system)
+                timing.lookup_prefetched = False
+        elif self._needs_lookup(step):
+            element, frame, timing.lookup_ms = self._timed_lookup(step, control_system)
+
+        # Acción de UI con el frame previo para detectar el cambio
+        condition = self._completion_condition(step)
+        if condition.get('until') == 'screen_changed' and frame is None:
+            frame = control_system.screen.get_frame()
+        return element, frame, condition
+
+    def _timed_lookup(self, step: Dict, control_system):
+        start = time.time()
+        element, frame = self.core._locate_step_target(step, control_system)
+        return element, frame, (time.time() - start) * 1000
+
+    def _timed_batch_lookup(self, descriptions: List[str], control_system):
+        start = time.time()
+        elements, frame = self.core._locate_step_targets(descriptions, control_system)
+        return elements, frame, (time.time() - start) * 1000
+
+    # ===== CONDICIONES DE FINALIZACIÓN =====
+
+    def _completion_condition(self, step: Dict) -> Dict:
+        """Condición explícita del paso ('until', 'timeout') o la de su acción"""
+        condition = dict(self.DEFAULT_CONDITIONS.get(step.get('action'), {}))
+        if 'until' in step:
+            condition['until'] = step['until']
+        if 'timeout' in step:
+            condition['timeout'] = step['timeout']
+        return condition
+
+    def _wait_for_completion(self, condition: Dict, control_system, before_frame) -> tuple:
+        """Espera la condición del paso; retorna (condición, cumplida)"""
+        until = condition.get('until')
+        if not until:
+            return None, True
+
+        timeout = condition.get('timeout', 2.0)
+
+        settle = getattr(control_system, 'settle', None)
+
+        if until == 'screen_changed':
+            if settle is not None:
+                # Cambio respecto al frame previo y luego pantalla quieta
+                return until, settle.wait_until_settled(timeout, reference=before_frame)
+
+            met = self._poll(lambda: frames_differ(before_frame,
+                                                   control_system.screen.get_frame(),
+                                                   self.change_threshold),
+                             timeout)
+            return until, met
+
+        if isinstance(until, dict) and 'element' in until:
+            description = until['element']
+
+            if settle is not None:
+                found = settle.wait_for_element(description, timeout=timeout).get('found')
+                return f"element:{description}", bool(found)
+
+            def element_present():
+                frame = control_system.screen.get_frame()
+                return control_system.vision.find_element(frame, description).get('found')
+
+            return f"element:{description}", self._poll(element_present, timeout)
+
+        if until == 'delay':
+            time.sleep(timeout)
+            return until, True
+
+        return str(until), True
+
+    def _poll(self, condition: Callable[[], bool], timeout: float) -> bool:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                if condition():
+                    return True
+            except Exception:
+                pass
+            time.sleep(self.poll_interval)
+        return False
+
+    # ===== TIMELINE =====
+
+    def _print_timeline(self, timeline: List[StepTiming], total_ms: float):
+        print(f"[⏱️] Timeline ({total_ms:.0f} ms):")
+        for t in timeline:
+            overlap = f" (prefetch, bloqueó {t.lookup_blocked_ms:.0f} ms)" if t.lookup_prefetched else ""
+            condition = f" | {t.condition}{'' if t.condition_met else ' TIMEOUT'}" if t.condition else ""
+            print(f"     {t.index}. {t.action:<10} búsqueda {t.lookup_ms:6.0f} ms{overlap}"
+                  f" | acción {t.action_ms:6.0f} ms | espera {t.wait_ms:6.0f} ms{condition}")
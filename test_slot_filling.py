@@ -0,0 +1,84 @@
+from datetime import datetime
+
+import pytest
+
+from slot_filling import SlotFiller, find_datetime, parse_datetime
+
+# Lunes 13 de octubre de 2025, 10:00
+NOW = datetime(2025, 10, 13, 10, 0)
+
+
+@pytest.fixture
+def slots():
+    return SlotFiller()
+
+
+# ===== ACCIÓN =====
+
+def test_message_body_does_not_decide_action(slots):
+    command = slots.parse_command(
+        "mándale un whatsapp a Luis diciendo que no olvide la cita de mañana a las 9", NOW)
+    assert command['action'] == 'send_message'
+    assert command['parameters']['app'] == 'whatsapp'
+    assert command['parameters']['contact'] == 'Luis'
+    assert command['parameters']['message'] == 'no olvide la cita de mañana a las 9'
+
+
+def test_dile_with_meeting_in_body_is_a_message(slots):
+    command = slots.parse_command("dile a Pedro que la reunión es mañana a las 5", NOW)
+    assert command['action'] == 'send_message'
+    assert command['parameters']['contact'] == 'Pedro'
+    assert command['parameters']['message'] == 'la reunión es mañana a las 5'
+
+
+def test_message_after_colon_is_body(slots):
+    command = slots.parse_command("whatsapp a Ana: llego tarde a la reunión", NOW)
+    assert command['action'] == 'send_message'
+    assert command['parameters']['message'] == 'llego tarde a la reunión'
+
+
+def test_app_phrase_between_contact_and_body(slots):
+    command = slots.parse_command("escríbele a Ana por whatsapp que llego tarde", NOW)
+    assert command['action'] == 'send_message'
+    assert command['parameters'] == {'app': 'whatsapp', 'contact': 'Ana', 'message': 'llego tarde'}
+
+
+def test_call_with_event_noun_is_a_call(slots):
+    command = slots.parse_command("llama a Marta por lo de la cita", NOW)
+    assert command['action'] == 'make_call'
+
+
+def test_reminder_verb_wins_over_message_noun(slots):
+    command = slots.parse_command("recuérdame mandar el mensaje a Luis mañana", NOW)
+    assert command['action'] == 'set_reminder'
+
+
+def test_event_noun_without_verb(slots):
+    command = slots.parse_command("cita con el dentista el viernes a las 5", NOW)
+    assert command['action'] == 'create_event'
+    assert command['parameters']['date'] == '2025-10-17'
+    assert command['parameters']['time'] == '17:00'
+    assert command['parameters']['title'] == 'Cita con el dentista'
+
+
+def test_unknown_command(slots):
+    assert slots.parse_command("qué tiempo hace hoy", NOW) is None
+
+
+# ===== FECHAS Y HORAS =====
+
+@pytest.mark.parametrize('text, expected', [
+    ("mañana a las 9", datetime(2025, 10, 14, 9, 0)),
+    ("pasado mañana a las 8 y media de la noche", datetime(2025, 10, 15, 20, 30)),
+    ("en dos horas", datetime(2025, 10, 13, 12, 0)),
+    ("el viernes a las 5", datetime(2025, 10, 17, 17, 0)),
+    ("el 3 de noviembre a las 10:15", datetime(2025, 11, 3, 10, 15)),
+    ("a las 12 de la noche", datetime(2025, 10, 14, 0, 0)),
+    ("a las 12 de la tarde", datetime(2025, 10, 13, 12, 0)),
+])
+def test_parse_datetime(text, expected):
+    assert parse_datetime(text, NOW) == expected
+
+
+def test_no_datetime():
+    assert not find_datetime("dile que ya voy", NOW).found
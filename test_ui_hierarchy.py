@@ -0,0 +1,47 @@
+import numpy as np
+
+from adb_session import CommandResult
+from ui_hierarchy import UIHierarchy
+
+DUMP = ('<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0">'
+        '<node text="Enviar" resource-id="com.whatsapp:id/send" class="android.widget.ImageButton" '
+        'package="com.whatsapp" clickable="true" enabled="true" bounds="[900,1700][1060,1860]" />'
+        '</hierarchy>')
+
+
+class FakeSession:
+    def __init__(self):
+        self.commands = []
+
+    def run(self, command, timeout=None):
+        self.commands.append(command)
+        return CommandResult(command=command, output=DUMP, exit_code=0, elapsed_ms=1.0)
+
+
+def screen(seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, size=(1920, 1080, 3), dtype=np.uint8)
+
+
+def test_noisy_frame_reuses_cached_tree():
+    session = FakeSession()
+    tree = UIHierarchy(session)
+    frame = screen()
+
+    # Ruido de decodificación y un reloj que cambia en la barra de estado
+    noisy = np.clip(frame.astype(np.int16) + np.random.default_rng(1).integers(-3, 4, frame.shape),
+                    0, 255).astype(np.uint8)
+    noisy[10:40, 960:1060] = 255
+
+    assert tree.find_element('botón enviar', frame)['found']
+    assert tree.find_element('botón enviar', noisy)['found']
+    assert tree.dumps == 1
+
+
+def test_different_screen_dumps_again():
+    session = FakeSession()
+    tree = UIHierarchy(session)
+
+    tree.get_index(screen(0))
+    tree.get_index(screen(2))
+    assert tree.dumps == 2
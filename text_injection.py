@@ -0,0 +1,162 @@
+import base64
+import shlex
+import time
+import unicodedata
+from typing import Dict, List, Optional
+
+from input_batch import input_text_commands
+
+ADB_KEYBOARD_IME = 'com.android.adbkeyboard/.AdbIME'
+CLIPPER_PACKAGE = 'ca.zgrs.clipper'
+KEYCODE_PASTE = 279
+
+# Trozo máximo por 'input text' (textos largos fallan de una vez)
+INPUT_TEXT_CHUNK = 40
+
+# Salida que indica que un backend no escribió
+BACKEND_FAILURE = '__ATLAS_TEXT_FAIL__'
+_FAILURE_MARKERS = (BACKEND_FAILURE, 'Unknown input method', 'Exception', 'Error:')
+
+
+def to_ascii(text: str) -> str:
+    """Quita acentos y descarta lo que 'input text' no puede escribir"""
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in text if not unicodedata.combining(c) and ord(c) < 128)
+
+
+class TextInjector:
+    """
+    Escritura de texto en bloque
+    Orden de preferencia:
+      1. ADBKeyBoard: broadcast ADB_INPUT_B64 (unicode completo, una operación)
+      2. Portapapeles (Clipper) + KEYCODE_PASTE
+      3. 'input text' por trozos escapados (solo ASCII)
+    Todas las rutas generan un único script: una ida y vuelta por texto.
+    Si un backend falla al escribir se descarta y se prueba el siguiente
+    en la misma llamada; 'input text' informa de los caracteres que no
+    puede escribir (ñ, acentos, emoji) con success False
+    """
+
+    def __init__(self, session, restore_ime: bool = True):
+        self.session = session
+        self.restore_ime = restore_ime
+
+        self._backend: Optional[str] = None
+        self._current_ime: Optional[str] = None
+        self._failed = set()  # backends que fallaron en esta sesión
+
+        # Estadísticas
+        self.uses = {'adb_keyboard': 0, 'clipboard': 0, 'input_text': 0}
+        self.chars = 0
+
+    # ===== API PÚBLICA =====
+
+    def type(self, text: str) -> Dict:
+        """Escribe el texto en el campo con el foco"""
+        if not text:
+            return {'success': True, 'backend': None}
+
+        start = time.time()
+        while True:
+            backend = self.backend
+            try:
+                result = self.session.run('\n'.join(self.commands(text)))
+            except Exception as e:
+                return {'success': False, 'error': str(e)}
+
+            failed = not result.ok or any(m in result.output for m in _FAILURE_MARKERS)
+            if not failed or backend == 'input_text':
+                break
+
+            # Backend roto (IME desinstalado, Clipper sin permiso...): siguiente
+            print(f"[!] Escritura vía {backend} falló; probando otra vía")
+            self._failed.add(backend)
+            self._backend = None
+
+        elapsed = (time.time() - start) * 1000
+        response = {'success': result.ok, 'backend': backend, 'elapsed_ms': elapsed}
+
+        dropped = self._untypable(text) if backend == 'input_text' else ''
+        if dropped:
+            response.update(success=False, reason='caracteres_no_soportados', dropped=dropped)
+        return response
+
+    def commands(self, text: str) -> List[str]:
+        """Comandos de shell que escriben el texto (para incluir en un lote)"""
+        backend = self.backend
+        self.uses[backend] += 1
+        self.chars += len(text)
+
+        if backend == 'adb_keyboard':
+            return self._adb_keyboard_commands(text)
+        if backend == 'clipboard':
+            return self._clipboard_commands(text)
+        return self._input_text_commands(text)
+
+    @property
+    def backend(self) -> str:
+        """Backend disponible en el dispositivo (se detecta una vez)"""
+        if self._backend is None:
+            self._backend = self._detect_backend()
+            print(f"[⌨️] Escritura de texto vía {self._backend}")
+        return self._backend
+
+    def reset(self):
+        """Vuelve a detectar el backend (p.ej. tras instalar ADBKeyBoard)"""
+        self._backend = None
+        self._current_ime = None
+        self._failed.clear()
+
+    def get_statistics(self) -> Dict:
+        return {'backend': self._backend, 'uses': dict(self.uses), 'chars': self.chars}
+
+    # ===== BACKENDS =====
+
+    def _detect_backend(self) -> str:
+        try:
+            ime, clipper, current = self.session.pipeline([
+                'ime list -s',
+                f'pm list packages {CLIPPER_PACKAGE}',
+                'settings get secure default_input_method'
+            ])
+        except Exception:
+            return 'input_text'
+
+        self._current_ime = current.output.strip()
+        if ADB_KEYBOARD_IME in ime.output and 'adb_keyboard' not in self._failed:
+            return 'adb_keyboard'
+        if CLIPPER_PACKAGE in clipper.output and 'clipboard' not in self._failed:
+            return 'clipboard'
+        return 'input_text'
+
+    def _adb_keyboard_commands(self, text: str) -> List[str]:
+        encoded = base64.b64encode(text.encode('utf-8')).decode('ascii')
+        broadcast = f"am broadcast -a ADB_INPUT_B64 --es msg {encoded} >/dev/null"
+
+        if self._current_ime == ADB_KEYBOARD_IME:
+            return [broadcast]
+
+        # Activar el IME el tiempo justo de escribir y restaurar el del usuario
+        # Sin redirigir: si el IME ya no está, la salida lo dice ("Unknown input method")
+        commands = [f"ime set {ADB_KEYBOARD_IME}", "sleep 0.3", broadcast]
+        if self.restore_ime and self._current_ime and self._current_ime != 'null':
+            commands += ["sleep 0.2", f"ime set {self._current_ime} >/dev/null"]
+        else:
+            self._current_ime = ADB_KEYBOARD_IME
+        return commands
+
+    @staticmethod
+    def _clipboard_commands(text: str) -> List[str]:
+        # Clipper contesta result=-1 si copió; si no, no se pega nada
+        return [f"am broadcast -a clipper.set -e text {shlex.quote(text)} | grep -q 'result=-1' "
+                f"&& input keyevent {KEYCODE_PASTE} || echo {BACKEND_FAILURE}"]
+
+    @staticmethod
+    def _untypable(text: str) -> str:
+        """Caracteres que 'input text' no escribe tal cual"""
+        return ''.join(dict.fromkeys(c for c in text if ord(c) >= 128))
+
+    @staticmethod
+    def _input_text_commands(text: str) -> List[str]:
+        text = to_ascii(text)
+        return input_text_commands(text, INPUT_TEXT_CHUNK)
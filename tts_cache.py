@@ -0,0 +1,243 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+CACHE_DIR = 'tts_cache'
+
+# Frases fijas que el asistente dice a menudo (se sintetizan al arrancar)
+KNOWN_PHRASES = [
+    "Dime", "Listo", "Perfecto", "Entendido, cancelado", "Click",
+    "Click donde miras", "Seleccionado", "Agarrado",
+    "Captura tomada", "Nota guardada", "Like dado", "Rutina completada",
+    "No tienes notificaciones", "No hay texto legible en pantalla", "En pantalla dice:",
+    "No entendí bien. ¿Puedes explicar de otra forma?",
+]
+
+
+class TTSCache:
+    """
+    Cache en disco de audio sintetizado
+    Clave: (texto, voz, velocidad). Guarda cada clip en su fichero y un
+    índice con tamaño y último uso; al pasar del presupuesto se borran
+    los menos usados recientemente.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, budget_mb: float = 50.0):
+        self.directory = directory
+        self.budget = int(budget_mb * 1024 * 1024)
+
+        self._index: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_save = 0.0
+
+        # Estadísticas
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    # ===== API PÚBLICA =====
+
+    def get(self, text: str, voice: str = 'default', rate=None) -> Optional[bytes]:
+        key = self.key(text, voice, rate)
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            try:
+                with open(os.path.join(self.directory, entry['file']), 'rb') as f:
+                    audio = f.read()
+            except OSError:
+                del self._index[key]
+                self._dirty = True
+                self.misses += 1
+                return None
+
+            entry['last_used'] = time.time()
+            self._dirty = True
+            self.hits += 1
+        return audio
+
+    def put(self, text: str, audio: bytes, voice: str = 'default', rate=None):
+        if not audio:
+            return
+        key = self.key(text, voice, rate)
+        filename = f"{key}.audio"
+
+        with self._lock:
+            try:
+                with open(os.path.join(self.directory, filename), 'wb') as f:
+                    f.write(audio)
+            except OSError as e:
+                print(f"[!] Error guardando audio en cache: {e}")
+                return
+
+            # Sin el texto en claro: solo el hash de la clave
+            self._index[key] = {'file': filename, 'size': len(audio), 'last_used': time.time()}
+            self._dirty = True
+            self._evict()
+
+        self._maybe_save()
+
+    def contains(self, text: str, voice: str = 'default', rate=None) -> bool:
+        return self.key(text, voice, rate) in self._index
+
+    @staticmethod
+    def key(text: str, voice: str = 'default', rate=None) -> str:
+        normalized = ' '.join(text.split())
+        return hashlib.sha1(f"{voice}|{rate}|{normalized}".encode('utf-8')).hexdigest()[:20]
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                with open(os.path.join(self.directory, 'index.json'), 'w', encoding='utf-8') as f:
+                    json.dump(self._index, f, ensure_ascii=False)
+                self._dirty = False
+                self._last_save = time.time()
+            except OSError as e:
+                print(f"[!] Error guardando índice de audio: {e}")
+
+    def get_statistics(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            'phrases': len(self._index),
+            'size_mb': sum(e['size'] for e in self._index.values()) / (1024 * 1024),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits / total * 100) if total else 0.0
+        }
+
+    # ===== UTILIDADES PRIVADAS =====
+
+    def _load_index(self):
+        path = os.path.join(self.directory, 'index.json')
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, encoding='utf-8') as f:
+                self._index = json.load(f)
+            # Índices antiguos guardaban el texto de cada frase: se borra
+            for entry in self._index.values():
+                if entry.pop('text', None) is not None:
+                    self._dirty = True
+        except Exception as e:
+            print(f"[!] Índice de audio ilegible, se descarta: {e}")
+            self._index = {}
+
+    def _evict(self):
+        """LRU hasta quedar bajo el presupuesto (con el lock tomado)"""
+        total = sum(e['size'] for e in self._index.values())
+        for key in sorted(self._index, key=lambda k: self._index[k]['last_used']):
+            if total <= self.budget:
+                break
+            entry = self._index.pop(key)
+            total -= entry['size']
+            self.evictions += 1
+            try:
+                os.remove(os.path.join(self.directory, entry['file']))
+            except OSError:
+                pass
+
+    def _maybe_save(self):
+        if time.time() - self._last_save > 10.0:
+            self.save()
+
+
+class CachedSpeech:
+    """
+    Gestor de voz con cache de frases
+    Envuelve el VoiceManager: si este separa synthesize()/play(), las
+    frases se sirven desde la cache (reproducción en milisegundos) y las
+    nuevas se guardan al sintetizarlas si son conocidas o cortas: textos
+    leídos de pantalla, notificaciones o mensajes no se escriben a disco.
+    Si no, delega en speak(). El resto de métodos (listen_once, ...)
+    pasan tal cual.
+    """
+
+    def __init__(self, voice, cache: Optional[TTSCache] = None, max_cached_chars: int = 30):
+        self.voice = voice
+        self.cache = cache or TTSCache()
+        self.max_cached_chars = max_cached_chars
+        self.known = {self._normalize(p) for p in KNOWN_PHRASES}
+
+    def __getattr__(self, name):
+        return getattr(self.voice, name)
+
+    @property
+    def cacheable(self) -> bool:
+        return callable(getattr(self.voice, 'synthesize', None)) and \
+            callable(getattr(self.voice, 'play', None))
+
+    # ===== API DE VOZ =====
+
+    def speak(self, text: str):
+        if not text or not self.cacheable:
+            return self.voice.speak(text)
+
+        audio = self.synthesize(text)
+        if audio is None:
+            return self.voice.speak(text)
+        return self.voice.play(audio)
+
+    def synthesize(self, text: str) -> Optional[bytes]:
+        """Audio de la frase (de la cache si ya se sintetizó)"""
+        voice_id, rate = self._voice_params()
+        audio = self.cache.get(text, voice_id, rate)
+        if audio is not None:
+            return audio
+
+        audio = self.voice.synthesize(text)
+        if isinstance(audio, (bytes, bytearray)) and self._cacheable_text(text):
+            self.cache.put(text, bytes(audio), voice_id, rate)
+        return audio
+
+    def prewarm(self, phrases: Iterable[str] = KNOWN_PHRASES, background: bool = True):
+        """Sintetiza de antemano las frases que aún no están en cache"""
+        if not self.cacheable:
+            return
+
+        voice_id, rate = self._voice_params()
+        phrases = list(phrases)
+        self.known.update(self._normalize(p) for p in phrases if p)
+        pending = [p for p in dict.fromkeys(phrases) if p and not self.cache.contains(p, voice_id, rate)]
+        if not pending:
+            return
+
+        def warm():
+            for phrase in pending:
+                try:
+                    self.synthesize(phrase)
+                except Exception as e:
+                    print(f"[!] Error precalentando '{phrase}': {e}")
+                    return
+            self.cache.save()
+            print(f"[🔈] {len(pending)} frases precalentadas")
+
+        if background:
+            threading.Thread(target=warm, daemon=True, name='tts-prewarm').start()
+        else:
+            warm()
+
+    def _cacheable_text(self, text: str) -> bool:
+        """Frases fijas o cortas; el resto puede ser contenido privado"""
+        normalized = self._normalize(text)
+        return normalized in self.known or len(normalized) <= self.max_cached_chars
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return ' '.join(text.split())
+
+    def _voice_params(self):
+        voice_id = getattr(self.voice, 'voice_id', None) or getattr(self.voice, 'voice', 'default')
+        rate = getattr(self.voice, 'rate', None)
+        return str(voice_id), rate
@@ -0,0 +1,296 @@
+import re
+import time
+import unicodedata
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+
+from adb_session import get_session
+from element_locator import SCREEN_W, SCREEN_H
+from screen_settle import frame_signature, frames_differ
+
+DUMP_PATH = '/sdcard/atlas_ui_dump.xml'
+
+# Palabras de las descripciones que no aparecen en la UI
+STOPWORDS = {
+    'boton', 'icono', 'barra', 'campo', 'cuadro', 'de', 'del', 'la', 'el', 'los',
+    'las', 'para', 'un', 'una', 'en', 'con', 'al', 'primer', 'primera', 'resultado',
+}
+
+# Sinónimos español -> textos/ids habituales en apps Android
+SYNONYMS = {
+    'enviar': ['send', 'enviar'],
+    'buscar': ['search', 'buscar', 'busqueda'],
+    'busqueda': ['search', 'buscar', 'busqueda'],
+    'lupa': ['search'],
+    'llamar': ['call', 'llamar', 'dial'],
+    'mensaje': ['message', 'entry', 'compose', 'mensaje'],
+    'texto': ['text', 'entry', 'edit', 'input'],
+    'guardar': ['save', 'guardar', 'done'],
+    'confirmar': ['confirm', 'ok', 'done', 'aceptar'],
+    'publicar': ['post', 'publish', 'tweet', 'publicar', 'share'],
+    'instalar': ['install', 'instalar'],
+    'iniciar': ['start', 'iniciar', 'go'],
+    'reproducir': ['play', 'reproducir'],
+    'crear': ['create', 'add', 'new', 'fab', 'crear'],
+    'nueva': ['new', 'add', 'create', 'fab'],
+    'nuevo': ['new', 'add', 'create', 'fab'],
+    'mas': ['add', 'more', 'fab', 'plus'],
+    'compartir': ['share', 'compartir'],
+    'titulo': ['title', 'titulo'],
+    'gusta': ['like', 'heart', 'gusta'],
+    'corazon': ['like', 'heart'],
+    'destino': ['destination', 'search', 'destino'],
+    'direcciones': ['directions', 'direcciones', 'route'],
+    'llegar': ['directions', 'llegar'],
+    'almacenamiento': ['storage', 'almacenamiento'],
+    'liberar': ['free', 'liberar'],
+    'contacto': ['contact', 'contacto'],
+    'molestar': ['dnd', 'molestar', 'disturb'],
+}
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sin acentos y sin signos"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)  # camelCase
+    text = re.sub(r'[^a-zA-Z0-9ñÑ]+', ' ', text)
+    return text.lower().strip()
+
+
+@dataclass
+class UINode:
+    """Nodo de la jerarquía de vistas"""
+    text: str
+    content_desc: str
+    resource_id: str
+    class_name: str
+    package: str
+    bounds: Tuple[int, int, int, int]
+    clickable: bool
+    enabled: bool
+
+    @property
+    def center(self) -> Tuple[int, int]:
+        x1, y1, x2, y2 = self.bounds
+        return (x1 + x2) // 2, (y1 + y2) // 2
+
+    @property
+    def search_fields(self) -> List[str]:
+        """Campos normalizados contra los que se compara una descripción"""
+        rid = self.resource_id.split('/')[-1] if self.resource_id else ''
+        return [f for f in (normalize(self.text), normalize(self.content_desc), normalize(rid)) if f]
+
+
+class UIIndex:
+    """Tabla de nodos indexada por token"""
+
+    def __init__(self, nodes: List[UINode], screen_size: Tuple[int, int]):
+        self.nodes = nodes
+        self.screen_size = screen_size
+        self.tokens: Dict[str, List[int]] = {}
+
+        for i, node in enumerate(nodes):
+            for field in node.search_fields:
+                for token in field.split():
+                    self.tokens.setdefault(token, []).append(i)
+
+    def query(self, description: str) -> Tuple[Optional[UINode], float]:
+        """Mejor nodo para la descripción y su puntuación (0-1)"""
+        best, best_score = None, 0.0
+
+        # "búsqueda o lupa" -> alternativas
+        for alternative in re.split(r'\s+o\s+', normalize(description)):
+            words = [w for w in alternative.split() if w not in STOPWORDS]
+            if not words:
+                continue
+
+            expanded = set(words)
+            for w in words:
+                expanded.update(SYNONYMS.get(w, []))
+
+            # Candidatos: nodos que comparten algún token (o prefijo)
+            candidates = set()
+            for token, indices in self.tokens.items():
+                if any(token == e or token.startswith(e) for e in expanded if len(e) >= 3):
+                    candidates.update(indices)
+
+            phrase = ' '.join(words)
+            for i in candidates:
+                node = self.nodes[i]
+                score = self._score(node, phrase, expanded)
+                if score > best_score:
+                    best, best_score = node, score
+
+        return best, best_score
+
+    @staticmethod
+    def _score(node: UINode, phrase: str, expanded: set) -> float:
+        score = 0.0
+        for field in node.search_fields:
+            tokens = set(field.split())
+            overlap = len(tokens & expanded) / max(1, len(tokens))
+            similarity = SequenceMatcher(None, phrase, field).ratio()
+            score = max(score, 0.6 * overlap + 0.4 * similarity, similarity)
+
+        if not node.enabled:
+            score *= 0.5
+        if node.clickable:
+            score = min(1.0, score + 0.1)
+        return score
+
+
+class UIHierarchy:
+    """
+    Backend de jerarquía de UI (uiautomator) vía ADB
+    Responde búsquedas tipo find_element por texto sin llamar al modelo
+    El árbol se cachea por estado de pantalla: firma reducida del frame
+    comparada con tolerancia (un reloj, un cursor o el ruido del vídeo no
+    son otra pantalla)
+    """
+
+    def __init__(self, session=None, min_score: float = 0.6,
+                 ttl: float = 2.0, max_states: int = 8, threshold: float = 3.0):
+        self.session = session or get_session()
+        self.min_score = min_score
+        self.ttl = ttl
+        self.max_states = max_states
+        self.threshold = threshold
+
+        self._states: List[Tuple[object, UIIndex]] = []  # (firma, índice); el más reciente al final
+        self._last_fetch: Tuple[float, Optional[UIIndex]] = (0.0, None)
+
+        # Estadísticas
+        self.dumps = 0
+        self.hits = 0
+        self.misses = 0
+
+    def find_element(self, description: str, frame=None) -> Dict:
+        """Busca un elemento en el árbol; {'found': False} si ningún nodo coincide"""
+        index = self.get_index(frame)
+        if index is None:
+            return {'found': False, 'confidence': 0.0}
+
+        node, score = index.query(description)
+        if node is None or score < self.min_score:
+            self.misses += 1
+            return {'found': False, 'confidence': score}
+
+        self.hits += 1
+        x, y = self._to_screen(node.center, index.screen_size)
+        return {
+            'found': True, 'x': x, 'y': y,
+            'confidence': round(score, 2),
+            'source': 'ui_tree',
+            'text': node.text or node.content_desc
+        }
+
+    def get_index(self, frame=None) -> Optional[UIIndex]:
+        """Índice del estado de pantalla actual (cacheado)"""
+        key = self._state_key(frame)
+
+        if key is not None:
+            for i in range(len(self._states) - 1, -1, -1):
+                if not frames_differ(self._states[i][0], key, self.threshold):
+                    self._states.append(self._states.pop(i))
+                    return self._states[-1][1]
+        else:
+            fetched_at, index = self._last_fetch
+            if index is not None and time.time() - fetched_at < self.ttl:
+                return index
+
+        index = self._fetch()
+        if index is None:
+            return None
+
+        self._last_fetch = (time.time(), index)
+        if key is not None:
+            self._states.append((key, index))
+            if len(self._states) > self.max_states:
+                self._states.pop(0)
+
+        return index
+
+    def invalidate(self):
+        """Olvida el árbol sin firma (tras una acción de UI)"""
+        self._last_fetch = (0.0, None)
+
+    def get_statistics(self) -> Dict:
+        return {'dumps': self.dumps, 'hits': self.hits, 'misses': self.misses,
+                'cached_states': len(self._states)}
+
+    # ===== UTILIDADES PRIVADAS =====
+
+    def _fetch(self) -> Optional[UIIndex]:
+        """Obtiene y parsea el dump de uiautomator"""
+        try:
+            # /dev/tty no existe en una sesión sin pty: volcar a fichero y leerlo
+            result = self.session.run(f'uiautomator dump {DUMP_PATH} >/dev/null && cat {DUMP_PATH}')
+        except Exception as e:
+            print(f"[!] Error obteniendo jerarquía de UI: {e}")
+            return None
+
+        self.dumps += 1
+        return self.parse(result.output)
+
+    @staticmethod
+    def parse(xml_text: str) -> Optional[UIIndex]:
+        """Convierte el XML de uiautomator en un índice"""
+        start, end = xml_text.find('<?xml'), xml_text.rfind('>')
+        if start < 0 or end < 0:
+            return None
+
+        try:
+            root = ET.fromstring(xml_text[start:end + 1])
+        except ET.ParseError:
+            return None
+
+        nodes = []
+        width, height = 0, 0
+        for element in root.iter('node'):
+            bounds = _parse_bounds(element.get('bounds', ''))
+            if bounds is None:
+                continue
+            width, height = max(width, bounds[2]), max(height, bounds[3])
+
+            text, desc = element.get('text', ''), element.get('content-desc', '')
+            rid = element.get('resource-id', '')
+            if not (text or desc or rid):
+                continue
+
+            nodes.append(UINode(
+                text=text,
+                content_desc=desc,
+                resource_id=rid,
+                class_name=element.get('class', ''),
+                package=element.get('package', ''),
+                bounds=bounds,
+                clickable=element.get('clickable') == 'true',
+                enabled=element.get('enabled', 'true') == 'true'
+            ))
+
+        return UIIndex(nodes, (width or SCREEN_W, height or SCREEN_H))
+
+    @staticmethod
+    def _state_key(frame):
+        if frame is None:
+            return None
+        try:
+            return frame_signature(frame)
+        except Exception:
+            return None
+
+    @staticmethod
+    def _to_screen(point: Tuple[int, int], screen_size: Tuple[int, int]) -> Tuple[int, int]:
+        """Píxeles del dispositivo -> sistema de coordenadas de los clicks"""
+        w, h = screen_size
+        return int(point[0] * SCREEN_W / w), int(point[1] * SCREEN_H / h)
+
+
+def _parse_bounds(bounds: str) -> Optional[Tuple[int, int, int, int]]:
+    match = re.match(r'\[(\d+),(\d+)\]\[(\d+),(\d+)\]', bounds)
+    if not match:
+        return None
+    return tuple(int(v) for v in match.groups())
@@ -0,0 +1,330 @@
+import os
+import queue
+import threading
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import sounddevice as sd
+except ImportError:
+    sd = None
+
+SAMPLE_RATE = 16000
+FRAME_MS = 10
+TEMPLATES_DIR = 'wake_templates'
+DEFAULT_THRESHOLD = 12.0
+
+
+# ===== CARACTERÍSTICAS (MFCC en numpy) =====
+
+@lru_cache(maxsize=4)
+def _mel_filterbank(n_filters: int, n_fft: int, sample_rate: int) -> np.ndarray:
+    def hz_to_mel(hz):
+        return 2595 * np.log10(1 + hz / 700)
+
+    def mel_to_hz(mel):
+        return 700 * (10 ** (mel / 2595) - 1)
+
+    mels = np.linspace(hz_to_mel(0), hz_to_mel(sample_rate / 2), n_filters + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mels) / sample_rate).astype(int)
+
+    bank = np.zeros((n_filters, n_fft // 2 + 1), dtype=np.float32)
+    for i in range(1, n_filters + 1):
+        left, center, right = bins[i - 1], bins[i], bins[i + 1]
+        if center > left:
+            bank[i - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            bank[i - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+    return bank
+
+
+@lru_cache(maxsize=4)
+def _dct_matrix(n_coeffs: int, n_filters: int) -> np.ndarray:
+    n = np.arange(n_filters)
+    return np.cos(np.pi / n_filters * (n + 0.5)[None, :] * np.arange(n_coeffs)[:, None]).astype(np.float32)
+
+
+def mfcc(signal: np.ndarray, sample_rate: int = SAMPLE_RATE, n_coeffs: int = 13,
+         n_filters: int = 26, frame_ms: int = 25, hop_ms: int = 10) -> np.ndarray:
+    """MFCC con normalización de media por coeficiente (frames x n_coeffs)"""
+    signal = np.asarray(signal, dtype=np.float32)
+    signal = np.append(signal[0], signal[1:] - 0.97 * signal[:-1])
+
+    frame_len = sample_rate * frame_ms // 1000
+    hop = sample_rate * hop_ms // 1000
+    if len(signal) < frame_len:
+        signal = np.pad(signal, (0, frame_len - len(signal)))
+
+    count = 1 + (len(signal) - frame_len) // hop
+    indices = np.arange(frame_len)[None, :] + hop * np.arange(count)[:, None]
+    frames = signal[indices] * np.hamming(frame_len).astype(np.float32)
+
+    n_fft = 512
+    power = (np.abs(np.fft.rfft(frames, n_fft)) ** 2) / n_fft
+    energies = np.log(power @ _mel_filterbank(n_filters, n_fft, sample_rate).T + 1e-10)
+    coeffs = energies @ _dct_matrix(n_coeffs, n_filters).T
+    return coeffs - coeffs.mean(axis=0)
+
+
+def dtw_distance(a: np.ndarray, b: np.ndarray, band: float = 0.25) -> float:
+    """DTW con banda Sakoe-Chiba; distancia media por paso del camino"""
+    n, m = len(a), len(b)
+    if n == 0 or m == 0:
+        return float('inf')
+
+    cost = np.sqrt(((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2))
+    width = max(int(band * max(n, m)), abs(n - m) + 1)
+
+    acc = np.full((n + 1, m + 1), np.inf, dtype=np.float64)
+    acc[0, 0] = 0.0
+    for i in range(1, n + 1):
+        center = i * m / n
+        lo, hi = max(1, int(center - width)), min(m, int(center + width))
+        for j in range(lo, hi + 1):
+            acc[i, j] = cost[i - 1, j - 1] + min(acc[i - 1, j], acc[i, j - 1], acc[i - 1, j - 1])
+    return float(acc[n, m] / (n + m))
+
+
+# ===== DETECCIÓN DE VOZ =====
+
+class VoiceActivityDetector:
+    """
+    Detector de voz por energía y cruces por cero
+    El umbral de energía sigue al ruido de fondo; la voz debe superarlo
+    con una tasa de cruces por cero de habla (no silbidos ni golpes).
+    Agrupa frames de voz en segmentos con margen al final.
+    """
+
+    def __init__(self, margin_db: float = 10.0, hangover_ms: int = 250,
+                 min_ms: int = 250, max_ms: int = 2500):
+        self.margin_db = margin_db
+        self.hangover = hangover_ms // FRAME_MS
+        self.min_frames = min_ms // FRAME_MS
+        self.max_frames = max_ms // FRAME_MS
+
+        self.noise_db = -50.0
+        self._frames: List[np.ndarray] = []
+        self._silence = 0
+        self._suppress = False  # tras un segmento demasiado largo, hasta el próximo silencio
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        rms = float(np.sqrt(np.mean(frame ** 2))) + 1e-10
+        db = 20 * np.log10(rms)
+        zcr = float(np.mean(np.abs(np.diff(np.sign(frame))) > 0))
+
+        speech = db > self.noise_db + self.margin_db and 0.02 < zcr < 0.5
+        # Suelo de ruido: baja rápido y sube muy despacio (la voz apenas lo mueve)
+        rate = 0.1 if db < self.noise_db else 0.002
+        self.noise_db += rate * (db - self.noise_db)
+        return speech
+
+    def feed(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """Añade un frame; devuelve un segmento de voz completo cuando termina"""
+        speech = self.is_speech(frame)
+        if self._suppress:
+            # Cola de habla continua: no es un segmento nuevo hasta que haya silencio
+            self._silence = 0 if speech else self._silence + 1
+            if self._silence >= self.hangover:
+                self._suppress, self._silence = False, 0
+            return None
+
+        if speech:
+            self._frames.append(frame)
+            self._silence = 0
+        elif self._frames:
+            self._frames.append(frame)
+            self._silence += 1
+
+        too_long = len(self._frames) >= self.max_frames
+        if self._frames and (self._silence >= self.hangover or too_long):
+            segment = np.concatenate(self._frames[:len(self._frames) - self._silence])
+            self._frames, self._silence = [], 0
+            if too_long:
+                self._suppress = True
+                return None  # habla continua (TV, conversación): no es una llamada
+            if len(segment) >= self.min_frames * SAMPLE_RATE * FRAME_MS // 1000:
+                return segment
+        return None
+
+    def reset(self):
+        self._frames, self._silence, self._suppress = [], 0, False
+
+
+# ===== DETECTOR DE PALABRA DE ACTIVACIÓN =====
+
+class WakeWordDetector:
+    """
+    Palabra de activación local ("Hola <nombre>")
+    VAD barato sobre el micrófono; solo los segmentos cortos de voz pasan
+    a MFCC + DTW contra plantillas grabadas por el usuario. Nada llega al
+    reconocimiento de voz hasta que la palabra coincide.
+    """
+
+    def __init__(self, templates_dir: str = TEMPLATES_DIR, threshold: Optional[float] = None,
+                 device=None):
+        self.templates_dir = templates_dir
+        self.fixed_threshold = threshold  # None: se ajusta con las propias plantillas
+        self.threshold = threshold or DEFAULT_THRESHOLD
+        self.device = device
+
+        self.templates: List[np.ndarray] = []
+        self.vad = VoiceActivityDetector()
+        self._stream = None
+        self._segments: queue.Queue = queue.Queue(maxsize=8)
+        self._callback: Optional[Callable[[], None]] = None
+        self._worker: Optional[threading.Thread] = None
+        self._running = False
+
+        # Estadísticas
+        self.segments_checked = 0
+        self.detections = 0
+        self.last_distance = None
+
+        self._load_templates()
+
+    @property
+    def available(self) -> bool:
+        return sd is not None
+
+    @property
+    def ready(self) -> bool:
+        return self.available and bool(self.templates)
+
+    # ===== PLANTILLAS =====
+
+    def record(self, seconds: float = 2.0) -> np.ndarray:
+        """Graba audio del micrófono (para enrolar)"""
+        audio = sd.rec(int(seconds * SAMPLE_RATE), samplerate=SAMPLE_RATE, channels=1,
+                       dtype='float32', device=self.device)
+        sd.wait()
+        return audio[:, 0]
+
+    def enroll(self, audio: np.ndarray) -> bool:
+        """Añade una plantilla a partir de una grabación de la frase"""
+        vad = VoiceActivityDetector(max_ms=4000)
+        step = SAMPLE_RATE * FRAME_MS // 1000
+        # Calibrar el ruido con el inicio de la grabación
+        for i in range(0, min(len(audio), SAMPLE_RATE // 4), step):
+            vad.is_speech(audio[i:i + step])
+
+        segment = None
+        padded = np.concatenate([audio, np.zeros(SAMPLE_RATE // 2, dtype=np.float32)])
+        for i in range(0, len(padded) - step + 1, step):
+            segment = vad.feed(padded[i:i + step])
+            if segment is not None:
+                break
+
+        if segment is None:
+            return False
+
+        template = mfcc(segment)
+        os.makedirs(self.templates_dir, exist_ok=True)
+        np.save(os.path.join(self.templates_dir, f"template_{len(self.templates)}.npy"), template)
+        self.templates.append(template)
+        self._calibrate_threshold()
+        return True
+
+    def clear_templates(self):
+        """Borra las plantillas (antes de volver a enrolar: no se acumulan)"""
+        if os.path.isdir(self.templates_dir):
+            for name in os.listdir(self.templates_dir):
+                if name.endswith('.npy'):
+                    os.remove(os.path.join(self.templates_dir, name))
+        self.templates = []
+        self.threshold = self.fixed_threshold or DEFAULT_THRESHOLD
+
+    def distance(self, segment: np.ndarray) -> float:
+        """Menor distancia DTW del segmento a las plantillas"""
+        features = mfcc(segment)
+        return min((dtw_distance(features, t) for t in self.templates), default=float('inf'))
+
+    # ===== ESCUCHA =====
+
+    def start(self, on_wake: Callable[[], None]) -> bool:
+        """Escucha el micrófono y llama on_wake al oír la palabra"""
+        if not self.ready:
+            return False
+
+        self._callback = on_wake
+        self._running = True
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._match_loop, daemon=True, name='wake-word')
+            self._worker.start()
+        self._open_stream()
+        return True
+
+    def pause(self):
+        """Suelta el micrófono (mientras se escucha un comando)"""
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+        self.vad.reset()
+
+    def resume(self):
+        if self._running and self._stream is None:
+            self._open_stream()
+
+    def stop(self):
+        self._running = False
+        self.pause()
+
+    def get_statistics(self) -> Dict:
+        return {
+            'templates': len(self.templates),
+            'segments_checked': self.segments_checked,
+            'detections': self.detections,
+            'last_distance': self.last_distance
+        }
+
+    # ===== UTILIDADES PRIVADAS =====
+
+    def _load_templates(self):
+        if not os.path.isdir(self.templates_dir):
+            return
+        for name in sorted(os.listdir(self.templates_dir)):
+            if name.endswith('.npy'):
+                self.templates.append(np.load(os.path.join(self.templates_dir, name)))
+        self._calibrate_threshold()
+
+    def _calibrate_threshold(self):
+        """Umbral a partir de lo que se parecen entre sí las plantillas del usuario"""
+        if self.fixed_threshold is not None or len(self.templates) < 2:
+            return
+        distances = [dtw_distance(a, b) for i, a in enumerate(self.templates)
+                     for b in self.templates[i + 1:]]
+        self.threshold = 1.4 * max(distances)
+
+    def _open_stream(self):
+        self._stream = sd.InputStream(
+            samplerate=SAMPLE_RATE, channels=1, dtype='float32', device=self.device,
+            blocksize=SAMPLE_RATE * FRAME_MS // 1000, callback=self._on_audio
+        )
+        self._stream.start()
+
+    def _on_audio(self, data, frames, time_info, status):
+        """Callback de audio: solo VAD (barato); el cotejo va en otro hilo"""
+        segment = self.vad.feed(data[:, 0].copy())
+        if segment is not None:
+            try:
+                self._segments.put_nowait(segment)
+            except queue.Full:
+                pass
+
+    def _match_loop(self):
+        while self._running:
+            try:
+                segment = self._segments.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            self.segments_checked += 1
+            self.last_distance = self.distance(segment)
+            if self.last_distance <= self.threshold and self._callback is not None:
+                self.detections += 1
+                # Descartar lo que se acumuló mientras se cotejaba
+                while not self._segments.empty():
+                    self._segments.get_nowait()
+                self._callback()